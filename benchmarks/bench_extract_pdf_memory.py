@@ -0,0 +1,74 @@
+"""
+Measure peak RSS of extract_markdown on a large PDF, whole-document vs chunked.
+
+Usage:
+    python -m benchmarks.bench_extract_pdf_memory [pdf] [--pages N] [--chunk-pages N]
+                                                  [--workers N] [--ceiling-mb MB]
+
+Without a PDF a synthetic document of --pages pages is generated. Each mode
+runs in a fresh interpreter so its peak RSS is measured in isolation. With
+--ceiling-mb the benchmark exits non-zero when the chunked run exceeds it.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+CHILD = '''
+import json, pathlib, resource, sys, time
+from py_tools.sys_tools.extract_pdf import extract_markdown
+pdf, out, chunk, workers = sys.argv[1], pathlib.Path(sys.argv[2]), sys.argv[3], int(sys.argv[4])
+start = time.perf_counter()
+extract_markdown(pdf, out, chunk_pages=int(chunk) if chunk != "none" else None, workers=workers)
+usage = resource.getrusage(resource.RUSAGE_SELF)
+print(json.dumps({"seconds": time.perf_counter() - start, "maxrss_kb": usage.ru_maxrss}))
+'''
+
+
+def make_pdf(path, pages):
+    import pymupdf
+
+    text = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 6
+    doc = pymupdf.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f'# Section {number}')
+        page.insert_textbox(pymupdf.Rect(72, 100, 540, 760), text * 8)
+    doc.save(path)
+
+
+def run(pdf, out, chunk, workers):
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD, str(pdf), str(out), str(chunk), str(workers)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('pdf', nargs='?')
+    parser.add_argument('--pages', type=int, default=500)
+    parser.add_argument('--chunk-pages', type=int, default=25)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--ceiling-mb', type=float)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = args.pdf
+        if pdf is None:
+            pdf = Path(tmp) / 'synthetic.pdf'
+            make_pdf(pdf, args.pages)
+        whole = run(pdf, tmp, 'none', 1)
+        chunked = run(pdf, tmp, args.chunk_pages, args.workers)
+
+    for label, result in (('whole document', whole), (f'chunks of {args.chunk_pages}', chunked)):
+        print(f'{label:>16}: {result["maxrss_kb"] / 1024:8.1f} MB peak RSS, {result["seconds"]:.2f}s')
+    if args.ceiling_mb is not None and chunked['maxrss_kb'] / 1024 > args.ceiling_mb:
+        sys.exit(f'Chunked extraction exceeded the {args.ceiling_mb} MB ceiling')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Time the /proc process-tree collector on a synthetic /proc fixture.
+
+Usage:
+    python -m benchmarks.bench_process_tree [--processes N] [--repeat N]
+
+The fixture holds N fake /proc/<pid>/stat files arranged as a wide and deep
+tree (including a 5000-level chain to exercise the iterative renderer).
+For reference the 'ps' fallback is also timed on the real host.
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from py_tools.sys_tools.process_tree_python3 import (
+    ProcessIndex, get_process_info, print_tree, read_proc,
+)
+
+STAT_TAIL = b' 0 0 0 0 -1 4194560 100 0 0 0 10 5 0 0 20 0 1 0 100 1000000 200'
+
+
+def make_proc(root, processes, chain=5000):
+    """Create fake /proc/<pid>/stat files for pids 1..processes."""
+    for pid in range(1, processes + 1):
+        if pid == 1:
+            ppid = 0
+        elif pid <= chain:
+            ppid = pid - 1
+        else:
+            ppid = (pid * 7919) % (pid - 1) + 1
+        os.mkdir(os.path.join(root, str(pid)))
+        with open(os.path.join(root, str(pid), 'stat'), 'wb') as f:
+            f.write(b'%d (worker %d) S %d' % (pid, pid, ppid) + STAT_TAIL)
+
+
+def best_of(repeat, func, *args):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def collect(root):
+    return list(read_proc(root))
+
+
+def render(index):
+    out = io.StringIO()
+    print_tree(index, 1, out)
+    return out.getvalue().count('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        make_proc(tmp, args.processes)
+        read_time, records = best_of(args.repeat, collect, tmp)
+    index_time, index = best_of(args.repeat, ProcessIndex, records)
+    render_time, lines = best_of(args.repeat, render, index)
+    ps_time, ps_records = best_of(args.repeat, lambda: list(get_process_info()))
+
+    print(f'read /proc   {read_time:8.3f}s  {len(records)} processes')
+    print(f'build index  {index_time:8.3f}s')
+    print(f'render tree  {render_time:8.3f}s  {lines} lines')
+    print(f'ps (host)    {ps_time:8.3f}s  {len(ps_records)} processes')
+
+
+if __name__ == '__main__':
+    main()
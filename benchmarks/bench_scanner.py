@@ -0,0 +1,68 @@
+"""
+Compare the concurrent scanner engine against os.walk.
+
+Usage:
+    python -m benchmarks.bench_scanner [folder] [--workers N] [--repeat N]
+
+Without a folder a synthetic tree is created in a temporary directory.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from py_tools.sys_tools.files.scanner import scan
+
+
+def make_tree(root, depth=3, fanout=8, files=50):
+    """Create a synthetic tree of fanout**depth leaf directories."""
+    level = [root]
+    for _ in range(depth):
+        level = [os.path.join(parent, f'd{i}') for parent in level for i in range(fanout)]
+        for folder in level:
+            os.makedirs(folder)
+            for j in range(files):
+                open(os.path.join(folder, f'f{j}.txt'), 'w').close()
+
+
+def bench_os_walk(folder):
+    count = 0
+    for _, dirs, files in os.walk(folder):
+        count += len(dirs) + len(files)
+    return count
+
+
+def bench_scan(folder, workers):
+    return sum(1 for _ in scan(folder, recursive=True, workers=workers))
+
+
+def best_of(repeat, func, *args):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('folder', nargs='?')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.folder
+        if folder is None:
+            folder = tmp
+            make_tree(folder)
+        walk_time, walk_count = best_of(args.repeat, bench_os_walk, folder)
+        scan_time, scan_count = best_of(args.repeat, bench_scan, folder, args.workers)
+
+    print(f'os.walk : {walk_count} entries in {walk_time:.3f}s')
+    print(f'scan    : {scan_count} entries in {scan_time:.3f}s ({walk_time / scan_time:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
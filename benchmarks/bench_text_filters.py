@@ -0,0 +1,96 @@
+"""
+Compare the text filter engine with the previous per-filter regex passes.
+
+Usage:
+    python -m benchmarks.bench_text_filters [--rows N] [--csv FILE] [--column NAME]
+
+Without a CSV, a synthetic one with N rows of short social-media-like posts
+is written to a temporary directory.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'py_tools', 'utils_candidates'))
+from text_filters import PATTERNS, compile_filters  # noqa: E402
+
+FILTERS = ['emails', 'mentions', 'hashtags', 'links', 'dates']
+WORDS = ['great', 'launch', 'today', 'thanks', 'team', 'release', 'meeting', 'python', 'data']
+
+
+def make_csv(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('id,text\n')
+        for i in range(rows):
+            parts = rng.sample(WORDS, 4)
+            if rng.random() < 0.3:
+                parts.append(f'@user{rng.randrange(5000)}')
+            if rng.random() < 0.4:
+                parts.append(f'#{rng.choice(WORDS)}')
+            if rng.random() < 0.2:
+                parts.append(f'https://example.com/p/{rng.randrange(10 ** 6)}')
+            if rng.random() < 0.1:
+                parts.append(f'contact{rng.randrange(100)}@mail.org')
+            if rng.random() < 0.05:
+                parts.append(f'{rng.randint(1, 28)}/{rng.randint(1, 12)}/2024')
+            rng.shuffle(parts)
+            f.write(f'{i},"{" ".join(parts)}"\n')
+
+
+def legacy(column, mode):
+    text = column.astype(str).str.cat(sep=' ')
+    if mode == 'extract':
+        return {name: re.findall(PATTERNS[name], text) for name in FILTERS}
+    for name in FILTERS:
+        text = re.sub(PATTERNS[name], '', text)
+    return text
+
+
+def single_pass(column, mode):
+    text = column.astype(str).str.cat(sep=' ')
+    text_filter = compile_filters(FILTERS)
+    return text_filter.extract(text) if mode == 'extract' else text_filter.clean(text)
+
+
+def series(column, mode):
+    text_filter = compile_filters(FILTERS)
+    return text_filter.extract_series(column) if mode == 'extract' else text_filter.clean_series(column)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--csv')
+    parser.add_argument('--column', default='text')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.csv
+        if path is None:
+            path = os.path.join(tmp, 'posts.csv')
+            make_csv(path, args.rows)
+        start = time.perf_counter()
+        column = pd.read_csv(path, usecols=[args.column])[args.column]
+        print(f'read {len(column)} rows in {time.perf_counter() - start:.2f}s')
+
+    for mode in ('extract', 'clean'):
+        for name, func in (('per-filter passes', legacy), ('single pass', single_pass),
+                           ('Series.str per row', series)):
+            print(f'{mode:8s} {name:20s} {timed(func, column, mode):7.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,10 @@
-from .sys_tools import *
-from .work_tools import *
-from .utils import *
+from ._lazy import attach
+from .sys_tools import _EXPORTS as _SYS_TOOLS_EXPORTS
+
+# Public names re-exported from the subpackages, resolved on first access:
+# everything sys_tools exports (work_tools and utils export nothing)
+_EXPORTS = {name: '.sys_tools' for name in _SYS_TOOLS_EXPORTS}
+
+__getattr__, __dir__, __all__ = attach(
+    __name__, _EXPORTS, submodules=('sys_tools', 'work_tools', 'utils')
+)
@@ -0,0 +1,55 @@
+"""
+Lazy attribute loading for the py_tools packages.
+
+Each package declares an explicit export table mapping public names to the
+submodule that defines them. Submodules are only imported the first time one
+of their names is accessed, so importing a package (or one of its light
+submodules) never pulls in heavy optional dependencies such as pymupdf4llm,
+markitdown or openai.
+"""
+
+import importlib
+import sys
+import types
+
+
+def attach(package, exports, submodules=()):
+    """
+    Build the module-level ``__getattr__``, ``__dir__`` and ``__all__`` for a package.
+
+    :param package: str ``__name__`` of the package being set up
+    :param exports: dict mapping each exported name to the relative submodule defining it
+    :param submodules: iterable of relative submodule names that are exported as modules
+    :return: tuple (__getattr__, __dir__, __all__)
+    """
+    exports = dict(exports)
+    submodules = frozenset(submodules)
+    __all__ = sorted(set(exports) | submodules)
+    # Exports named like the submodule defining them (extract_pdf)
+    shadowed = {name for name, module in exports.items() if module == f'.{name}'}
+
+    class Package(types.ModuleType):
+        def __setattr__(self, name, value):
+            # Importing a submodule binds it on the package under its own name,
+            # also when it is imported directly; the export of that name wins
+            if name in shadowed and value is sys.modules.get(f'{package}.{name}'):
+                value = getattr(value, name)
+            super().__setattr__(name, value)
+
+    sys.modules[package].__class__ = Package
+
+    def __getattr__(name):
+        if name in exports:
+            value = getattr(importlib.import_module(exports[name], package), name)
+        elif name in submodules:
+            value = importlib.import_module(f'.{name}', package)
+        else:
+            raise AttributeError(f'module {package!r} has no attribute {name!r}')
+        # Cache on the package so later lookups skip __getattr__ entirely
+        vars(importlib.import_module(package))[name] = value
+        return value
+
+    def __dir__():
+        return __all__
+
+    return __getattr__, __dir__, __all__
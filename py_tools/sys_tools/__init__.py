@@ -1,4 +1,52 @@
-from .extract_pdf import *
-from .files import *
-from .markdownthis import *
-from .process_tree_python3 import *
+from .._lazy import attach
+from .files import _EXPORTS as _FILES_EXPORTS
+
+# Public names and the submodule defining them, imported on first access. These
+# are the public functions and classes of the modules the package used to
+# star-import; new public APIs of those modules belong here too.
+_EXPORTS = {
+    'extract_pdf': '.extract_pdf',
+    'extract_markdown': '.extract_pdf',
+    'extract_images': '.extract_pdf',
+    'extract_all': '.extract_pdf',
+    'page_ranges': '.extract_pdf',
+    'iter_markdown_chunks': '.extract_pdf',
+    'expected_outputs': '.extract_pdf',
+    'outputs_up_to_date': '.extract_pdf',
+    'process_pdfs': '.extract_pdf',
+    'batch_process_pdfs': '.extract_pdf',
+    'find_pdfs': '.extract_pdf',
+    'run_extraction': '.extract_pdf',
+    'mkdownthis': '.markdownthis',
+    'default_use_llm': '.markdownthis',
+    'build_converter': '.markdownthis',
+    'find_inputs': '.markdownthis',
+    'output_file_for': '.markdownthis',
+    'batch_mkdownthis': '.markdownthis',
+    'caption_all': '.markdownthis',
+    'ConversionCache': '.conversion_cache',
+    'get_process_info': '.process_tree_python3',
+    'print_hierarchy': '.process_tree_python3',
+    'parse_stat': '.process_tree_python3',
+    'read_proc': '.process_tree_python3',
+    'collect_processes': '.process_tree_python3',
+    'ProcessIndex': '.process_tree_python3',
+    'render_tree': '.process_tree_python3',
+    'print_tree': '.process_tree_python3',
+    'Snapshot': '.process_tree_python3',
+    'sample': '.process_tree_python3',
+    'watch': '.process_tree_python3',
+    'Process': '.process_tree_python3',
+    'ProcessTree': '.process_tree_python3',
+    'find_roots': '.process_tree_python3',
+    'prune': '.process_tree_python3',
+    'build_tree': '.process_tree_python3',
+    'filer': '.files',
+    # Everything the files package exports
+    **{name: '.files' for name in _FILES_EXPORTS},
+}
+
+__getattr__, __dir__, __all__ = attach(
+    __name__, _EXPORTS,
+    submodules=('captioning', 'conversion_cache', 'files', 'markdownthis', 'process_tree_python3'),
+)
@@ -0,0 +1,197 @@
+"""
+captioning.py
+Concurrent LLM image captioning for batch MarkItDown conversions.
+
+MarkItDown describes an image inline, one request at a time, while it
+converts the file. In batch mode the images are instead converted without
+an LLM, collected, and captioned here concurrently with asyncio: requests
+are rate limited, retried with exponential backoff and deduplicated by
+image hash, and each caption is merged back into the image's Markdown in
+the same "# Description:" section MarkItDown would have written. With a
+ConversionCache, captions are also cached by image hash, model and prompt,
+so images captioned before cost no request.
+
+Any OpenAI-compatible endpoint works, e.g. a local server:
+    client = AsyncOpenAI(base_url="http://localhost:8000/v1", api_key="unused")
+    captions = asyncio.run(caption_images(["a.png", "b.jpg"], client=client))
+"""
+import asyncio
+import base64
+import hashlib
+import mimetypes
+import os
+import random
+
+import openai
+from openai import AsyncOpenAI
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+DEFAULT_PROMPT = "Write a detailed caption for this image."
+DEFAULT_MODEL = "gpt-4o"
+
+# Errors worth retrying: throttling, timeouts, dropped connections and server errors
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+def is_image(path):
+    """
+    Whether MarkItDown would describe a file with an LLM.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        bool: True for JPEG and PNG files.
+    """
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+
+def merge_caption(markdown, caption):
+    """
+    Append a caption to an image's Markdown the way MarkItDown does.
+
+    Args:
+        markdown (str): Markdown produced without an LLM (image metadata).
+        caption (str): Caption returned by the LLM.
+
+    Returns:
+        str: Markdown with a "# Description:" section.
+    """
+    return f"{markdown}\n# Description:\n{caption.strip()}\n"
+
+
+def async_client(client):
+    """
+    Asynchronous client for the endpoint and credentials of an OpenAI client.
+
+    Args:
+        client (OpenAI): Client given to MarkItDown.
+
+    Returns:
+        AsyncOpenAI: Client without its own retries (caption_images retries).
+    """
+    return AsyncOpenAI(api_key=client.api_key, organization=client.organization,
+                       project=client.project, base_url=client.base_url,
+                       timeout=client.timeout, max_retries=0)
+
+
+class RateLimiter:
+    """
+    Space request start times to at most `rate` per second.
+
+    Args:
+        rate (float): Requests per second, or None for no limit.
+    """
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+def _image_message(path, prompt):
+    content_type, _ = mimetypes.guess_type(path)
+    with open(path, "rb") as f:
+        image_base64 = base64.b64encode(f.read()).decode("utf-8")
+    return [{
+        "role": "user",
+        "content": [
+            {"type": "text", "text": prompt},
+            {"type": "image_url",
+             "image_url": {"url": f"data:{content_type or 'image/jpeg'};base64,{image_base64}"}},
+        ],
+    }]
+
+
+def _digest(path):
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+async def caption_images(paths, client=None, model=DEFAULT_MODEL, prompt=DEFAULT_PROMPT,
+                         concurrency=8, rate=None, max_retries=5, backoff=1.0, cache=None):
+    """
+    Caption many images concurrently, sending one request per distinct image.
+
+    Args:
+        paths (list): Paths to image files.
+        client (AsyncOpenAI): OpenAI-compatible client (default: AsyncOpenAI() without its own retries).
+        model (str): Model used for captions.
+        prompt (str): Instruction sent with every image.
+        concurrency (int): Maximum number of requests in flight.
+        rate (float): Maximum requests started per second (default: unlimited).
+        max_retries (int): Retries of a failed request before giving up on it.
+        backoff (float): First retry delay in seconds, doubled on every retry.
+        cache (ConversionCache): Optional cache of captions by image content, model and prompt.
+
+    Returns:
+        dict: Path -> caption, or -> the exception that made the last attempt fail.
+    """
+    if client is None:
+        client = AsyncOpenAI(max_retries=0)
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate)
+
+    loop = asyncio.get_running_loop()
+    digests = await asyncio.gather(*(loop.run_in_executor(None, _digest, p) for p in paths))
+    unique = {}
+    for path, digest in zip(paths, digests):
+        unique.setdefault(digest, path)
+    keys, cached = {}, {}
+    if cache is not None:
+        options = {"model": model, "prompt": prompt}
+        keys = {digest: cache.key(path, "caption", options, digest=digest) for digest, path in unique.items()}
+        texts = await asyncio.gather(*(loop.run_in_executor(None, cache.get, key) for key in keys.values()))
+        cached = {digest: text for digest, text in zip(keys, texts) if text is not None}
+
+    async def caption(path):
+        for attempt in range(max_retries + 1):
+            async with semaphore:
+                # Encoded under the semaphore and dropped before any backoff, so at
+                # most `concurrency` encoded images are held in memory
+                messages = await loop.run_in_executor(None, _image_message, path, prompt)
+                await limiter.wait()
+                try:
+                    response = await client.chat.completions.create(model=model, messages=messages)
+                    return response.choices[0].message.content
+                except RETRYABLE_ERRORS as e:
+                    if attempt == max_retries:
+                        return e
+                finally:
+                    del messages
+            # Back off outside the semaphore so other images keep going
+            await asyncio.sleep(backoff * 2 ** attempt * (1 + random.random() / 2))
+
+    async def guarded(digest, path):
+        if digest in cached:
+            return cached[digest]
+        try:
+            text = await caption(path)
+        except Exception as e:  # a non-retryable failure only loses this image
+            return e
+        if cache is not None and isinstance(text, str):
+            try:
+                await loop.run_in_executor(None, cache.put, keys[digest], text)
+            except OSError:
+                pass  # the caption is still returned
+        return text
+
+    results = await asyncio.gather(*(guarded(d, p) for d, p in unique.items()))
+    by_digest = dict(zip(unique, results))
+    return {path: by_digest[digest] for path, digest in zip(paths, digests)}
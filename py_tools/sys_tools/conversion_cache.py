@@ -0,0 +1,262 @@
+"""
+conversion_cache.py
+Content-addressed cache for document conversions (PDF and MarkItDown to Markdown)
+and image captions (see captioning.py).
+
+A cache key is the SHA-256 of the input file contents combined with the
+converter name, its options and the converter library version, so a
+renamed or copied document still hits the cache, while a library upgrade
+or an option change triggers a fresh conversion.
+
+Outputs are stored as files in a local directory. Reading an entry
+refreshes its mtime, and once the directory grows past its size limit
+the least recently used entries are evicted.
+
+Usage:
+    cache = ConversionCache()
+    text = cache.convert('report.pdf', 'pymupdf4llm', lambda: pymupdf4llm.to_markdown('report.pdf'))
+"""
+import hashlib
+import importlib.metadata
+import json
+import os
+import shutil
+import tempfile
+
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+
+def default_cache_dir():
+    """
+    Directory used when none is given: $PY_TOOLS_CACHE_DIR or ~/.cache/py_tools/conversions.
+
+    Returns:
+        str: Path of the cache directory.
+    """
+    if os.environ.get("PY_TOOLS_CACHE_DIR"):
+        return os.environ["PY_TOOLS_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "py_tools", "conversions")
+
+
+def library_version(distribution):
+    """
+    Installed version of a library, used to invalidate entries on upgrade.
+
+    Args:
+        distribution (str): Distribution name, e.g. 'markitdown'.
+
+    Returns:
+        str: Version string, or 'unknown' if it is not installed.
+    """
+    try:
+        return importlib.metadata.version(distribution)
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def file_digest(path):
+    """
+    SHA-256 hex digest of a file's contents.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        str: Hex digest.
+    """
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class ConversionCache:
+    """
+    Size-bounded, least-recently-used cache of conversion outputs on local disk.
+
+    Args:
+        directory (str): Cache directory (default: default_cache_dir()).
+        max_bytes (int): Size above which the least recently used entries are evicted.
+    """
+
+    suffix = ".md"
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = os.fspath(directory or default_cache_dir())
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+
+    def key(self, path, converter, options=None, version="", digest=None):
+        """
+        Cache key of converting a file with a converter.
+
+        Args:
+            path (str): Input file.
+            converter (str): Converter name, e.g. 'markitdown'.
+            options (dict): Options changing the output, must be JSON serialisable.
+            version (str): Converter library version.
+            digest (str): file_digest() of the input when already known.
+
+        Returns:
+            str: Hex digest identifying the conversion.
+        """
+        recipe = json.dumps([converter, version, options or {}], sort_keys=True, default=str)
+        digest = digest or file_digest(path)
+        return hashlib.sha256(f"{digest}\0{recipe}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def get(self, key):
+        """
+        Cached output for a key, or None.
+
+        Args:
+            key (str): Key returned by key().
+
+        Returns:
+            str: Cached text, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            # Reads refresh the entry's position in the LRU order
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return text
+
+    def put(self, key, text):
+        """
+        Store an output, evicting old entries if the cache grows too large.
+
+        Args:
+            key (str): Key returned by key().
+            text (str): Converted output.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        self._replace(tmp_path, path)
+
+    def put_file(self, key, source):
+        """
+        Store an output file, evicting old entries if the cache grows too large.
+
+        Args:
+            key (str): Key returned by key().
+            source (str): File holding the converted output.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(source, tmp_path)
+        self._replace(tmp_path, path)
+
+    def _replace(self, tmp_path, path):
+        # Move a new entry into place, keeping the size total right when it
+        # overwrites an existing entry
+        size = os.path.getsize(tmp_path)
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp_path, path)
+        if self._total_bytes is not None:
+            self._total_bytes += size - replaced
+        self._evict()
+
+    def copy_to(self, key, destination):
+        """
+        Copy a cached output to a file.
+
+        Args:
+            key (str): Key returned by key().
+            destination (str): File to write.
+
+        Returns:
+            bool: True on a hit, False on a miss (destination untouched).
+        """
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, destination)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return True
+
+    def convert(self, path, converter, convert, options=None, version=""):
+        """
+        Return the cached output of a conversion, running it on a miss.
+
+        Args:
+            path (str): Input file.
+            converter (str): Converter name.
+            convert (callable): Function without arguments returning the converted text.
+            options (dict): Options changing the output.
+            version (str): Converter library version.
+
+        Returns:
+            str: Converted text.
+        """
+        key = self.key(path, converter, options, version)
+        text = self.get(key)
+        if text is None:
+            text = convert()
+            self.put(key, text)
+        return text
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith(self.suffix):
+                        yield entry
+
+    def _stats(self):
+        # Other workers sharing the directory may evict an entry while it is listed
+        for entry in self._entries():
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            yield st.st_mtime, st.st_size, entry.path
+
+    def _evict(self):
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._stats())
+        if self._total_bytes <= self.max_bytes:
+            return
+        entries = sorted(self._stats())
+        self._total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._total_bytes -= size
+
+    def clear(self):
+        """Remove every cached entry."""
+        for entry in list(self._entries()):
+            os.remove(entry.path)
+        self._total_bytes = 0
@@ -5,9 +5,30 @@ This module provides functionality to extract content from PDF files,
 including text and images, and save them in various formats.
 """
 
+import argparse
+import contextlib
+import glob
+import json
 import os
 import pathlib
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, Optional
+import pymupdf
 import pymupdf4llm
+from pymupdf4llm.helpers.pymupdf_rag import IdentifyHeaders
+if __package__:
+    from .conversion_cache import ConversionCache, library_version
+else:  # run as a script: python py_tools/sys_tools/extract_pdf.py
+    from conversion_cache import ConversionCache, library_version
+
+# An image reference as pymupdf4llm writes it ("\n![](path)\n"); only those
+# pointing into the images folder are removed for the text-only Markdown
+IMAGE_REF_PATTERN = re.compile(r"\n!\[\]\(([^)\n]*)\)\n")
 
 def extract_pdf():
     """
@@ -57,22 +78,110 @@ def extract_pdf():
         elif choice == '2':
             extract_images(pdf_path, output_path)
 
-def extract_markdown(pdf_path, output_path):
+def extract_markdown(pdf_path, output_path, chunk_pages=None, workers=1, cache=None):
     """
     Extracts text from the PDF and saves it as a Markdown file.
 
+    With chunk_pages set, the document is converted a page range at a time
+    and each chunk is appended to the output file as soon as it is ready,
+    so peak memory depends on the chunk size rather than the document size.
+
     Parameters:
     - pdf_path: Path to the input PDF file.
     - output_path: Directory where the output will be saved.
+    - chunk_pages: Number of pages converted per chunk (default: whole document).
+    - workers: Number of processes converting chunks in parallel (chunked mode only).
+    - cache: Optional ConversionCache; identical PDFs are then converted only once.
+
+    Returns:
+    - Path of the Markdown file.
     """
-    # Extract text to Markdown
-    md_text = pymupdf4llm.to_markdown(pdf_path)
-    # Save Markdown text to file
     output_file = output_path / f"{pathlib.Path(pdf_path).stem}_output.md"
-    output_file.write_text(md_text, encoding='utf-8')
+    key = None
+    if cache is not None:
+        # Chunking does not change the output, so it is not part of the key
+        key = cache.key(pdf_path, "pymupdf4llm.to_markdown", version=library_version("pymupdf4llm"))
+        if cache.copy_to(key, output_file):
+            print(f"\nMarkdown restored from cache and saved to '{output_file}'.")
+            return output_file
+    if chunk_pages is None:
+        # Extract text to Markdown
+        md_text = pymupdf4llm.to_markdown(pdf_path)
+        # Save Markdown text to file
+        output_file.write_text(md_text, encoding='utf-8')
+    else:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for md_chunk in iter_markdown_chunks(pdf_path, chunk_pages, workers):
+                f.write(md_chunk)
+                f.flush()
+    if key is not None:
+        cache.put_file(key, output_file)
     print(f"\nMarkdown extracted and saved to '{output_file}'.")
+    return output_file
 
-def extract_images(pdf_path, output_path):
+def page_ranges(page_count, chunk_pages):
+    """
+    Splits a document into consecutive lists of 0-based page numbers.
+
+    Parameters:
+    - page_count: Number of pages in the document.
+    - chunk_pages: Maximum number of pages per chunk.
+    """
+    if chunk_pages < 1:
+        raise ValueError("chunk_pages must be at least 1")
+    return [list(range(start, min(start + chunk_pages, page_count)))
+            for start in range(0, page_count, chunk_pages)]
+
+def _header_info(doc):
+    """
+    Header levels of a whole document, identified once and shared by its chunks.
+
+    Without hdr_info, pymupdf4llm scans every page for font sizes on each call.
+    The layout engine (pymupdf.layout) finds headers itself and ignores it.
+    """
+    if getattr(pymupdf4llm, "_use_layout", False):
+        return None
+    return IdentifyHeaders(doc)
+
+def _markdown_pages(pdf_path, pages, hdr_info):
+    """
+    Worker for iter_markdown_chunks: convert some pages of a PDF to Markdown.
+    """
+    with pymupdf.open(pdf_path) as doc:
+        return pymupdf4llm.to_markdown(doc, pages=pages, hdr_info=hdr_info)
+
+def iter_markdown_chunks(pdf_path, chunk_pages, workers=1):
+    """
+    Yields the Markdown of a PDF one page range at a time, in page order.
+
+    Header levels are identified once for the whole document and shared by
+    every chunk, so headers are consistent across chunks.
+
+    Parameters:
+    - pdf_path: Path to the input PDF file.
+    - chunk_pages: Number of pages converted per chunk.
+    - workers: Number of processes converting chunks in parallel.
+    """
+    with pymupdf.open(pdf_path) as doc:
+        ranges = page_ranges(doc.page_count, chunk_pages)
+        hdr_info = _header_info(doc)
+        if workers <= 1:
+            for pages in ranges:
+                yield pymupdf4llm.to_markdown(doc, pages=pages, hdr_info=hdr_info)
+            return
+
+    # Keep a bounded window of chunks in flight so finished chunks that are
+    # waiting for an earlier one do not pile up in memory.
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for pages in ranges:
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+            pending.append(pool.submit(_markdown_pages, str(pdf_path), pages, hdr_info))
+        while pending:
+            yield pending.popleft().result()
+
+def extract_images(pdf_path, output_path, dpi=300, image_format="png"):
     """
     Extracts images from the PDF and saves them along with a Markdown file
     containing image references.
@@ -80,46 +189,365 @@ def extract_images(pdf_path, output_path):
     Parameters:
     - pdf_path: Path to the input PDF file.
     - output_path: Directory where the output will be saved.
+    - dpi: Resolution of the extracted images.
+    - image_format: Image file format, e.g. 'png' or 'jpg'.
+
+    Returns:
+    - Path of the Markdown file with image references.
     """
     # Create a subdirectory for images
     images_dir = output_path / f"{pathlib.Path(pdf_path).stem}_images"
     images_dir.mkdir(parents=True, exist_ok=True)
     # Extract images and save Markdown with image references
     md_text_images = pymupdf4llm.to_markdown(
-        doc=pdf_path,
+        doc=str(pdf_path),
         write_images=True,
         image_path=str(images_dir),
-        image_format="png",
-        dpi=300
+        image_format=image_format,
+        dpi=dpi
     )
     # Save Markdown text to file
     output_file = output_path / f"{pathlib.Path(pdf_path).stem}_images.md"
     output_file.write_text(md_text_images, encoding='utf-8')
     print(f"\nImages extracted to '{images_dir}'.")
     print(f"Markdown with image references saved to '{output_file}'.")
+    return output_file
+
+def extract_all(pdf_path, output_path, dpi=300, image_format="png"):
+    """
+    Extracts the Markdown text and the images of a PDF, parsing it once.
+
+    The document is converted with images written out; the plain Markdown is
+    the same text without the references to the images written, which is what
+    extract_markdown() writes.
+
+    Parameters:
+    - pdf_path: Path to the input PDF file.
+    - output_path: Directory where the output will be saved.
+    - dpi: Resolution of the extracted images.
+    - image_format: Image file format, e.g. 'png' or 'jpg'.
+
+    Returns:
+    - Tuple of the Markdown file and the Markdown-with-images file.
+    """
+    stem = pathlib.Path(pdf_path).stem
+    images_dir = output_path / f"{stem}_images"
+    images_dir.mkdir(parents=True, exist_ok=True)
+    md_text_images = pymupdf4llm.to_markdown(
+        doc=str(pdf_path),
+        write_images=True,
+        image_path=str(images_dir),
+        image_format=image_format,
+        dpi=dpi
+    )
+    images_file = output_path / f"{stem}_images.md"
+    images_file.write_text(md_text_images, encoding='utf-8')
+    markdown_file = output_path / f"{stem}_output.md"
+    markdown_file.write_text(strip_image_refs(md_text_images, images_dir), encoding='utf-8')
+    return markdown_file, images_file
+
+def strip_image_refs(md_text, images_dir):
+    """
+    Removes the references to images written into a folder from Markdown.
+
+    Parameters:
+    - md_text: Markdown written by pymupdf4llm with write_images=True.
+    - images_dir: Folder the images were written to.
+
+    Returns:
+    - The Markdown without those references; other text, including image
+      syntax that is part of the document text, is kept.
+    """
+    folder = os.path.realpath(images_dir)
+
+    def strip(match):
+        # References are relative to the working directory, as the files written
+        if os.path.dirname(os.path.realpath(match.group(1))) == folder:
+            return ""
+        return match.group(0)
+    return IMAGE_REF_PATTERN.sub(strip, md_text)
+
+def expected_outputs(pdf_path, output_path, mode="batch"):
+    """
+    Lists the Markdown files an extraction mode writes for a PDF.
+
+    Parameters:
+    - pdf_path: Path to the input PDF file.
+    - output_path: Directory where the output is saved.
+    - mode: One of MODES.
+    """
+    stem = pathlib.Path(pdf_path).stem
+    outputs = []
+    if mode in ("markdown", "batch"):
+        outputs.append(output_path / f"{stem}_output.md")
+    if mode in ("images", "batch"):
+        outputs.append(output_path / f"{stem}_images.md")
+    return outputs
+
+def outputs_up_to_date(pdf_path, output_path, mode="batch"):
+    """
+    Checks whether the outputs of a PDF exist and are newer than it.
 
-def batch_process_pdfs(folder_path, output_path):
+    Parameters:
+    - pdf_path: Path to the input PDF file.
+    - output_path: Directory where the output is saved.
+    - mode: One of MODES.
+    """
+    source_mtime = os.path.getmtime(pdf_path)
+    for output_file in expected_outputs(pdf_path, output_path, mode):
+        if not output_file.is_file() or output_file.stat().st_mtime < source_mtime:
+            return False
+    return True
+
+MODES = ("markdown", "images", "batch")
+
+def _process_pdf(pdf_path, output_path, mode, force, dpi, image_format, chunk_pages, cache):
+    """
+    Worker for process_pdfs: process one PDF and report instead of raising.
+    """
+    start = time.perf_counter()
+    result = {"pdf": str(pdf_path), "status": "done", "error": None, "outputs": []}
+    try:
+        if not force and outputs_up_to_date(pdf_path, output_path, mode):
+            result["status"] = "skipped"
+        elif mode == "markdown":
+            extract_markdown(pdf_path, output_path, chunk_pages=chunk_pages, cache=cache)
+        elif mode == "images":
+            extract_images(pdf_path, output_path, dpi=dpi, image_format=image_format)
+        else:
+            extract_all(pdf_path, output_path, dpi=dpi, image_format=image_format)
+        if result["status"] == "done":
+            result["outputs"] = [str(f) for f in expected_outputs(pdf_path, output_path, mode)]
+    except Exception as e:  # one broken PDF must not stop the batch
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+def process_pdfs(pdf_paths, output_path, mode="batch", workers=None, force=False,
+                 dpi=300, image_format="png", chunk_pages=None, cache=None):
+    """
+    Processes PDF files with one extraction mode, spread over a process pool.
+
+    A PDF that raises, or even crashes its worker process, is reported as
+    an error without stopping the other documents.
+
+    Parameters:
+    - pdf_paths: Paths to the input PDF files.
+    - output_path: Directory where the output will be saved.
+    - mode: 'markdown', 'images' or 'batch' (both, parsing each PDF once).
+    - workers: Number of worker processes (default: number of CPUs, 1 runs inline).
+    - force: Reprocess PDFs even when their outputs are up to date.
+    - dpi: Resolution of the extracted images.
+    - image_format: Image file format, e.g. 'png' or 'jpg'.
+    - chunk_pages: Pages per chunk in markdown mode (default: whole document).
+    - cache: Optional ConversionCache used in markdown mode.
+
+    Returns:
+    - List of per-document results with 'pdf', 'status' ('done', 'skipped'
+      or 'error'), 'error', 'outputs' and 'seconds' keys.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}")
+    output_path = pathlib.Path(output_path)
+    output_path.mkdir(parents=True, exist_ok=True)
+    options = (mode, force, dpi, image_format, chunk_pages, cache)
+
+    def report(done, result):
+        message = f"[{done}/{len(pdf_paths)}] {result['status']}: {result['pdf']} ({result['seconds']}s)"
+        if result["error"]:
+            message += f" - {result['error']}"
+        print(message)
+
+    pdf_paths = list(pdf_paths)
+    results = []
+    if workers == 1:
+        for pdf_path in pdf_paths:
+            results.append(_process_pdf(pdf_path, output_path, *options))
+            report(len(results), results[-1])
+        return results
+
+    crashed = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_process_pdf, pdf_path, output_path, *options): pdf_path
+                   for pdf_path in pdf_paths}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except BrokenProcessPool:
+                # A worker died (e.g. MuPDF crashed); every PDF still in the pool
+                # fails with it, so they are retried one by one below
+                crashed.append(futures[future])
+                continue
+            report(len(results), results[-1])
+
+    for pdf_path in crashed:
+        # A fresh single-worker pool per PDF, so only the culprit fails again
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(_process_pdf, pdf_path, output_path, *options)
+            try:
+                results.append(future.result())
+            except BrokenProcessPool:
+                results.append({"pdf": str(pdf_path), "status": "error", "outputs": [],
+                                "error": "BrokenProcessPool: the worker process crashed",
+                                "seconds": round(time.perf_counter() - start, 3)})
+        report(len(results), results[-1])
+    return results
+
+def batch_process_pdfs(folder_path, output_path, workers=None, force=False,
+                       dpi=300, image_format="png"):
     """
     Batch processes all PDF files in a folder.
 
+    Each PDF is parsed once for both its text and its images, documents are
+    spread over a process pool, and PDFs whose outputs are newer than the
+    input are skipped.
+
     Parameters:
     - folder_path: Path to the folder containing PDF files.
     - output_path: Directory where the output will be saved.
+    - workers: Number of worker processes (default: number of CPUs).
+    - force: Reprocess PDFs even when their outputs are up to date.
+    - dpi: Resolution of the extracted images.
+    - image_format: Image file format, e.g. 'png' or 'jpg'.
+
+    Returns:
+    - List of per-document results, see process_pdfs.
     """
-    pdf_files = [f for f in os.listdir(folder_path) if f.endswith('.pdf')]
+    pdf_files = sorted(f for f in os.listdir(folder_path) if f.endswith('.pdf'))
     if not pdf_files:
         print(f"No PDF files found in folder '{folder_path}'. Exiting.")
-        return
+        return []
+
+    results = process_pdfs(
+        [os.path.join(folder_path, pdf_file) for pdf_file in pdf_files], output_path,
+        mode="batch", workers=workers, force=force, dpi=dpi, image_format=image_format,
+    )
+    failed = sum(1 for r in results if r["status"] == "error")
+    print(f"\nBatch processing completed with {failed} error(s). Outputs saved in '{output_path}'.")
+    return results
+
+def find_pdfs(inputs):
+    """
+    Expands files, folders and glob patterns into a list of PDF paths.
+
+    Folders are searched recursively and glob patterns accept '**'.
+
+    Parameters:
+    - inputs: Iterable of paths or glob patterns.
+    """
+    found = {}
+    for item in inputs:
+        item = os.fspath(item)
+        if os.path.isdir(item):
+            matches = sorted(glob.glob(os.path.join(glob.escape(item), "**", "*.pdf"), recursive=True))
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item, recursive=True))
+        else:
+            matches = [item]
+        for match in matches:
+            if match.lower().endswith('.pdf') or not glob.has_magic(item):
+                found.setdefault(os.path.abspath(match), None)
+    return list(found)
+
+def run_extraction(
+    mode: str,
+    inputs: Iterable[str],
+    output_dir: str = "output",
+    dpi: int = 300,
+    image_format: str = "png",
+    workers: Optional[int] = None,
+    force: bool = False,
+    chunk_pages: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Runs an extraction non-interactively and summarises it.
+
+    Parameters:
+    - mode: 'markdown', 'images' or 'batch' (both, parsing each PDF once).
+    - inputs: PDF files, folders (searched recursively) or glob patterns.
+    - output_dir: Directory where the output will be saved.
+    - dpi: Resolution of the extracted images.
+    - image_format: Image file format, e.g. 'png' or 'jpg'.
+    - workers: Number of worker processes (default: number of CPUs).
+    - force: Reprocess PDFs even when their outputs are up to date.
+    - chunk_pages: Pages per chunk in markdown mode (default: whole document).
+    - cache_dir: Directory of a ConversionCache reused across runs in markdown mode.
 
-    for pdf_file in pdf_files:
-        pdf_path = os.path.join(folder_path, pdf_file)
-        print(f"\nProcessing: {pdf_path}")
+    Returns:
+    - JSON-serialisable summary with per-file results and timings.
+    """
+    start = time.perf_counter()
+    pdf_paths = find_pdfs(inputs)
+    cache = ConversionCache(cache_dir) if cache_dir else None
+    results = process_pdfs(pdf_paths, output_dir, mode=mode, workers=workers, force=force,
+                           dpi=dpi, image_format=image_format, chunk_pages=chunk_pages,
+                           cache=cache)
+    seconds = time.perf_counter() - start
+    counts = {status: sum(1 for r in results if r["status"] == status)
+              for status in ("done", "skipped", "error")}
+    return {
+        "mode": mode,
+        "output_dir": str(output_dir),
+        "workers": workers or os.cpu_count(),
+        "files": results,
+        "total": len(results),
+        **counts,
+        "seconds": round(seconds, 3),
+        "files_per_second": round(len(results) / seconds, 3) if seconds else None,
+    }
+
+def main(argv=None):
+    """
+    Command line entry point; runs the interactive prompts when called without arguments.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        extract_pdf()
+        return 0
 
-        # Extract Markdown and images for each PDF
-        extract_markdown(pdf_path, output_path)
-        extract_images(pdf_path, output_path)
+    parser = argparse.ArgumentParser(description="Extract Markdown text and images from PDF files.")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    for mode, help_text in (
+        ("markdown", "Extract PDFs to Markdown"),
+        ("images", "Extract images with a Markdown file referencing them"),
+        ("batch", "Extract both Markdown and images, parsing each PDF once"),
+    ):
+        sub = subparsers.add_parser(mode, help=help_text)
+        sub.add_argument("inputs", nargs="+", help="PDF files, folders or glob patterns ('**' recurses)")
+        sub.add_argument("-o", "--output-dir", default="output", help="Output directory (default: output)")
+        sub.add_argument("-j", "--workers", type=int, help="Worker processes (default: number of CPUs)")
+        sub.add_argument("--force", action="store_true", help="Reprocess up-to-date PDFs")
+        sub.add_argument("--json", metavar="PATH", help="Write a JSON summary to PATH ('-' for stdout)")
+        if mode in ("images", "batch"):
+            sub.add_argument("--dpi", type=int, default=300, help="Image resolution (default: 300)")
+            sub.add_argument("--image-format", default="png", help="Image format (default: png)")
+        if mode == "markdown":
+            sub.add_argument("--chunk-pages", type=int, help="Stream the Markdown in chunks of N pages")
+            sub.add_argument("--cache-dir", help="Reuse conversions of identical PDFs cached in this directory")
+    args = parser.parse_args(argv)
 
-    print(f"\nBatch processing completed. Outputs saved in '{output_path}'.")
+    kwargs = dict(
+        mode=args.mode, inputs=args.inputs, output_dir=args.output_dir, workers=args.workers,
+        force=args.force, dpi=getattr(args, "dpi", 300),
+        image_format=getattr(args, "image_format", "png"),
+        chunk_pages=getattr(args, "chunk_pages", None),
+        cache_dir=getattr(args, "cache_dir", None),
+    )
+    if args.json == "-":
+        # Keep stdout clean for the JSON document
+        with contextlib.redirect_stdout(sys.stderr):
+            summary = run_extraction(**kwargs)
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    else:
+        summary = run_extraction(**kwargs)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+    return 1 if summary["error"] else 0
 
 if __name__ == "__main__":
-    extract_pdf()
+    sys.exit(main())
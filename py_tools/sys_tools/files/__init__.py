@@ -1 +1,47 @@
-from .filer import *
+from ..._lazy import attach
+
+# Public names and the submodule defining them, imported on first access
+_EXPORTS = {
+    'FileRecord': '.filer',
+    'FolderRecord': '.filer',
+    'RuleMatch': '.filer',
+    'iter_dir': '.filer',
+    'iter_ends_with': '.filer',
+    'iter_starts_with': '.filer',
+    'iter_file_name_match': '.filer',
+    'iter_glob_match': '.filer',
+    'iter_match_rules': '.filer',
+    'iter_file_attrs': '.filer',
+    'iter_traverse_directory': '.filer',
+    'list_dir': '.filer',
+    'ends_with': '.filer',
+    'starts_with': '.filer',
+    'file_name_match': '.filer',
+    'glob_match': '.filer',
+    'get_date': '.filer',
+    'format_dates': '.filer',
+    'format_dates_numpy': '.filer',
+    'get_file_attrs_modif_time': '.filer',
+    'get_file_attrs_size': '.filer',
+    'traverse_directory': '.filer',
+    'copy_file': '.filer',
+    'copy_folder': '.filer',
+    'move_file': '.filer',
+    'rename_file': '.filer',
+    'remove_file': '.filer',
+    'match_rules': '.filer',
+    'FileIndex': '.index',
+    'PatternMatcher': '.matcher',
+    'LineSink': '.sinks',
+    'file_sink': '.sinks',
+    'stdout_sink': '.sinks',
+    'scan': '.scanner',
+    'walk': '.scanner',
+    'bulk_copy': '.transfer',
+    'bulk_move': '.transfer',
+    'copy_tree': '.transfer',
+}
+
+__getattr__, __dir__, __all__ = attach(
+    __name__, _EXPORTS, submodules=('filer', 'index', 'matcher', 'scanner', 'sinks', 'transfer')
+)
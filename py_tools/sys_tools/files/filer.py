@@ -1,133 +1,406 @@
-import os
 import fnmatch
+import os
 import shutil
-from pathlib import Path
-from datetime import datetime
+from pathlib import Path, PurePath
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Iterator, NamedTuple, Optional
+
+from .matcher import PatternMatcher, Rule
+from .scanner import scan, walk
+from .sinks import emit, file_sink, stdout_sink
+
+
+class FileRecord(NamedTuple):
+    """A file or folder found while scanning; size and mtime are set when stat'ed."""
+    path: str
+    name: str
+    is_dir: bool
+    size: Optional[int] = None
+    mtime: Optional[float] = None
+
+
+class RuleMatch(NamedTuple):
+    """A file accepted by ``iter_match_rules`` with the include rule it matched."""
+    record: FileRecord
+    rule: Optional[Rule]
+
+
+class FolderRecord(NamedTuple):
+    """A folder visited by ``iter_traverse_directory`` with the files it contains."""
+    path: str
+    files: tuple
+
+
+def _record(entry, stat=False):
+    try:
+        is_dir = entry.is_dir()
+    except OSError:
+        is_dir = False
+    if not stat:
+        return FileRecord(entry.path, entry.name, is_dir)
+    info = entry.stat()
+    return FileRecord(entry.path, entry.name, is_dir, info.st_size, info.st_mtime)
+
+
+def _or_stdout(sinks):
+    return (stdout_sink(),) if sinks is None else sinks
 
 
 # Locating group
 
-def list_dir(folder):
+def iter_dir(folder, recursive: bool = False) -> Iterator[FileRecord]:
+    """
+    Yield the files in a folder
+
+    :param folder: folder to scan
+    :param recursive: bool also list subfolders
+    :return: generator of FileRecord
+    """
+    for entry in scan(folder, recursive=recursive):
+        yield _record(entry)
+
+
+def list_dir(folder, recursive=False, sinks=None):
     """
     List files in a folder
 
     :param folder: folder to scan
-    :return: None
+    :param recursive: bool also list subfolders
+    :param sinks: iterable of sinks receiving the names (default: stdout and list_dir.txt)
+    :return: int number of files listed
+    """
+    if sinks is None:
+        sinks = (stdout_sink(), file_sink('list_dir.txt'))
+    if recursive:
+        return emit(iter_dir(folder, recursive), sinks, lambda r: os.path.relpath(r.path, folder))
+    return emit(iter_dir(folder), sinks, lambda r: r.name)
+
+
+def _iter_matching(folder, search, kind, recursive):
+    matcher = PatternMatcher(search, kind=kind)
+    for entry in scan(folder, recursive=recursive):
+        if matcher.match(entry.name) is not None:
+            yield _record(entry)
+
+
+def iter_ends_with(folder: str, search, recursive: bool = False) -> Iterator[FileRecord]:
+    """
+    Yield files in a folder that end with a specific string
+
+    :param folder: str folder to scan
+    :param search: str or iterable of str strings to search for
+    :param recursive: bool also scan subfolders
+    :return: generator of FileRecord
     """
-    with open('list_dir.txt', 'w') as f:
-        for file_name in os.listdir(folder):
-            f.write(file_name + '\n')
-            print(file_name)
+    return _iter_matching(folder, search, 'suffix', recursive)
 
 
-def ends_with(folder: str, search: str) -> None:
+def ends_with(folder: str, search, recursive: bool = False, sinks=None) -> int:
     """
     List files in a folder that end with a specific string
 
     :param folder: str folder to scan
-    :param search: str string to search for
-    :return: None
+    :param search: str or iterable of str strings to search for
+    :param recursive: bool also scan subfolders
+    :param sinks: iterable of sinks receiving the names (default: stdout)
+    :return: int number of files listed
     """
-    for file_name in os.listdir(folder):
-        if file_name.endswith(search):
-            print(file_name)
+    return emit(iter_ends_with(folder, search, recursive), _or_stdout(sinks), lambda r: r.name)
 
 
-def starts_with(folder: str, search: str) -> None:
+def iter_starts_with(folder: str, search, recursive: bool = False) -> Iterator[FileRecord]:
+    """
+    Yield files in a folder that start with a specific string
+
+    :param folder: str folder to scan
+    :param search: str or iterable of str strings to search for
+    :param recursive: bool also scan subfolders
+    :return: generator of FileRecord
+    """
+    return _iter_matching(folder, search, 'prefix', recursive)
+
+
+def starts_with(folder: str, search, recursive: bool = False, sinks=None) -> int:
     """
     List files in a folder that start with a specific string
 
     :param folder: str folder to scan
-    :param search: str string to search for
-    :return: None
+    :param search: str or iterable of str strings to search for
+    :param recursive: bool also scan subfolders
+    :param sinks: iterable of sinks receiving the names (default: stdout)
+    :return: int number of files listed
+    """
+    return emit(iter_starts_with(folder, search, recursive), _or_stdout(sinks), lambda r: r.name)
+
+
+def iter_file_name_match(folder: str, search, recursive: bool = False) -> Iterator[FileRecord]:
     """
-    for file_name in os.listdir(folder):
-        if file_name.startswith(search):
-            print(file_name)
+    Yield files in a folder that match a specific string
 
+    :param folder: str folder to scan
+    :param search: str or iterable of str strings to search for
+    :param recursive: bool also scan subfolders
+    :return: generator of FileRecord
+    """
+    return _iter_matching(folder, search, 'glob', recursive)
 
-def file_name_match(folder: str, search: str) -> None:
+
+def file_name_match(folder: str, search, recursive: bool = False, sinks=None) -> int:
     """
     List files in a folder that match a specific string
 
     :param folder: str folder to scan
-    :param search: str string to search for
-    :return: None
+    :param search: str or iterable of str strings to search for
+    :param recursive: bool also scan subfolders
+    :param sinks: iterable of sinks receiving the names (default: stdout)
+    :return: int number of files listed
     """
-    for file_name in os.listdir(folder):
-        if fnmatch.fnmatch(file_name, search):
-            print(file_name)
+    return emit(iter_file_name_match(folder, search, recursive), _or_stdout(sinks), lambda r: r.name)
 
 
-def glob_match(folder: str, search: str) -> None:
+def _match_parts(pattern: tuple, parts: tuple) -> bool:
+    """
+    Whether path components match glob components, ``**`` matching any number of them.
+    """
+    if not pattern:
+        return not parts
+    head, rest = pattern[0], pattern[1:]
+    if head == '**':
+        return any(_match_parts(rest, parts[i:]) for i in range(len(parts) + 1))
+    return bool(parts) and fnmatch.fnmatch(parts[0], head) and _match_parts(rest, parts[1:])
+
+
+def iter_glob_match(folder: str, search: str, recursive: bool = False) -> Iterator[FileRecord]:
+    """
+    Yield files in a folder that match a specific string
+
+    Patterns have the meaning of ``Path(folder).glob(search)``: they are
+    matched against the whole path relative to ``folder`` and ``**`` matches
+    any number of folders (only folders when it ends the pattern). Only the
+    folders a pattern without ``**`` can reach are scanned.
+
+    :param folder: str folder to scan
+    :param search: str string to search for
+    :param recursive: bool also match in subfolders, as if search started with '**/'
+    :return: generator of FileRecord
+    """
+    pattern = PurePath(search)
+    if pattern.is_absolute() or pattern.anchor:
+        raise NotImplementedError('Non-relative patterns are unsupported')
+    parts = pattern.parts
+    if not parts:
+        raise ValueError(f'Unacceptable pattern: {search!r}')
+    if recursive and parts[0] != '**':
+        parts = ('**',) + parts
+
+    if '**' in parts:
+        folders_only = parts[-1] == '**'
+        try:
+            for entry in scan(folder, recursive=True):
+                if _match_parts(parts, PurePath(os.path.relpath(entry.path, folder)).parts):
+                    record = _record(entry)
+                    if record.is_dir or not folders_only:
+                        yield record
+        except OSError:
+            # Like Path.glob, a folder that cannot be read matches nothing
+            pass
+        return
+
+    # Walk down one pattern component at a time
+    folders = [folder]
+    for depth, part in enumerate(parts):
+        last = depth == len(parts) - 1
+        matched = []
+        for path in folders:
+            try:
+                entries = list(scan(path))
+            except OSError:
+                continue
+            for entry in entries:
+                if not fnmatch.fnmatch(entry.name, part):
+                    continue
+                record = _record(entry)
+                if last:
+                    yield record
+                elif record.is_dir:
+                    matched.append(record.path)
+        folders = matched
+
+
+def glob_match(folder: str, search: str, recursive: bool = False, sinks=None) -> int:
     """
     List files in a folder that match a specific string
 
     :param folder: str folder to scan
     :param search: str string to search for
-    :return: None
+    :param recursive: bool also scan subfolders
+    :param sinks: iterable of sinks receiving the paths (default: stdout)
+    :return: int number of files listed
+    """
+    return emit(iter_glob_match(folder, search, recursive), _or_stdout(sinks), lambda r: r.path)
+
+
+def iter_match_rules(folder: str, include=(), exclude=(), kind: str = 'glob',
+                     recursive: bool = False) -> Iterator[RuleMatch]:
+    """
+    Yield files in a folder with the include rule they matched
+
+    All include and exclude patterns are evaluated in a single pass; files
+    matching an exclude pattern, or no include pattern, are skipped.
+
+    :param folder: str folder to scan
+    :param include: iterable of patterns selecting files (all files when empty)
+    :param exclude: iterable of patterns rejecting files
+    :param kind: str pattern kind: 'glob', 'suffix' or 'prefix'
+    :param recursive: bool also scan subfolders
+    :return: generator of RuleMatch
     """
-    p = Path(folder)
-    n: Path
-    for n in p.glob(search):
-        print(n)
+    matcher = PatternMatcher(include, exclude, kind=kind)
+    for entry in scan(folder, recursive=recursive):
+        rule = matcher.match(entry.name)
+        if rule is None and not matcher.include_all or rule is not None and rule.exclude:
+            continue
+        yield RuleMatch(_record(entry), rule)
+
+
+def match_rules(folder: str, include=(), exclude=(), kind: str = 'glob',
+                recursive: bool = False, sinks=None) -> int:
+    """
+    List files in a folder with the include rule they matched
+
+    :param folder: str folder to scan
+    :param include: iterable of patterns selecting files (all files when empty)
+    :param exclude: iterable of patterns rejecting files
+    :param kind: str pattern kind: 'glob', 'suffix' or 'prefix'
+    :param recursive: bool also scan subfolders
+    :param sinks: iterable of sinks receiving the lines (default: stdout)
+    :return: int number of files listed
+    """
+    return emit(
+        iter_match_rules(folder, include, exclude, kind, recursive),
+        _or_stdout(sinks),
+        lambda m: f'{m.rule.pattern if m.rule else "*"}\t{m.record.path}',
+    )
 
 
 # Manipulating group
 
+SECONDS_PER_DAY = 86400
+
+
+@lru_cache(maxsize=4096)
+def _day_label(day: int) -> str:
+    return datetime.fromtimestamp(day * SECONDS_PER_DAY, tz=timezone.utc).strftime('%d %b %Y')
+
+
 def get_date(time_stamp: float) -> str:
     """
     Get date from time stamp in seconds since the epoch
 
+    Labels are memoized per UTC day, so files modified on the same day share
+    a single datetime conversion.
+
     :param time_stamp: float time stamp in seconds since the epoch
     :return: str date in format 'dd mmm yyyy'
     """
-    # return datetime.utcfromtimestamp(time_stamp).strftime('%d %b %Y') # < Python 3.3
-    return datetime.fromtimestamp(time_stamp, tz='UTC').strftime('%d %b %Y') # >= Python 3.3
+    return _day_label(int(time_stamp // SECONDS_PER_DAY))
+
 
+def format_dates(time_stamps) -> list:
+    """
+    Get dates for many time stamps
 
-def get_file_attrs_modif_time(folder: str) -> None:
+    :param time_stamps: iterable of float time stamps in seconds since the epoch
+    :return: list of str dates in format 'dd mmm yyyy'
+    """
+    return [_day_label(int(t // SECONDS_PER_DAY)) for t in time_stamps]
+
+
+def format_dates_numpy(time_stamps):
+    """
+    Get dates for many time stamps at once with NumPy
+
+    Time stamps are bucketed into ``datetime64[D]`` days in one vectorized
+    step and only the distinct days are formatted.
+
+    :param time_stamps: array-like of float time stamps in seconds since the epoch
+    :return: numpy.ndarray of str dates in format 'dd mmm yyyy'
+    """
+    import numpy as np
+
+    seconds = np.floor(np.asarray(time_stamps, dtype='float64')).astype('int64')
+    days = seconds.astype('datetime64[s]').astype('datetime64[D]')
+    unique_days, inverse = np.unique(days, return_inverse=True)
+    labels = np.array([_day_label(int(d)) for d in unique_days.astype('int64')])
+    return labels[inverse.reshape(-1)]
+
+
+def iter_file_attrs(folder: str, recursive: bool = False) -> Iterator[FileRecord]:
+    """
+    Yield the files in a folder with their size and modification time
+
+    :param folder: str folder to scan
+    :param recursive: bool also scan subfolders
+    :return: generator of FileRecord
+    """
+    for f in scan(folder, recursive=recursive):
+        if f.is_file():
+            yield _record(f, stat=True)
+
+
+def get_file_attrs_modif_time(folder: str, recursive: bool = False, sinks=None) -> int:
     """
     Get file modification date and time
 
     :param folder: str folder to scan
-    :return: None
+    :param recursive: bool also scan subfolders
+    :param sinks: iterable of sinks receiving the lines (default: stdout)
+    :return: int number of files listed
     """
-    with os.scandir(folder) as directory:
-        for f in directory:
-            if f.is_file():
-                info = f.stat()
-                print(f'Modified {get_date(info.st_mtime)} {f.name}')
+    return emit(iter_file_attrs(folder, recursive), _or_stdout(sinks),
+                lambda r: f'Modified {get_date(r.mtime)} {r.name}')
 
 
-def get_file_attrs_size(folder: str) -> None:
+def get_file_attrs_size(folder: str, recursive: bool = False, sinks=None) -> int:
     """
     Get file size
 
     :param folder: str folder to scan
-    :return: None
+    :param recursive: bool also scan subfolders
+    :param sinks: iterable of sinks receiving the lines (default: stdout)
+    :return: int number of files listed
+    """
+    return emit(iter_file_attrs(folder, recursive), _or_stdout(sinks),
+                lambda r: f'{r.name} {r.size} bytes')
+
+
+def iter_traverse_directory(folder: str) -> Iterator[FolderRecord]:
+    """
+    Traverse a directory, yielding each folder with its files
+
+    :param folder: str folder to traverse
+    :return: generator of FolderRecord
     """
-    with os.scandir(folder) as directory:
-        for f in directory:
-            if f.is_file():
-                info = f.stat()
-                print(f'{f.name} {info.st_size} bytes')
+    for folder_path, entries in walk(folder):
+        files = tuple(_record(entry) for entry in entries)
+        yield FolderRecord(folder_path, tuple(r for r in files if not r.is_dir))
 
 
-def traverse_directory(folder: str) -> None:
+def traverse_directory(folder: str, sinks=None) -> int:
     """
     Traverse a directory
 
     :param folder: str folder to traverse
-    :return: None
+    :param sinks: iterable of sinks receiving the lines (default: traverse_directory.txt)
+    :return: int number of folders visited
     """
-    with open('traverse_directory.txt', 'w', encoding='utf_8') as f:
-        for folder_path, _, files in os.walk(folder):
-            f.write(f'Folder: {folder_path}\n')
-            # print(f'Folder: {folder_path}')
-            for file_name in files:
-                f.write(f'\t{file_name}\n')
-                # print(f'\t{file_name}')
+    if sinks is None:
+        sinks = (file_sink('traverse_directory.txt'),)
+    return emit(
+        iter_traverse_directory(folder), sinks,
+        lambda d: [f'Folder: {d.path}', *(f'\t{f.name}' for f in d.files)],
+    )
 
 
 def copy_file(src: str, dst: str) -> None:
@@ -0,0 +1,257 @@
+"""
+Persistent file-metadata index backed by SQLite.
+
+A tree is scanned once into the index (path, size, mtime, inode and mode of
+every file). Later refreshes only rescan directories whose own mtime
+changed, i.e. where entries were created, deleted or renamed, so queries
+such as "files larger than N modified before D" are answered from the
+database instead of re-walking the tree.
+
+Note that rewriting a file in place does not change its directory's mtime;
+such files keep their previous size and mtime until the directory is
+rescanned (see ``FileIndex.build``).
+
+Usage:
+    with FileIndex('files.db') as index:
+        index.refresh('/data')
+        for f in index.find(min_size=10**9, modified_before=datetime(2024, 1, 1)):
+            print(f.path, f.size)
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import NamedTuple
+
+from .scanner import walk
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    inode INTEGER NOT NULL,
+    mode INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+CREATE INDEX IF NOT EXISTS files_size ON files (size);
+CREATE INDEX IF NOT EXISTS files_mtime ON files (mtime);
+'''
+
+
+class IndexedFile(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+    inode: int
+    mode: int
+
+
+class RefreshStats(NamedTuple):
+    checked: int
+    rescanned: int
+    removed: int
+
+
+def _timestamp(value):
+    """Accept a datetime or a POSIX timestamp."""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+def _subtree_bounds(path):
+    """Key range covering every path strictly below ``path``."""
+    prefix = path.rstrip(os.sep) + os.sep
+    # The character after the separator closes the half-open range
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class FileIndex:
+    """
+    On-disk index of file metadata.
+
+    :param db_path: str path of the SQLite database (created if missing)
+    """
+
+    def __init__(self, db_path):
+        self.db_path = os.fspath(db_path)
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    # Populating
+
+    def _store_dir(self, folder, mtime_ns, entries):
+        """Replace the indexed content of one directory, return its subdirectories."""
+        rows = []
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            rows.append((entry.path, folder, st.st_size, st.st_mtime, st.st_ino, st.st_mode))
+        self._conn.execute('DELETE FROM files WHERE dir = ?', (folder,))
+        self._conn.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)', rows)
+        self._conn.execute(
+            'INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)',
+            (folder, os.path.dirname(folder), mtime_ns),
+        )
+        return subdirs
+
+    def _forget(self, folder):
+        """Drop a directory and everything below it from the index."""
+        low, high = _subtree_bounds(folder)
+        self._conn.execute('DELETE FROM files WHERE dir = ? OR (dir >= ? AND dir < ?)',
+                           (folder, low, high))
+        self._conn.execute('DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)',
+                           (folder, low, high))
+
+    def build(self, root, workers=None):
+        """
+        Index a tree from scratch, replacing anything indexed below it.
+
+        :param root: str folder to index
+        :param workers: int number of scanning threads
+        :return: int number of directories indexed
+        """
+        root = os.path.abspath(root)
+        count = 0
+        with self._conn:
+            self._forget(root)
+            for folder, entries in walk(root, workers=workers):
+                try:
+                    mtime_ns = os.stat(folder).st_mtime_ns
+                except OSError:
+                    continue
+                self._store_dir(folder, mtime_ns, entries)
+                count += 1
+        return count
+
+    def refresh(self, root):
+        """
+        Bring the index up to date, rescanning only directories whose mtime changed.
+
+        :param root: str folder to refresh (indexed in full on first use)
+        :return: RefreshStats
+        """
+        root = os.path.abspath(root)
+        checked = rescanned = removed = 0
+        stack = [root]
+        with self._conn:
+            while stack:
+                folder = stack.pop()
+                checked += 1
+                try:
+                    mtime_ns = os.stat(folder).st_mtime_ns
+                except OSError:
+                    self._forget(folder)
+                    removed += 1
+                    continue
+                row = self._conn.execute(
+                    'SELECT mtime_ns FROM dirs WHERE path = ?', (folder,)
+                ).fetchone()
+                known = [path for path, in self._conn.execute(
+                    'SELECT path FROM dirs WHERE parent = ? AND path != ?', (folder, folder)
+                )]
+                if row is not None and row[0] == mtime_ns:
+                    stack.extend(known)
+                    continue
+                rescanned += 1
+                try:
+                    with os.scandir(folder) as directory:
+                        subdirs = self._store_dir(folder, mtime_ns, list(directory))
+                except OSError:
+                    self._forget(folder)
+                    removed += 1
+                    continue
+                for gone in set(known) - set(subdirs):
+                    self._forget(gone)
+                    removed += 1
+                stack.extend(subdirs)
+        return RefreshStats(checked, rescanned, removed)
+
+    # Querying
+
+    def find(self, min_size=None, max_size=None, modified_before=None,
+             modified_after=None, under=None, order_by='path', limit=None):
+        """
+        Query indexed files.
+
+        :param min_size: int only files of at least this many bytes
+        :param max_size: int only files of at most this many bytes
+        :param modified_before: datetime or float only files modified before this
+        :param modified_after: datetime or float only files modified after this
+        :param under: str only files below this folder
+        :param order_by: str 'path', 'size' or 'mtime' ('-size' for descending)
+        :param limit: int maximum number of results
+        :return: generator of IndexedFile
+        """
+        clauses = []
+        params = []
+        if min_size is not None:
+            clauses.append('size >= ?')
+            params.append(min_size)
+        if max_size is not None:
+            clauses.append('size <= ?')
+            params.append(max_size)
+        if modified_before is not None:
+            clauses.append('mtime < ?')
+            params.append(_timestamp(modified_before))
+        if modified_after is not None:
+            clauses.append('mtime > ?')
+            params.append(_timestamp(modified_after))
+        if under is not None:
+            under = os.path.abspath(under)
+            low, high = _subtree_bounds(under)
+            clauses.append('(dir = ? OR (dir >= ? AND dir < ?))')
+            params.extend((under, low, high))
+        column = order_by.lstrip('-')
+        if column not in IndexedFile._fields:
+            raise ValueError(f'Cannot order by {order_by!r}')
+        sql = 'SELECT path, size, mtime, inode, mode FROM files'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += f' ORDER BY {column} {"DESC" if order_by.startswith("-") else "ASC"}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        for row in self._conn.execute(sql, params):
+            yield IndexedFile(*row)
+
+    def total_size(self, under=None):
+        """
+        Sum the size of indexed files.
+
+        :param under: str only count files below this folder
+        :return: int total size in bytes
+        """
+        if under is None:
+            return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM files').fetchone()[0]
+        under = os.path.abspath(under)
+        low, high = _subtree_bounds(under)
+        return self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM files WHERE dir = ? OR (dir >= ? AND dir < ?)',
+            (under, low, high),
+        ).fetchone()[0]
@@ -0,0 +1,124 @@
+"""
+Multi-pattern name matcher for the filer functions.
+
+Many include/exclude patterns are compiled once and evaluated in a single
+pass per name:
+
+- ``glob`` patterns are translated with ``fnmatch`` and merged into one
+  alternation of named groups, so one regex match tells which rule hit;
+- ``suffix`` and ``prefix`` patterns are plain strings looked up in hash
+  tables bucketed by length, one slice per distinct length.
+
+When several rules match a name the first declared one wins.
+"""
+
+import fnmatch
+import re
+from typing import Iterable, NamedTuple, Optional
+
+KINDS = ('glob', 'suffix', 'prefix')
+
+
+class Rule(NamedTuple):
+    index: int
+    kind: str
+    pattern: str
+    exclude: bool
+
+
+class _RuleSet:
+    """Compiled form of the rules of one polarity (include or exclude)."""
+
+    def __init__(self, rules):
+        globs = [r for r in rules if r.kind == 'glob']
+        self._groups = {f'r{r.index}': r for r in globs}
+        self._regex = None
+        if globs:
+            self._regex = re.compile('|'.join(
+                f'(?P<r{r.index}>{fnmatch.translate(r.pattern)})' for r in globs
+            ))
+        self._suffixes = self._bucket(r for r in rules if r.kind == 'suffix')
+        self._prefixes = self._bucket(r for r in rules if r.kind == 'prefix')
+
+    @staticmethod
+    def _bucket(rules):
+        """Map length -> {pattern: rule}, keeping the first rule per pattern."""
+        buckets = {}
+        for rule in rules:
+            buckets.setdefault(len(rule.pattern), {}).setdefault(rule.pattern, rule)
+        return sorted(buckets.items())
+
+    def match(self, name):
+        best = None
+        if self._regex is not None:
+            m = self._regex.match(name)
+            if m:
+                # The enclosing rule group closes last, after any inner groups
+                best = self._groups[m.lastgroup]
+        for length, table in self._suffixes:
+            if length > len(name):
+                break
+            rule = table.get(name[len(name) - length:])
+            if rule is not None and (best is None or rule.index < best.index):
+                best = rule
+        for length, table in self._prefixes:
+            if length > len(name):
+                break
+            rule = table.get(name[:length])
+            if rule is not None and (best is None or rule.index < best.index):
+                best = rule
+        return best
+
+
+class PatternMatcher:
+    """
+    Match names against many include and exclude patterns at once.
+
+    :param include: iterable of include patterns, every name is included when empty
+    :param exclude: iterable of exclude patterns
+    :param kind: str default pattern kind, one of 'glob', 'suffix' or 'prefix'
+
+    A pattern may also be given as a ``(kind, pattern)`` tuple to mix kinds.
+    """
+
+    def __init__(self, include: Iterable = (), exclude: Iterable = (), kind: str = 'glob'):
+        if kind not in KINDS:
+            raise ValueError(f'Unknown pattern kind {kind!r}, expected one of {KINDS}')
+        rules = []
+        for patterns, is_exclude in ((include, False), (exclude, True)):
+            if isinstance(patterns, str):
+                patterns = [patterns]
+            for pattern in patterns:
+                rule_kind = kind
+                if isinstance(pattern, tuple):
+                    rule_kind, pattern = pattern
+                    if rule_kind not in KINDS:
+                        raise ValueError(f'Unknown pattern kind {rule_kind!r}, expected one of {KINDS}')
+                rules.append(Rule(len(rules), rule_kind, pattern, is_exclude))
+        self.rules = tuple(rules)
+        self._include = _RuleSet([r for r in rules if not r.exclude])
+        self._exclude = _RuleSet([r for r in rules if r.exclude])
+        self.include_all = not any(not r.exclude for r in rules)
+
+    def match(self, name: str) -> Optional[Rule]:
+        """
+        Find the rule deciding a name.
+
+        :param name: str name to test
+        :return: the matching exclude rule, else the matching include rule, else None
+        """
+        rule = self._exclude.match(name)
+        if rule is not None:
+            return rule
+        return self._include.match(name)
+
+    def accepts(self, name: str) -> bool:
+        """
+        Tell whether a name is included and not excluded.
+
+        :param name: str name to test
+        :return: bool
+        """
+        if self._exclude.match(name) is not None:
+            return False
+        return self.include_all or self._include.match(name) is not None
@@ -0,0 +1,105 @@
+"""
+Directory scanner engine shared by the filer functions.
+
+Directories are read with ``os.scandir`` so the ``d_type`` reported by the
+kernel is reused for ``is_dir``/``is_file`` checks and ``stat`` results are
+cached on each entry. In recursive mode subdirectories are scanned
+concurrently on a thread pool, which keeps many requests in flight on
+network file systems where every ``readdir`` is a round trip.
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def _read_dir(folder, follow_symlinks, strict=False):
+    """
+    Read one directory.
+
+    :param folder: str directory to read
+    :param follow_symlinks: bool descend into symlinked directories
+    :param strict: bool raise OSError when the directory cannot be read (default: skip it)
+    :return: tuple (folder, entries, subdirectories)
+    """
+    entries = []
+    subdirs = []
+    try:
+        with os.scandir(folder) as directory:
+            for entry in directory:
+                entries.append(entry)
+                try:
+                    if entry.is_dir(follow_symlinks=follow_symlinks):
+                        subdirs.append(entry.path)
+                except OSError:
+                    pass
+    except OSError:
+        if strict:
+            raise
+        # Unreadable or vanished subdirectory: skip it like os.walk does
+    return folder, entries, subdirs
+
+
+def _dir_key(folder):
+    try:
+        st = os.stat(folder)
+    except OSError:
+        return folder
+    return st.st_dev, st.st_ino
+
+
+def walk(folder, recursive=True, workers=None, follow_symlinks=False):
+    """
+    Scan a directory tree, yielding the entries of one directory at a time.
+
+    Directories are yielded in completion order, not in sorted or
+    depth-first order. OSError is raised when folder itself cannot be read;
+    unreadable subfolders are skipped.
+
+    :param folder: str folder to scan
+    :param recursive: bool also scan subdirectories
+    :param workers: int number of scanning threads (default: DEFAULT_WORKERS)
+    :param follow_symlinks: bool descend into symlinked directories
+    :return: generator of tuples (folder path, list of os.DirEntry)
+    """
+    folder = os.fspath(folder)
+    if not recursive:
+        path, entries, _ = _read_dir(folder, follow_symlinks, strict=True)
+        yield path, entries
+        return
+
+    pool = ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS)
+    # Guard against symlink loops when following links
+    seen = {_dir_key(folder)} if follow_symlinks else None
+    try:
+        pending = {pool.submit(_read_dir, folder, follow_symlinks, True)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, entries, subdirs = future.result()
+                for subdir in subdirs:
+                    if seen is not None:
+                        key = _dir_key(subdir)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                    pending.add(pool.submit(_read_dir, subdir, follow_symlinks))
+                yield path, entries
+    finally:
+        # Stop queued scans when the caller abandons the generator early
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def scan(folder, recursive=False, workers=None, follow_symlinks=False):
+    """
+    Scan a directory (tree), yielding one ``os.DirEntry`` per item found.
+
+    :param folder: str folder to scan
+    :param recursive: bool also scan subdirectories
+    :param workers: int number of scanning threads (default: DEFAULT_WORKERS)
+    :param follow_symlinks: bool descend into symlinked directories
+    :return: generator of os.DirEntry
+    """
+    for _, entries in walk(folder, recursive, workers, follow_symlinks):
+        yield from entries
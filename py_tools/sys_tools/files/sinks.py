@@ -0,0 +1,98 @@
+"""
+Output sinks for the filer functions.
+
+A sink receives formatted lines and writes them to a text stream in
+batches, so listing a huge directory to a pipe or file costs one write
+call per batch instead of one flush per line.
+"""
+
+import sys
+
+DEFAULT_BATCH_SIZE = 1024
+
+
+class LineSink:
+    """
+    Buffered line writer.
+
+    :param stream: text stream to write to
+    :param batch_size: int number of lines buffered between writes
+    :param close_stream: bool close the stream when the sink is closed
+    """
+
+    def __init__(self, stream, batch_size=DEFAULT_BATCH_SIZE, close_stream=False):
+        self.stream = stream
+        self.batch_size = batch_size
+        self.close_stream = close_stream
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, line):
+        self._buffer.append(line)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._buffer.append('')
+            self.stream.write('\n'.join(self._buffer))
+            self._buffer.clear()
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+        if self.close_stream:
+            self.stream.close()
+
+
+def stdout_sink(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Sink printing to standard output.
+
+    :param batch_size: int number of lines buffered between writes
+    :return: LineSink
+    """
+    return LineSink(sys.stdout, batch_size)
+
+
+def file_sink(path, batch_size=DEFAULT_BATCH_SIZE, encoding='utf_8'):
+    """
+    Sink writing to a file, truncated first.
+
+    :param path: str file to write
+    :param batch_size: int number of lines buffered between writes
+    :param encoding: str file encoding
+    :return: LineSink
+    """
+    return LineSink(open(path, 'w', encoding=encoding), batch_size, close_stream=True)
+
+
+def emit(records, sinks, fmt=str):
+    """
+    Format records and send every line to all sinks, closing them at the end.
+
+    :param records: iterable of records
+    :param sinks: iterable of LineSink
+    :param fmt: callable turning a record into a line (or a list of lines)
+    :return: int number of records written
+    """
+    sinks = list(sinks)
+    count = 0
+    try:
+        for record in records:
+            lines = fmt(record)
+            if isinstance(lines, str):
+                lines = (lines,)
+            for line in lines:
+                for sink in sinks:
+                    sink.write(line)
+            count += 1
+    finally:
+        for sink in sinks:
+            sink.close()
+    return count
@@ -0,0 +1,307 @@
+"""
+Bulk copy and move engine for the filer functions.
+
+Transfers run on a thread pool. File data is copied with
+``os.copy_file_range`` when the platform has it (in-kernel copy, reflinks
+and server-side copy on NFS 4.2/SMB), else ``os.sendfile``, else a plain
+buffered copy. Metadata is preserved with ``shutil.copystat``.
+
+Completed transfers can be appended to a journal so an interrupted
+migration resumes where it stopped:
+
+    stats = copy_tree('/mnt/old', '/mnt/new', workers=16, journal='migration.journal')
+    print(stats)
+"""
+
+import errno
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .scanner import scan
+
+CHUNK_SIZE = 64 * 1024 * 1024
+DEFAULT_WORKERS = 8
+
+# Errors meaning "this kernel path is not available here", not a failed copy
+_FALLBACK_ERRNOS = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP,
+                    errno.ENOTSUP, errno.EBADF, errno.EPERM}
+
+
+class TransferStats:
+    """Counters of a bulk transfer, with throughput derived from elapsed time."""
+
+    __slots__ = ('files', 'bytes', 'skipped', 'errors', 'started', 'finished')
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.skipped = 0
+        self.errors = []
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def bytes_per_s(self):
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def files_per_s(self):
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (f'TransferStats(files={self.files}, bytes={self.bytes}, skipped={self.skipped}, '
+                f'errors={len(self.errors)}, elapsed={self.elapsed:.2f}s, '
+                f'bytes_per_s={self.bytes_per_s:.0f}, files_per_s={self.files_per_s:.1f})')
+
+
+class Journal:
+    """
+    Append-only record of completed transfers, one JSON ``[src, dst]`` per line.
+
+    :param path: str journal file, created if missing
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self.done = set()
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf_8') as f:
+                for line in f:
+                    try:
+                        src, dst = json.loads(line)
+                    except ValueError:
+                        # Torn last line of an interrupted run
+                        continue
+                    self.done.add((src, dst))
+        self._file = open(self.path, 'a', encoding='utf_8')
+
+    def __contains__(self, pair):
+        return pair in self.done
+
+    def record(self, src, dst):
+        self.done.add((src, dst))
+        self._file.write(json.dumps([src, dst]) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _copy_data(fsrc, fdst):
+    """
+    Copy file contents, using the fastest kernel path available.
+
+    :return: int number of bytes copied
+    """
+    infd, outfd = fsrc.fileno(), fdst.fileno()
+    if hasattr(os, 'copy_file_range'):
+        copied = 0
+        try:
+            while True:
+                n = os.copy_file_range(infd, outfd, CHUNK_SIZE)
+                if not n:
+                    return copied
+                copied += n
+        except OSError as e:
+            if copied or e.errno not in _FALLBACK_ERRNOS:
+                raise
+    if hasattr(os, 'sendfile'):
+        offset = 0
+        try:
+            while True:
+                n = os.sendfile(outfd, infd, offset, CHUNK_SIZE)
+                if not n:
+                    return offset
+                offset += n
+        except OSError as e:
+            if offset or e.errno not in _FALLBACK_ERRNOS:
+                raise
+    copied = 0
+    while True:
+        buf = fsrc.read(1024 * 1024)
+        if not buf:
+            return copied
+        fdst.write(buf)
+        copied += len(buf)
+
+
+def copy_one(src, dst, preserve_metadata=True):
+    """
+    Copy a single file (or symlink), creating the destination folder if needed.
+
+    :param src: str source file
+    :param dst: str destination file
+    :param preserve_metadata: bool copy permission bits, times and flags
+    :return: int number of bytes copied
+    """
+    parent = os.path.dirname(dst)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    if os.path.islink(src):
+        if os.path.lexists(dst):
+            os.remove(dst)
+        os.symlink(os.readlink(src), dst)
+        return 0
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        copied = _copy_data(fsrc, fdst)
+    if preserve_metadata:
+        shutil.copystat(src, dst)
+    return copied
+
+
+def move_one(src, dst, preserve_metadata=True):
+    """
+    Move a single file, renaming when possible and copying across devices.
+
+    :param src: str source file
+    :param dst: str destination file
+    :param preserve_metadata: bool copy permission bits, times and flags when copying
+    :return: int number of bytes copied (0 for a rename)
+    """
+    parent = os.path.dirname(dst)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    try:
+        os.replace(src, dst)
+        return 0
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    copied = copy_one(src, dst, preserve_metadata)
+    os.remove(src)
+    return copied
+
+
+def tree_pairs(src, dst, workers=None, folders=None):
+    """
+    Yield (source, destination) pairs for every file below a folder.
+
+    :param src: str source folder
+    :param dst: str destination folder
+    :param workers: int number of scanning threads
+    :param folders: list to which (src folder, dst folder) pairs are appended; the
+        destination folders, empty ones included, are then created as they are found
+    :return: generator of tuples (src file, dst file)
+    """
+    src = os.fspath(src)
+    dst = os.fspath(dst)
+    if folders is not None:
+        os.makedirs(dst, exist_ok=True)
+        folders.append((src, dst))
+    for entry in scan(src, recursive=True, workers=workers):
+        target = os.path.join(dst, os.path.relpath(entry.path, src))
+        if entry.is_dir(follow_symlinks=False):
+            if folders is not None:
+                os.makedirs(target, exist_ok=True)
+                folders.append((entry.path, target))
+            continue
+        yield entry.path, target
+
+
+def bulk_transfer(pairs, workers=DEFAULT_WORKERS, journal=None, preserve_metadata=True,
+                  move=False, progress=None):
+    """
+    Copy or move many files concurrently.
+
+    Failed items are collected in ``stats.errors`` instead of stopping the batch.
+
+    :param pairs: iterable of (src, dst) file pairs, consumed lazily
+    :param workers: int number of copying threads
+    :param journal: str path of a journal used to skip pairs already transferred
+    :param preserve_metadata: bool copy permission bits, times and flags
+    :param move: bool remove the sources once transferred
+    :param progress: callable receiving the TransferStats after each file
+    :return: TransferStats
+    """
+    stats = TransferStats()
+    journal = Journal(journal) if journal is not None else None
+    operation = move_one if move else copy_one
+    max_pending = workers * 4
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+
+            def collect(done):
+                for future in done:
+                    src, dst = pending.pop(future)
+                    try:
+                        stats.bytes += future.result()
+                    except OSError as e:
+                        stats.errors.append((src, dst, str(e)))
+                        continue
+                    stats.files += 1
+                    if journal is not None:
+                        journal.record(src, dst)
+                    if progress is not None:
+                        progress(stats)
+
+            for src, dst in pairs:
+                src, dst = os.fspath(src), os.fspath(dst)
+                if journal is not None and (src, dst) in journal:
+                    stats.skipped += 1
+                    continue
+                # Bound the queue so a huge generator of pairs is not materialised
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending[pool.submit(operation, src, dst, preserve_metadata)] = (src, dst)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+    finally:
+        stats.finished = time.monotonic()
+        if journal is not None:
+            journal.close()
+    return stats
+
+
+def bulk_copy(pairs, **kwargs):
+    """
+    Copy many files concurrently, see ``bulk_transfer`` for the options.
+
+    :param pairs: iterable of (src, dst) file pairs
+    :return: TransferStats
+    """
+    return bulk_transfer(pairs, move=False, **kwargs)
+
+
+def bulk_move(pairs, **kwargs):
+    """
+    Move many files concurrently, see ``bulk_transfer`` for the options.
+
+    :param pairs: iterable of (src, dst) file pairs
+    :return: TransferStats
+    """
+    return bulk_transfer(pairs, move=True, **kwargs)
+
+
+def copy_tree(src, dst, preserve_metadata=True, **kwargs):
+    """
+    Copy a folder tree concurrently, see ``bulk_transfer`` for the options.
+
+    Every folder is created, empty ones included, and like ``shutil.copytree``
+    folders get the permission bits and times of their source once their
+    contents are copied.
+
+    :param src: str source folder
+    :param dst: str destination folder
+    :param preserve_metadata: bool copy permission bits, times and flags
+    :return: TransferStats
+    """
+    folders = []
+    stats = bulk_transfer(tree_pairs(src, dst, folders=folders), preserve_metadata=preserve_metadata, **kwargs)
+    if preserve_metadata:
+        # Deepest first, so setting a folder's times does not touch its parent's afterwards
+        for src_folder, dst_folder in sorted(folders, key=lambda pair: pair[1].count(os.sep), reverse=True):
+            try:
+                shutil.copystat(src_folder, dst_folder)
+            except OSError as e:
+                stats.errors.append((src_folder, dst_folder, str(e)))
+    return stats
@@ -4,39 +4,276 @@ A simple script to convert to a markdown file with the help of MarkItDown.
 Markitdown is useful for extracting text from a PDF, Office Documents,
 Markup and Rich Media (Images with EXIF, Audio with transcription)
 
+Image descriptions use gpt-4o when OPENAI_API_KEY is set; without it the
+conversion runs fully offline.
+
 Usage:
-    python markdownthis.py input.md output.md
+    python -m py_tools.sys_tools.markdownthis input.md output.md [--cache-dir DIR]
+    python -m py_tools.sys_tools.markdownthis --batch docs/ more.pdf [-o out/] [-j 8]
 License: CCO
 Date: 2024-12-24
 """
 import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from markitdown import MarkItDown
 from openai import OpenAI
+if __package__:
+    from .captioning import async_client, caption_images, is_image, merge_caption
+    from .conversion_cache import ConversionCache, library_version
+else:  # run as a script: python py_tools/sys_tools/markdownthis.py
+    from captioning import async_client, caption_images, is_image, merge_caption
+    from conversion_cache import ConversionCache, library_version
+
+LLM_MODEL = "gpt-4o"
+
+def default_use_llm():
+    """
+    Whether image descriptions are enabled by default.
+
+    Returns:
+        bool: True when an OpenAI API key is configured.
+    """
+    return bool(os.environ.get("OPENAI_API_KEY"))
+
+def build_converter(use_llm=None, llm_model=LLM_MODEL, llm_client=None):
+    """
+    Build a MarkItDown converter, meant to be shared across many files.
+
+    Args:
+        use_llm (bool): Describe images with an LLM (default: default_use_llm()).
+        llm_model (str): Model used for image descriptions.
+        llm_client (OpenAI): Client used for image descriptions (default: OpenAI()).
+
+    Returns:
+        MarkItDown: Converter reusing one HTTP session and one OpenAI client.
+    """
+    if use_llm is None:
+        use_llm = default_use_llm()
+    if not use_llm:
+        return MarkItDown()
+    return MarkItDown(llm_client=llm_client or OpenAI(), llm_model=llm_model)
 
-def mkdownthis(input_file, output_file):
+def _convert(input_file, output_file, get_converter, llm_model, cache):
+    """
+    Convert one file and write the result, building the converter only on a cache miss.
+    """
+    def convert():
+        return get_converter().convert(input_file).text_content
+
+    if cache is None:
+        text = convert()
+    else:
+        text = cache.convert(input_file, "markitdown", convert,
+                             options={"llm_model": llm_model},
+                             version=library_version("markitdown"))
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def mkdownthis(input_file, output_file, cache=None, converter=None, llm_model=None):
     """
     Convert a markdown file to a markdown file with the help of MarkItDown.
 
     Args:
         input_file (str): Path to the input file.
         output_file (str): Path to the output file.
+        cache (ConversionCache): Optional cache; identical files are then converted only once.
+        converter (MarkItDown): Converter to reuse (default: build_converter()).
+        llm_model (str): Model the given converter describes images with, part of
+            the cache key (None: the converter has no LLM).
 
     Returns:
         None
     """
+    if converter is not None:
+        _convert(input_file, output_file, lambda: converter, llm_model, cache)
+    else:
+        use_llm = default_use_llm()
+        _convert(input_file, output_file, lambda: build_converter(use_llm),
+                 LLM_MODEL if use_llm else None, cache)
+    print(f"Conversion complete. Output saved to {output_file}")
+
+def find_inputs(inputs, output_dir=None):
+    """
+    Expand files and folders (searched recursively) into a list of input files.
 
-    client = OpenAI()
-    md = MarkItDown(llm_client=client, llm_model="gpt-4o")
-    result = md.convert(input_file)
+    Outputs of earlier runs found in the folders are skipped: <name>.md next to
+    a file <name> (see output_file_for()) and everything under output_dir.
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(result.text_content)
-    print(f"Conversion complete. Output saved to {output_file}")
+    Args:
+        inputs (list): Paths to files or folders.
+        output_dir (str): Output folder of the batch, never searched.
+
+    Returns:
+        list: Tuples of (input file, folder it was found under or None).
+    """
+    output_dir = os.path.realpath(output_dir) if output_dir is not None else None
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for folder, subfolders, files in os.walk(item):
+                subfolders[:] = [name for name in subfolders
+                                 if os.path.realpath(os.path.join(folder, name)) != output_dir]
+                names = set(files)
+                for name in sorted(files):
+                    if name.endswith(".md") and name[:-3] in names:
+                        continue
+                    found.append((os.path.join(folder, name), item))
+        else:
+            found.append((item, None))
+    return found
+
+def output_file_for(input_file, root=None, output_dir=None):
+    """
+    Output path of a converted file: next to the input, or mirrored under output_dir.
+
+    Args:
+        input_file (str): Path to the input file.
+        root (str): Folder the input was found under, mirrored under output_dir.
+        output_dir (str): Output folder (default: next to the input).
+
+    Returns:
+        str: Path to the Markdown output file.
+    """
+    if output_dir is None:
+        target = input_file
+    elif root is None:
+        target = os.path.join(output_dir, os.path.basename(input_file))
+    else:
+        target = os.path.join(output_dir, os.path.relpath(input_file, root))
+    base, extension = os.path.splitext(target)
+    # Keep the original extension when converting next to the input so that
+    # notes.md is not overwritten by its own output
+    suffix = f"{extension}.md" if output_dir is None else ".md"
+    return base + suffix
+
+def batch_mkdownthis(inputs, output_dir=None, workers=4, cache=None, use_llm=None,
+                     caption_concurrency=8, caption_rate=None, llm_model=LLM_MODEL, llm_client=None):
+    """
+    Convert many files with one shared converter over a bounded thread pool.
+
+    With an LLM, image files are converted without it first and then
+    captioned together in one concurrent, rate-limited stage (see
+    captioning.py) instead of one blocking request per image. The cache
+    then also keeps the captions.
+
+    Args:
+        inputs (list): Paths to files or folders (searched recursively).
+        output_dir (str): Folder mirroring the inputs (default: write next to each input).
+        workers (int): Number of files converted concurrently.
+        cache (ConversionCache): Optional cache of previous conversions.
+        use_llm (bool): Describe images with an LLM (default: default_use_llm()).
+        caption_concurrency (int): Maximum image caption requests in flight.
+        caption_rate (float): Maximum image caption requests started per second.
+        llm_model (str): Model used for image descriptions.
+        llm_client (OpenAI): Client used for image descriptions (default: OpenAI()).
+
+    Returns:
+        list: One dict per file with 'input', 'output', 'status', 'error' and 'seconds' keys.
+    """
+    if use_llm is None:
+        use_llm = default_use_llm()
+    plain_converter = build_converter(False)
+    if use_llm:
+        llm_converter = build_converter(True, llm_model, llm_client)
+    else:
+        llm_converter, llm_model = plain_converter, None
+
+    def convert_one(input_file, root):
+        output_file = output_file_for(input_file, root, output_dir)
+        start = time.perf_counter()
+        result = {"input": input_file, "output": output_file, "status": "done", "error": None}
+        try:
+            os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+            if is_image(input_file):
+                _convert(input_file, output_file, lambda: plain_converter, None, cache)
+            else:
+                _convert(input_file, output_file, lambda: llm_converter, llm_model, cache)
+        except Exception as e:  # one bad file must not stop the batch
+            result["status"] = "error"
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        return result
+
+    files = find_inputs(inputs, output_dir)
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(convert_one, input_file, root) for input_file, root in files]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            message = f"[{len(results)}/{len(files)}] {result['status']} in {result['seconds']}s: {result['input']}"
+            if result["error"]:
+                message += f" - {result['error']}"
+            print(message)
+
+    images = [r for r in results if r["status"] == "done" and is_image(r["input"])]
+    if use_llm and images:
+        caption_all(images, model=llm_model, concurrency=caption_concurrency, rate=caption_rate,
+                    client=async_client(llm_client) if llm_client is not None else None, cache=cache)
+    return results
+
+def caption_all(results, model=LLM_MODEL, concurrency=8, rate=None, client=None, cache=None):
+    """
+    Caption converted images concurrently and merge the captions into their outputs.
+
+    Args:
+        results (list): Batch results of image files, updated in place on failure.
+        model (str): Model used for captions.
+        concurrency (int): Maximum caption requests in flight.
+        rate (float): Maximum caption requests started per second.
+        client (AsyncOpenAI): OpenAI-compatible client (default: AsyncOpenAI()).
+        cache (ConversionCache): Optional cache of captions.
+
+    Returns:
+        None
+    """
+    start = time.perf_counter()
+    captions = asyncio.run(caption_images(
+        [r["input"] for r in results], client=client, model=model,
+        concurrency=concurrency, rate=rate, cache=cache,
+    ))
+    failed = 0
+    for result in results:
+        caption = captions[result["input"]]
+        if isinstance(caption, Exception):
+            failed += 1
+            result["status"] = "error"
+            result["error"] = f"caption failed: {type(caption).__name__}: {caption}"
+            continue
+        with open(result["output"], encoding="utf-8") as f:
+            markdown = f.read()
+        with open(result["output"], "w", encoding="utf-8") as f:
+            f.write(merge_caption(markdown, caption))
+    print(f"Captioned {len(results) - failed}/{len(results)} images "
+          f"in {time.perf_counter() - start:.2f}s")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Convert files to MarkDown and save the output.")
-    parser.add_argument("input_file", help="Path to the input file")
-    parser.add_argument("output_file", help="Path to the output file")
+    parser.add_argument("paths", nargs="+",
+                        help="input_file output_file, or with --batch: input files and folders")
+    parser.add_argument("--batch", action="store_true", help="Convert many files and folders")
+    parser.add_argument("-o", "--output-dir", help="Batch output folder (default: next to the inputs)")
+    parser.add_argument("-j", "--workers", type=int, default=4, help="Concurrent conversions (default: 4)")
+    parser.add_argument("--no-llm", action="store_true", help="Never describe images with an LLM")
+    parser.add_argument("--caption-concurrency", type=int, default=8,
+                        help="Batch image caption requests in flight (default: 8)")
+    parser.add_argument("--caption-rate", type=float,
+                        help="Batch image caption requests per second (default: unlimited)")
+    parser.add_argument("--cache-dir", help="Reuse conversions of identical files cached in this directory")
 
     args = parser.parse_args()
-    mkdownthis(args.input_file, args.output_file)
+    cache = ConversionCache(args.cache_dir) if args.cache_dir else None
+    if args.batch:
+        batch_mkdownthis(args.paths, args.output_dir, args.workers, cache,
+                         use_llm=False if args.no_llm else None,
+                         caption_concurrency=args.caption_concurrency,
+                         caption_rate=args.caption_rate)
+    elif len(args.paths) != 2:
+        parser.error("expected input_file and output_file (or use --batch)")
+    else:
+        mkdownthis(args.paths[0], args.paths[1], cache=cache,
+                   converter=build_converter(False) if args.no_llm else None)
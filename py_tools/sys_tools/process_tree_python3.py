@@ -3,22 +3,52 @@
 """
 This script prints the hierarchy of processes in a tree-like format.
 
-It uses the 'ps' command to retrieve the parent process ID (PPID), process ID (PID),
-and command name for each process. The hierarchy is then printed starting from the
-init process (PID 1) to the leaf processes.
+On Linux the parent process ID (PPID), process ID (PID) and command name of
+each process are read directly from /proc/<pid>/stat; elsewhere the script
+falls back to the 'ps' command. The hierarchy is then printed starting from
+the init process (PID 1) to the leaf processes.
+
+The tree is kept in a compact array-backed index (parent/child lists stored
+as flat arrays) and rendered iteratively, so very large or very deep process
+trees need neither one object per process nor deep recursion.
+
+With --watch the tree is re-sampled every N seconds like `top`: each process
+shows its CPU% and RSS computed from the /proc counters between two samples,
+parents also show the totals of their whole subtree. Only the rows that fit
+the terminal are drawn, subtrees whose usage did not change are copied from
+the previous drawing instead of being rendered again, and only the lines
+that changed on screen are redrawn.
+
+As a library, build_tree() returns a ProcessTree rooted at any PID or at
+the processes whose name matches a pattern, optionally pruned to the
+branches leading to processes matching a predicate, and streams it as
+nested JSON or NDJSON:
+
+    build_tree(name='nginx*').write_ndjson(sys.stdout)
 
 The script is compatible with Python 3.x.
 
 Author: Massamba Sow
 Date: 2024-05-06
-Usage: python3 process_tree_python3.py
+Usage: python3 process_tree_python3.py [--pid PID | --name PATTERN] [--json | --ndjson | --watch SECONDS]
 
 """
 
+import argparse
+import fnmatch
+import shutil
 import subprocess
 import os
-import re
-from collections import defaultdict
+import sys
+import time
+from array import array
+from json.encoder import encode_basestring
+from typing import NamedTuple, Optional
+
+PROC_ROOT = '/proc'
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
 
 def get_process_info():
     """
@@ -33,51 +63,732 @@ def get_process_info():
     for line in process.stdout:
         yield line.rstrip().split(None, 2)
 
+
+def parse_stat(data, counters=False):
+    """
+    Parse the content of a /proc/<pid>/stat file.
+
+    The command name is enclosed in parentheses and may itself contain spaces
+    and parentheses, so the fields are located from the last ')'.
+
+    Parameters:
+    - data: Bytes read from the stat file.
+    - counters: Also return the CPU time, resident set size and start time.
+
+    Returns:
+    - Tuple (ppid, pid, command name), followed with counters by
+      (utime + stime in clock ticks, RSS in pages, start time in clock ticks).
+    """
+    end = data.rindex(b')')
+    start = data.index(b'(')
+    pid = int(data[:start])
+    name = data[start + 1:end].decode('utf-8', 'replace')
+    if not counters:
+        return int(data[end + 2:].split(None, 2)[1]), pid, name
+    # Fields after the name, starting with field 3 (state)
+    fields = data[end + 2:].split(None, 22)
+    return (int(fields[1]), pid, name, int(fields[11]) + int(fields[12]),
+            int(fields[21]), int(fields[19]))
+
+
+def _read(path):
+    # A raw file descriptor skips the buffered file object, which matters
+    # when tens of thousands of small files are read every few seconds
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, 4096)
+    finally:
+        os.close(fd)
+
+
+def read_proc(proc_root=PROC_ROOT, threads=False, counters=False):
+    """
+    Generator that yields (PPID, PID, command name) for each process found in /proc.
+
+    Parameters:
+    - proc_root: Mount point of the proc file system.
+    - threads: Also yield threads, as children of the process they belong to.
+    - counters: Also yield CPU time, RSS and start time, see parse_stat().
+    """
+    for name in os.listdir(proc_root):
+        if not name.isdigit():
+            continue
+        try:
+            record = parse_stat(_read(f'{proc_root}/{name}/stat'), counters)
+        except (OSError, ValueError, IndexError):
+            # The process exited while we were scanning
+            continue
+        yield record
+        if threads:
+            try:
+                tids = os.listdir(f'{proc_root}/{name}/task')
+            except OSError:
+                continue
+            for tid in tids:
+                if tid == name:
+                    continue
+                try:
+                    thread = parse_stat(_read(f'{proc_root}/{name}/task/{tid}/stat'), counters)
+                except (OSError, ValueError, IndexError):
+                    continue
+                if counters:
+                    # The process's own CPU time and RSS already include those of
+                    # its threads; count them once
+                    thread = thread[:3] + (0, 0) + thread[5:]
+                yield (record[1],) + thread[1:]
+
+
+def collect_processes(proc_root=PROC_ROOT, threads=False):
+    """
+    Generator that yields (PPID, PID, command name) for each process, as integers and str.
+
+    Reads /proc when it is available and falls back to the 'ps' command otherwise.
+
+    Parameters:
+    - proc_root: Mount point of the proc file system.
+    - threads: Also yield threads (only supported with /proc).
+    """
+    if os.path.isdir(f'{proc_root}/1'):
+        yield from read_proc(proc_root, threads)
+        return
+    for parent_pid, pid, command in get_process_info():
+        yield int(parent_pid), int(pid), command
+
+
+class ProcessIndex:
+    """
+    Array-backed parent/child index of a process snapshot.
+
+    Processes are stored by position, sorted by PID; the children of the
+    process at position i are child_list[child_start[i]:child_start[i + 1]].
+
+    Parameters:
+    - records: Iterable of (PPID, PID, command name), optionally followed by
+      the counters of read_proc(counters=True), kept in the ticks, rss and
+      starts arrays.
+    """
+
+    def __init__(self, records):
+        records = sorted(records, key=lambda r: r[1])
+        count = len(records)
+        self.ppids = array('q', (r[0] for r in records))
+        self.pids = array('q', (r[1] for r in records))
+        self.names = [r[2] for r in records]
+        self.position = {pid: i for i, pid in enumerate(self.pids)}
+        if records and len(records[0]) > 3:
+            self.ticks = array('q', (r[3] for r in records))
+            self.rss = array('q', (r[4] for r in records))
+            self.starts = array('q', (r[5] for r in records))
+        else:
+            self.ticks = self.rss = self.starts = None
+
+        # Counting sort of positions by parent position (CSR layout)
+        parents = array('q', (self.position.get(ppid, -1) for ppid in self.ppids))
+        self.parents = parents
+        child_start = array('q', bytes(8 * (count + 1)))
+        for parent in parents:
+            if parent >= 0:
+                child_start[parent + 1] += 1
+        for i in range(count):
+            child_start[i + 1] += child_start[i]
+        child_list = array('q', bytes(8 * child_start[count]))
+        cursor = array('q', child_start[:count])
+        for i, parent in enumerate(parents):
+            # Positions are visited in PID order, so children end up sorted by PID
+            if parent >= 0 and parent != i:
+                child_list[cursor[parent]] = i
+                cursor[parent] += 1
+        self.child_start = child_start
+        self.child_list = child_list
+
+    def __len__(self):
+        return len(self.pids)
+
+    def __contains__(self, pid):
+        return pid in self.position
+
+    def children(self, i):
+        """Positions of the children of the process at position i."""
+        return self.child_list[self.child_start[i]:self.child_start[i + 1]]
+
+    def label(self, i):
+        """Display label of the process at position i, e.g. 'bash(42)'."""
+        name = self.names[i]
+        if '/' in name:
+            name = os.path.basename(name)
+        return f'{name}({self.pids[i]})'
+
+    def preorder(self, i=None):
+        """
+        Positions of a subtree (or of every tree) with parents before their children.
+
+        Parameters:
+        - i: Position of the subtree root (default: all processes, root by root).
+        """
+        if i is None:
+            roots = [j for j, parent in enumerate(self.parents) if parent < 0 or parent == j]
+        else:
+            roots = [i]
+        order = []
+        for root in roots:
+            stack = [root]
+            while stack:
+                j = stack.pop()
+                order.append(j)
+                stack.extend(reversed(self.children(j)))
+        return order
+
+    def subtree_totals(self, values, typecode='q'):
+        """
+        Sum a per-process value over each process and all its descendants.
+
+        Parameters:
+        - values: Sequence of values by position.
+        - typecode: Array type code of the result ('q' or 'd').
+
+        Returns:
+        - Array of subtree totals by position.
+        """
+        totals = array(typecode, values)
+        parents = self.parents
+        for j in reversed(self.preorder()):
+            parent = parents[j]
+            if parent >= 0 and parent != j:
+                totals[parent] += totals[j]
+        return totals
+
+
+def render_tree(root, children, label):
+    """
+    Generator that yields the lines of a tree drawing, without recursion.
+
+    Parameters:
+    - root: Root node.
+    - children: Function returning the child nodes of a node, in display order.
+    - label: Function returning the text displayed for a node.
+    """
+    yield label(root)
+    # Each frame holds the prefix of a node's children and an iterator over them
+    stack = [('', iter(children(root)), len(children(root)))]
+    seen = [0]
+    while stack:
+        prefix, remaining, total = stack[-1]
+        node = next(remaining, None)
+        if node is None:
+            stack.pop()
+            seen.pop()
+            continue
+        seen[-1] += 1
+        last = seen[-1] == total
+        yield f'{prefix}{" `- " if last else " |- "}{label(node)}'
+        grandchildren = children(node)
+        if grandchildren:
+            stack.append((prefix + ('    ' if last else ' |  '), iter(grandchildren), len(grandchildren)))
+            seen.append(0)
+
+
 def print_hierarchy(processes, pid, prefix=''):
     """
-    Recursive function to print the hierarchy of processes starting from a given PID.
+    Function to print the hierarchy of processes starting from a given PID.
 
     Parameters:
     - processes: Dictionary containing process information.
     - pid: Process ID from which to start printing the hierarchy.
     - prefix: String prefix to visualize the hierarchy level.
     """
-    process_cmd = processes[pid]['command']
-    if os.path.exists(process_cmd):
-        process_name = os.path.basename(process_cmd)
-    else:
-        process_name = process_cmd
+    def label(node):
+        process_cmd = processes[node]['command']
+        return f'{os.path.basename(process_cmd) if "/" in process_cmd else process_cmd}({node})'
 
-    parent_pid = processes[pid]['parent_pid']
-    try:
-        grandparent_pid = processes[parent_pid]['parent_pid']
-        # Adjust the prefix if this process is the last child of its grandparent
-        if processes[grandparent_pid]['children'][-1] == parent_pid:
-            prefix = re.sub(r'^(\s+\|.+)[\|`](\s+\|- )$', r'\1 \2', prefix)
-    except IndexError:
-        pass
+    def children(node):
+        return processes[node]['children'] if node in processes else []
+
+    for line in render_tree(pid, children, label):
+        print(prefix + line)
+
+
+def print_tree(index, pid=1, out=None):
+    """
+    Print the hierarchy of an index starting from a given PID.
+
+    Parameters:
+    - index: ProcessIndex of the processes.
+    - pid: Process ID from which to start printing the hierarchy.
+    - out: Text stream to write to (default: sys.stdout).
+    """
+    out = out or sys.stdout
+    lines = render_tree(index.position[pid], index.children, index.label)
+    out.writelines(f'{line}\n' for line in lines)
+
+
+def format_bytes(size):
+    """Format a byte count with a binary unit, e.g. '12.5M'."""
+    for unit in 'BKMG':
+        if size < 1024:
+            return f'{size:.0f}{unit}' if unit == 'B' else f'{size:.1f}{unit}'
+        size /= 1024
+    return f'{size:.1f}T'
+
+
+class Snapshot:
+    """
+    A sample of the process tree with usage derived from the previous sample.
+
+    Parameters:
+    - index: ProcessIndex built with counters.
+    - previous: Previous Snapshot, or None for the first sample (CPU% is then 0).
+    - timestamp: Monotonic time of the sample.
+    """
+
+    def __init__(self, index, previous=None, timestamp=None):
+        self.index = index
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        count = len(index)
+        cpu = array('d', bytes(8 * count))
+        if previous is not None and self.timestamp > previous.timestamp:
+            scale = 100.0 / (CLOCK_TICKS * (self.timestamp - previous.timestamp))
+            before = previous.index
+            for i, pid in enumerate(index.pids):
+                j = before.position.get(pid)
+                # A reused PID belongs to a new process with a different start time
+                if j is not None and before.starts[j] == index.starts[i]:
+                    cpu[i] = max(index.ticks[i] - before.ticks[j], 0) * scale
+        self.cpu = cpu
+        self.rss = array('q', (pages * PAGE_SIZE for pages in index.rss))
+        self.tree_cpu = index.subtree_totals(cpu, 'd')
+        self.tree_rss = index.subtree_totals(self.rss)
+        # Lines drawn by lines() and the rows of each fully drawn subtree by PID,
+        # reused by the drawing of the next sample
+        self.drawn_lines = []
+        self.drawn = {}
+
+    def label(self, i):
+        """Display label with usage, plus subtree totals for parents."""
+        text = f'{self.index.label(i)} {self.cpu[i]:.1f}% {format_bytes(self.rss[i])}'
+        if self.index.child_start[i] != self.index.child_start[i + 1]:
+            text += f' [tree {self.tree_cpu[i]:.1f}% {format_bytes(self.tree_rss[i])}]'
+        return text
+
+    def usage(self, i):
+        """The values shown in the label of the process at position i."""
+        return (self.index.names[i], round(self.cpu[i], 1), self.rss[i],
+                round(self.tree_cpu[i], 1), self.tree_rss[i])
+
+    def unchanged(self, previous, root):
+        """
+        Flags by position: 1 where a subtree shows the same as in previous.
+
+        A subtree is unchanged when it has the same processes, in the same
+        order, with the same usage.
+        """
+        index, before = self.index, previous.index
+        same = bytearray(len(index))
+        for i in reversed(index.preorder(root)):
+            j = before.position.get(index.pids[i])
+            if j is None or before.starts[j] != index.starts[i] or previous.usage(j) != self.usage(i):
+                continue
+            children, children_before = index.children(i), before.children(j)
+            if len(children) == len(children_before) and all(
+                    same[c] and index.pids[c] == before.pids[b] for c, b in zip(children, children_before)):
+                same[i] = 1
+        return same
+
+    def lines(self, pid=1, limit=None, previous=None):
+        """
+        Lines of the tree drawing rooted at a PID, the same as render_tree().
+
+        Parameters:
+        - pid: Process ID from which to start the drawing.
+        - limit: Maximum number of lines; the last one then tells how many
+          processes were left out.
+        - previous: Snapshot drawn before; subtrees that did not change since
+          are copied from its drawing instead of being rendered again.
+        """
+        index = self.index
+        root = index.position[pid]
+        same = self.unchanged(previous, root) if previous is not None and previous.drawn else None
+        lines, drawn = [], {}
+        # Entries are (position, prefix, is last child), or (None, position,
+        # first row, prefix, is last child) once the subtree's rows are complete
+        stack = [(root, '', None)]
+        while stack and (limit is None or len(lines) < limit):
+            entry = stack.pop()
+            if entry[0] is None:
+                _, i, first, prefix, last = entry
+                drawn[index.pids[i]] = (first, len(lines), prefix, last)
+                continue
+            i, prefix, last = entry
+            pid_i = index.pids[i]
+            if same is not None and same[i]:
+                first, end, prefix_before, last_before = previous.drawn.get(pid_i, (0, 0, None, None))
+                if (prefix_before, last_before) == (prefix, last):
+                    # The rows of its subtrees move along with it
+                    shift = len(lines) - first
+                    for j in index.preorder(i):
+                        rows = previous.drawn.get(index.pids[j])
+                        if rows is not None:
+                            drawn[index.pids[j]] = (rows[0] + shift, rows[1] + shift) + rows[2:]
+                    lines.extend(previous.drawn_lines[first:end])
+                    continue
+            if last is None:
+                lines.append(self.label(i))
+                child_prefix = ''
+            else:
+                lines.append(f'{prefix}{" `- " if last else " |- "}{self.label(i)}')
+                child_prefix = prefix + ('    ' if last else ' |  ')
+            stack.append((None, i, len(lines) - 1, prefix, last))
+            children = index.children(i)
+            stack.extend((child, child_prefix, k == len(children) - 1)
+                         for k, child in reversed(list(enumerate(children))))
+        self.drawn_lines, self.drawn = lines, drawn
+        if limit is not None and (len(lines) > limit or any(entry[0] is not None for entry in stack)):
+            shown = limit - 1
+            lines = lines[:shown] + [f'... {len(index.preorder(root)) - shown} more processes']
+        return lines
+
+
+def sample(previous=None, proc_root=PROC_ROOT, threads=False):
+    """
+    Read /proc once and return a Snapshot compared against the previous one.
+
+    Parameters:
+    - previous: Previous Snapshot, or None.
+    - proc_root: Mount point of the proc file system.
+    - threads: Also sample threads.
+    """
+    records = read_proc(proc_root, threads, counters=True)
+    return Snapshot(ProcessIndex(records), previous)
+
+
+def redraw(out, previous_lines, lines):
+    """
+    Update a terminal showing previous_lines so that it shows lines.
+
+    Only the rows that differ are rewritten, using ANSI cursor positioning,
+    so an unchanged subtree costs no output at all.
+
+    Parameters:
+    - out: Text stream of the terminal.
+    - previous_lines: Lines currently displayed (empty for a blank screen).
+    - lines: Lines to display.
+
+    Returns:
+    - Number of rows rewritten.
+    """
+    parts = []
+    for row, line in enumerate(lines, 1):
+        if row > len(previous_lines) or previous_lines[row - 1] != line:
+            parts.append(f'\x1b[{row};1H{line}\x1b[K')
+    if len(previous_lines) > len(lines):
+        # Clear the rows of processes that went away
+        parts.append(f'\x1b[{len(lines) + 1};1H\x1b[J')
+    out.write(''.join(parts))
+    out.flush()
+    return len(parts)
+
+
+def watch(pid=1, interval=2.0, iterations=None, proc_root=PROC_ROOT, threads=False, out=None):
+    """
+    Print the process tree with CPU% and RSS every interval seconds, like `top`.
+
+    The drawing is clipped to the terminal size, so a tree taller than the
+    terminal never scrolls it.
+
+    Parameters:
+    - pid: Process ID from which to start printing the hierarchy.
+    - interval: Seconds between samples.
+    - iterations: Number of refreshes (default: until interrupted).
+    - proc_root: Mount point of the proc file system.
+    - threads: Also show threads; their CPU% and RSS are counted in their process's row.
+    - out: Text stream of the terminal (default: sys.stdout).
+    """
+    out = out or sys.stdout
+    snapshot = sample(proc_root=proc_root, threads=threads)
+    shown = []
+    size = None
+    count = 0
     try:
-        if processes[parent_pid]['children'][-1] == pid:
-            prefix = re.sub(r'\|- $', '`- ', prefix)
-    except IndexError:
+        while iterations is None or count < iterations:
+            time.sleep(interval)
+            previous, snapshot = snapshot, sample(snapshot, proc_root, threads)
+            if shutil.get_terminal_size() != size:
+                size = shutil.get_terminal_size()
+                out.write('\x1b[H\x1b[2J')
+                shown = []
+            # The last row is left for the cursor, so writing never scrolls
+            height = max(size.lines - 1, 1)
+            if pid in snapshot.index:
+                lines = snapshot.lines(pid, height, previous)
+            else:
+                lines = [f'process {pid} exited']
+            lines = [line[:size.columns] for line in lines]
+            redraw(out, shown, lines)
+            shown = lines
+            count += 1
+    except KeyboardInterrupt:
         pass
+    out.write(f'\x1b[{len(shown) + 1};1H')
+
+
+class Process(NamedTuple):
+    """One process as seen by ProcessTree predicates."""
+    pid: int
+    ppid: int
+    name: str
+    cpu: Optional[float] = None
+    rss: Optional[int] = None
+
+
+class ProcessTree:
+    """
+    A process tree rooted at one or more processes, optionally pruned.
+
+    Parameters:
+    - source: ProcessIndex, or Snapshot to also report CPU% and RSS.
+    - roots: Positions of the root processes in the index.
+    - keep: Optional bytearray by position; processes with 0 are left out.
+    """
+
+    def __init__(self, source, roots, keep=None):
+        self.snapshot = source if isinstance(source, Snapshot) else None
+        self.index = source.index if self.snapshot is not None else source
+        self.roots = list(roots)
+        self.keep = keep
+        self._names = None
+
+    def children(self, i):
+        """Positions of the children of the process at position i that are kept."""
+        children = self.index.children(i)
+        if self.keep is None:
+            return children
+        keep = self.keep
+        return [c for c in children if keep[c]]
+
+    def process(self, i):
+        """Process record of the process at position i."""
+        index = self.index
+        if self.snapshot is None:
+            return Process(index.pids[i], index.ppids[i], index.names[i])
+        return Process(index.pids[i], index.ppids[i], index.names[i],
+                       self.snapshot.cpu[i], self.snapshot.rss[i])
+
+    def walk(self):
+        """
+        Generator that yields (depth, position) for every process, parents first.
+        """
+        for root in self.roots:
+            stack = [(0, root)]
+            while stack:
+                depth, i = stack.pop()
+                yield depth, i
+                stack.extend((depth + 1, c) for c in reversed(self.children(i)))
+
+    def __iter__(self):
+        return (self.process(i) for _, i in self.walk())
+
+    def __len__(self):
+        return sum(1 for _ in self.walk())
+
+    def lines(self):
+        """Generator that yields the lines of the text drawing of every root."""
+        label = self.snapshot.label if self.snapshot is not None else self.index.label
+        for root in self.roots:
+            yield from render_tree(root, self.children, label)
+
+    def to_dict(self):
+        """
+        Nested representation of the tree.
+
+        Returns:
+        - List with one dict per root; each dict has 'pid', 'ppid', 'name'
+          ('cpu', 'rss', 'tree_cpu' and 'tree_rss' for a Snapshot) and 'children'.
+        """
+        def node(i):
+            fields = self.process(i)._asdict()
+            if self.snapshot is None:
+                del fields['cpu'], fields['rss']
+            else:
+                fields['tree_cpu'] = self.snapshot.tree_cpu[i]
+                fields['tree_rss'] = self.snapshot.tree_rss[i]
+            fields['children'] = []
+            return fields
+
+        trees = []
+        for root in self.roots:
+            top = node(root)
+            trees.append(top)
+            stack = [(top, root)]
+            while stack:
+                parent, i = stack.pop()
+                for c in self.children(i):
+                    child = node(c)
+                    parent['children'].append(child)
+                    stack.append((child, c))
+        return trees
+
+    def _fields(self, i):
+        # JSON members of a process, without braces; names are escaped once per tree
+        index = self.index
+        if self._names is None:
+            self._names = [encode_basestring(name) for name in index.names]
+        text = (f'"pid":{index.pids[i]},"ppid":{index.ppids[i]},'
+                f'"name":{self._names[i]}')
+        if self.snapshot is not None:
+            snapshot = self.snapshot
+            text += (f',"cpu":{snapshot.cpu[i]:.2f},"rss":{snapshot.rss[i]},'
+                     f'"tree_cpu":{snapshot.tree_cpu[i]:.2f},"tree_rss":{snapshot.tree_rss[i]}')
+        return text
+
+    def write_json(self, out):
+        """
+        Stream the tree as a JSON array of nested objects, see to_dict().
+
+        Parameters:
+        - out: Text stream to write to.
+        """
+        write = out.write
+        write('[')
+        for n, root in enumerate(self.roots):
+            if n:
+                write(',')
+            write('{' + self._fields(root) + ',"children":[')
+            stack = [iter(self.children(root))]
+            first = [True]
+            while stack:
+                c = next(stack[-1], None)
+                if c is None:
+                    stack.pop()
+                    first.pop()
+                    write(']}')
+                    continue
+                if not first[-1]:
+                    write(',')
+                first[-1] = False
+                write('{' + self._fields(c) + ',"children":[')
+                stack.append(iter(self.children(c)))
+                first.append(True)
+        write(']\n')
+
+    def write_ndjson(self, out):
+        """
+        Stream the tree as NDJSON, one object per process (parents first) with its depth.
+
+        Parameters:
+        - out: Text stream to write to.
+        """
+        out.writelines(f'{{{self._fields(i)},"depth":{depth}}}\n' for depth, i in self.walk())
+
+
+def find_roots(index, pid=None, name=None):
+    """
+    Positions of the processes a tree should start from.
+
+    Parameters:
+    - index: ProcessIndex of the processes.
+    - pid: Root PID (default: 1, unless name is given); with a name, only
+      its descendants are searched.
+    - name: Command name or shell pattern (e.g. 'nginx*'); every matching
+      process whose ancestors do not match becomes a root.
+
+    Returns:
+    - List of positions, empty when nothing matches.
+    """
+    if name is None:
+        pid = 1 if pid is None else pid
+        return [index.position[pid]] if pid in index else []
+    if pid is not None and pid not in index:
+        return []
+    within = index.preorder(index.position[pid]) if pid is not None else index.preorder()
+    matched = bytearray(len(index))
+    roots = []
+    parents = index.parents
+    for i in within:
+        parent = parents[i]
+        if fnmatch.fnmatchcase(index.names[i], name):
+            matched[i] = 1
+            if parent < 0 or not matched[parent]:
+                roots.append(i)
+        elif parent >= 0 and matched[parent]:
+            # Propagate so descendants of a match are not roots themselves
+            matched[i] = 1
+    return roots
+
+
+def prune(tree, predicate):
+    """
+    Keep only the processes matching a predicate and their ancestors.
+
+    Parameters:
+    - tree: ProcessTree to prune.
+    - predicate: Function receiving a Process and returning True to keep it.
+
+    Returns:
+    - ProcessTree sharing the index of tree.
+    """
+    keep = bytearray(len(tree.index))
+    parents = tree.index.parents
+    roots = set(tree.roots)
+    for _, i in tree.walk():
+        if not predicate(tree.process(i)):
+            continue
+        # Mark the branch up to the root, stopping at an already kept ancestor
+        while not keep[i]:
+            keep[i] = 1
+            if i in roots:
+                break
+            i = parents[i]
+    kept = [root for root in tree.roots if keep[root]]
+    return ProcessTree(tree.snapshot or tree.index, kept, keep)
+
+
+def build_tree(source=None, pid=None, name=None, predicate=None, proc_root=PROC_ROOT, threads=False):
+    """
+    Build a structured process tree.
+
+    Parameters:
+    - source: ProcessIndex or Snapshot (default: read the processes now).
+    - pid: Root PID (default: 1, or all processes when name is given).
+    - name: Root the tree at processes whose command name matches this pattern.
+    - predicate: Keep only processes for which predicate(Process) is true, with their ancestors.
+    - proc_root: Mount point of the proc file system.
+    - threads: Also include threads when reading the processes.
+
+    Returns:
+    - ProcessTree.
+    """
+    if source is None:
+        source = ProcessIndex(collect_processes(proc_root, threads))
+    index = source.index if isinstance(source, Snapshot) else source
+    tree = ProcessTree(source, find_roots(index, pid, name))
+    return prune(tree, predicate) if predicate is not None else tree
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Print the hierarchy of processes.')
+    parser.add_argument('--pid', type=int, help='Root of the tree (default: 1)')
+    parser.add_argument('--name', help='Root the tree at processes matching this name or pattern')
+    parser.add_argument('--threads', action='store_true', help='Also show threads')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--json', action='store_true', help='Print the tree as nested JSON')
+    output.add_argument('--ndjson', action='store_true', help='Print one JSON object per process')
+    output.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='Refresh every SECONDS with CPU%% and RSS (needs /proc)')
+    args = parser.parse_args(argv)
+    if args.watch:
+        if args.name:
+            parser.error('--watch does not support --name')
+        watch(args.pid or 1, args.watch, threads=args.threads)
+        return
+    tree = build_tree(pid=args.pid, name=args.name, threads=args.threads)
+    if args.json:
+        tree.write_json(sys.stdout)
+    elif args.ndjson:
+        tree.write_ndjson(sys.stdout)
+    else:
+        sys.stdout.writelines(f'{line}\n' for line in tree.lines())
 
-    print(f'{prefix}{process_name}({pid})')
-    if processes[pid]['children']:
-        prefix = prefix.replace('-', ' ')
-        for child_pid in processes[pid]['children']:
-            print_hierarchy(processes, child_pid, prefix + ' |- ')
 
 if __name__ == '__main__':
-    # Initialize the dictionary to store process information.
-    processes = defaultdict(lambda: {"command": "", "children": [], 'parent_pid': None})
-    # Populate the processes dictionary with information from the 'ps' command.
-    for parent_pid, pid, command in get_process_info():
-        parent_pid = int(parent_pid)
-        pid = int(pid)
-        processes[pid]["command"] = command
-        processes[pid]['parent_pid'] = parent_pid
-        processes[parent_pid]['children'].append(pid)
-
-    # Start printing the hierarchy from PID 1 (usually the init process).
-    print_hierarchy(processes, 1, '')
+    # Build the index from /proc (or the 'ps' command) and print it from
+    # PID 1 (usually the init process).
+    main()
@@ -6,51 +6,71 @@ The user can select the columns to generate data for and specify the number of r
 To run the script, simply execute it. The user can select the columns and number of rows in the
  sidebar and click the "Generate Data" button to generate the random test data.
 
-You can customize the script by adding more data generators to the 'generators'
- dictionary and modifying the data generation settings.
+You can customize the script by adding more data generators to the dictionary returned
+ by build_generators() and modifying the data generation settings.
+
+Each generated dataset is cached, so other interactions (such as downloading the CSV) do
+ not regenerate it. Its providers are seeded from the dataset's batch number, so a dataset
+ evicted from the cache is regenerated identically.
 
 Note: You need to install the 'streamlit' and 'mimesis' libraries to run this script.
 '''
 
+import random
 import streamlit as st
 import pandas as pd
 from mimesis import Person, Address
-from mimesis.enums import Gender
-from io import StringIO
-
-# Dictionary of available data generators
-generators = {
-    "Name": lambda: person.full_name(),
-    "Email": lambda: person.email(),
-    "Address": lambda: address.address(),
-    "Phone Number": lambda: person.telephone(),
-    "Job": lambda: person.occupation(),
-}
-
-# Function to generate data
-def generate_data(columns, rows):
+
+# Dictionary of available data generators; seeded providers always generate the same data
+def build_generators(seed=None):
+    person = Person(seed=seed)  # Initialize Mimesis Person provider
+    address = Address(seed=seed)  # Initialize Mimesis Address provider
+    return {
+        "Name": person.full_name,
+        "Email": person.email,
+        "Address": address.address,
+        "Phone Number": person.telephone,
+        "Job": person.occupation,
+    }
+
+# Column names, computed once per server process (the script itself runs again on every interaction)
+@st.cache_resource
+def column_names():
+    return list(build_generators())
+
+# Function to generate data; `batch` tells apart datasets generated with the same settings
+# and seeds their providers, built per call so that concurrent sessions do not share them
+@st.cache_data(max_entries=8)
+def generate_data(columns, rows, batch):
+    generators = build_generators(batch)
     data = {col: [generators[col]() for _ in range(rows)] for col in columns}
     return pd.DataFrame(data)
 
+@st.cache_data(max_entries=8)
+def to_csv(columns, rows, batch):
+    return generate_data(columns, rows, batch).to_csv(index=False)
+
 # Streamlit interface
 st.title("Test Data Generator 📊")
 
 # Sidebar for settings
 st.sidebar.header("Data Generation Settings")
-selected_columns = st.sidebar.multiselect("Select Columns:", list(generators.keys()))
+selected_columns = st.sidebar.multiselect("Select Columns:", column_names())
 num_rows = st.sidebar.number_input("Number of Rows:", min_value=1, max_value=1000, value=10)
 
 if st.sidebar.button("Generate Data"):
     if selected_columns:
-        person = Person()  # Initialize Mimesis Person provider
-        address = Address()  # Initialize Mimesis Address provider
-        df = generate_data(selected_columns, num_rows)
-
-        st.write("### Generated Data")
-        st.dataframe(df)
-
-        # Convert DataFrame to CSV and create download link
-        csv = df.to_csv(index=False)
-        st.download_button(label="Download CSV", data=csv, file_name="random_data.csv", mime="text/csv")
+        # Remembered so that later reruns show the same (cached) dataset
+        st.session_state.dataset = (tuple(selected_columns), num_rows, random.getrandbits(64))
     else:
         st.warning("Please select at least one column.")
+
+if "dataset" in st.session_state:
+    df = generate_data(*st.session_state.dataset)
+
+    st.write("### Generated Data")
+    st.dataframe(df)
+
+    # Convert DataFrame to CSV and create download link
+    csv = to_csv(*st.session_state.dataset)
+    st.download_button(label="Download CSV", data=csv, file_name="random_data.csv", mime="text/csv")
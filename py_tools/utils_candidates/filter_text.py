@@ -5,60 +5,101 @@ This script allows users to extract or clean text data by applying various filte
  emails, mentions, hashtags, links, etc.
 The user can upload a CSV file with text data or manually enter text to process.
 The processed information is displayed along with visualizations of the extracted data.
+The filters themselves live in text_filters.py, which resolves matches of several filters
+overlapping the same text and processes CSV columns row by row. For very large files, matches can be counted
+approximately in bounded memory (see frequency.py).
+
+Streamlit re-runs the whole script on every interaction, so the CSV preview
+(keyed by the upload's file id and size) and the processing results (keyed by column,
+filters and mode) are cached: changing a widget only redraws from earlier work.
 
 To run the script, use the command:
 streamlit run filter_text.py
 '''
 
-import re
+import hashlib
+import io
+import os
+import tempfile
 import pandas as pd
 import streamlit as st
 import matplotlib.pyplot as plt
 import seaborn as sns
 from collections import Counter
+from text_filters import PATTERNS as patterns, process_csv, process_text
+
+# Rows of an uploaded CSV shown in the preview; the file itself is processed in chunks
+PREVIEW_ROWS = 1000
+
+@st.cache_resource
+def output_directory():
+    '''
+    Folder of the cleaned CSVs, created once per server process (the script
+    itself runs again on every interaction).
 
-# Define regex patterns for various filters
-patterns = {
-    'emails': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-    'mentions': r'@\w+',
-    'hashtags': r'#\w+',
-    'links': r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+',
-    'html_tags': r'<[^>]+>',
-    'phone_numbers': r'\+?\d{1,3}[-.\s]?\(?\d{1,4}?\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9}',
-    'dates': r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b|\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b',
-    'currency': r'\$\d+(?:\.\d{2})?|€\d+(?:\.\d{2})?|£\d+(?:\.\d{2})?|USD\s\d+(?:\.\d+)?',
-    'emojis': r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F700-\U0001F77F\U0001F900-\U0001F9FF]+',
-}
-
-def process_text(text, filters, mode):
+    :return: str: Path to the folder
     '''
-    Process text data by extracting or cleaning based on selected filters and mode.
+    return tempfile.mkdtemp(prefix='filter_text_')
+
+# Arguments starting with an underscore are not hashed by Streamlit: the upload
+# is identified by its file id and size instead of hashing its content on every rerun
+@st.cache_data(max_entries=4, show_spinner="Reading CSV...")
+def read_preview(upload_key, _data):
+    '''
+    Parse the first PREVIEW_ROWS rows of an upload.
+
+    :param upload_key: tuple: File id and size of the upload, the cache key
+    :param _data: bytes: Content of the upload
 
-    :param text: str: Text data to process
-    :param filters: list: List of filters to apply
-    :param mode: str: Mode of operation ('extract' or 'clean')
+    :return: pandas.DataFrame: Preview rows
+    '''
+    return pd.read_csv(io.BytesIO(_data), nrows=PREVIEW_ROWS)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def extract_csv(upload_key, column, filters, capacity, _data, _progress=None):
+    '''
+    Count the matches of a column of an upload, see text_filters.process_csv().
+
+    :param upload_key: tuple: File id and size of the upload
+    :param column: str: Column to process
+    :param filters: tuple: Sorted filters to apply
+    :param capacity: int: Distinct matches tracked per filter (None: exact counts)
+    :param _data: bytes: Content of the upload
+    :param _progress: callable: Called with the number of rows processed so far
+
+    :return: dict: Summary with 'rows', 'chunks' and 'counts'
+    '''
+    return process_csv(io.BytesIO(_data), column, filters, 'extract', progress=_progress, capacity=capacity)
 
-    :return: dict: Processed information
+@st.cache_data(max_entries=4, show_spinner=False)
+def clean_csv(upload_key, column, filters, _data, _progress=None):
     '''
-    if mode == 'extract':
-        return {filter_type: re.findall(patterns[filter_type], text) for filter_type in filters}
-    elif mode == 'clean':
-        cleaned_text = text
-        for filter_type in filters:
-            cleaned_text = re.sub(patterns[filter_type], '', cleaned_text)
-        return {'cleaned_text': cleaned_text}
+    Clean a column of an upload into a CSV file under output_directory().
+
+    :param upload_key: tuple: File id and size of the upload
+    :param column: str: Column to process
+    :param filters: tuple: Sorted filters to apply
+    :param _data: bytes: Content of the upload
+    :param _progress: callable: Called with the number of rows processed so far
+
+    :return: tuple: (path to the cleaned CSV, summary with 'rows' and 'chunks')
+    '''
+    key = hashlib.sha256(repr((upload_key, column, filters)).encode()).hexdigest()
+    output = os.path.join(output_directory(), f"cleaned_{key[:32]}.csv")
+    summary = process_csv(io.BytesIO(_data), column, filters, 'clean', output=output, progress=_progress)
+    return output, summary
 
 def plot_data(data, title):
     '''
     Plot the top 15 items based on their counts.
 
-    :param data: list: List of items to plot
+    :param data: list, or counts from frequency.py (ExactCounter or SpaceSaving): Items to plot
     :param title: str: Title of the plot
 
     :return: None
     '''
     # Count occurrences of each item and get the top 15
-    item_counts = Counter(data).most_common(15)
+    item_counts = (Counter(data) if isinstance(data, list) else data).most_common(15)
     items, counts = zip(*item_counts)
     # Create a bar plot
     plt.figure(figsize=(10, 5))
@@ -71,39 +112,62 @@ def plot_data(data, title):
 
 # Title of the app
 st.title("Text Filter and Cleaner Web App")
+# Mode selection dropdown
+st.sidebar.header("Mode Selection")
+mode = st.sidebar.selectbox("Select mode:", ['extract', 'clean'])
+# Filter options
+st.sidebar.header("Filter Options")
+selected_filters = st.sidebar.multiselect("Select filters to apply:", list(patterns.keys()))
+# Bounded-memory counting for files with too many distinct matches to keep
+approximate = st.sidebar.checkbox("Approximate counts (large files)")
+capacity = st.sidebar.number_input("Distinct items tracked per filter:", min_value=100, value=10_000,
+                                   step=1000) if approximate else None
 # File upload for CSV
 uploaded_file = st.file_uploader("Upload a CSV file", type='csv')
 if uploaded_file is not None:
-    df = pd.read_csv(uploaded_file)
-    st.write("Data Preview:")
-    st.dataframe(df)
+    # getvalue() returns the in-memory upload; a new upload gets a new file id
+    data = uploaded_file.getvalue()
+    upload_key = (uploaded_file.file_id, uploaded_file.size)
+    # Only a sample is loaded for the preview and the column list
+    preview = read_preview(upload_key, data)
+    st.write(f"Data Preview (first {len(preview)} rows):")
+    st.dataframe(preview)
     # Column selection dropdown
-    selected_column = st.selectbox("Select a column to process:", df.columns.tolist())
-    # Mode selection dropdown
-    st.sidebar.header("Mode Selection")
-    mode = st.sidebar.selectbox("Select mode:", ['extract', 'clean'])
-    # Filter options
-    st.sidebar.header("Filter Options")
-    selected_filters = st.sidebar.multiselect("Select filters to apply:", list(patterns.keys()))
+    selected_column = st.selectbox("Select a column to process:", preview.columns.tolist())
     # Button to apply filters or clean
     if st.button("Process Selected Column"):
-        if selected_column and not df[selected_column].isnull().all():
-            text_input = df[selected_column].astype(str).str.cat(sep=' ')
-            processed_info = process_text(text_input, selected_filters, mode)
-            # Display results
-            if mode == 'extract':
-                st.subheader("Extracted Information")
-                # Plot for each extracted filter
-                for filter_type in selected_filters:
-                    data = processed_info.get(filter_type, [])
-                    if data:
-                        plot_data(data, f'Top 15 {filter_type.capitalize()} Used')
-                st.dataframe(pd.DataFrame.from_dict(processed_info, orient='index').transpose())
-            elif mode == 'clean':
-                st.subheader("Cleaned Text")
-                st.write(processed_info['cleaned_text'])
+        if selected_column and selected_filters:
+            # Remembered so that later reruns keep showing (cached) results
+            st.session_state.request = (upload_key, selected_column, tuple(sorted(selected_filters)), mode, capacity)
         else:
-            st.error("Please select a valid column with data.")
+            st.error("Please select a column and at least one filter.")
+    request = st.session_state.get('request')
+    if request is not None and request[0] == upload_key:
+        _, column, filters, request_mode, request_capacity = request
+        status = st.empty()
+        progress = lambda rows: status.write(f"Processed {rows:,} rows...")
+        # Display results
+        if request_mode == 'extract':
+            summary = extract_csv(upload_key, column, filters, request_capacity, data, progress)
+            st.subheader("Extracted Information")
+            # Plot for each extracted filter
+            for filter_type in filters:
+                counts = summary['counts'].get(filter_type)
+                if counts:
+                    plot_data(counts, f'Top 15 {filter_type.capitalize()} Used')
+            st.dataframe(pd.DataFrame([
+                {'filter': filter_type, 'matches': counter.total(),
+                 'distinct' if request_capacity is None else 'tracked': len(counter),
+                 'max overcount': counter.error_bound()}
+                for filter_type, counter in summary['counts'].items()
+            ]))
+        elif request_mode == 'clean':
+            output, summary = clean_csv(upload_key, column, filters, data, progress)
+            st.subheader("Cleaned Text")
+            st.dataframe(pd.read_csv(output, nrows=PREVIEW_ROWS))
+            with open(output, 'rb') as f:
+                st.download_button("Download cleaned CSV", f, file_name=f"cleaned_{uploaded_file.name}")
+        status.write(f"Processed {summary['rows']:,} rows in {summary['chunks']} chunks.")
 else:
     # Input text area for manual entry if no file uploaded
     text_input = st.text_area("Enter text to filter or clean:", height=200)
@@ -0,0 +1,238 @@
+'''
+frequency.py
+
+Frequency backends for the top-N counts of text_filters.py and filter_text.py.
+
+ExactCounter is a Counter that keeps every distinct item. SpaceSaving
+tracks at most `capacity` items whatever the length of the stream (the
+Space-Saving algorithm of Metwally, Agrawal and El Abbadi): an item that
+is not tracked replaces the item with the smallest count and inherits
+that count as its possible overestimate. Every estimate is then an upper
+bound of the true count, off by at most error(item) <= total() / capacity,
+and any item seen more than total() / capacity times is always tracked.
+
+Both backends share add/update/merge/most_common/error, so summaries built
+by parallel workers can be merged into one:
+
+    counts = make_counter(capacity=1000)  # or make_counter() for exact counts
+    counts.update(['#a', '#b', '#a'])
+    counts.merge(counts_from_another_worker)
+    counts.most_common(15)                # [('#a', 2), ('#b', 1)]
+'''
+
+import heapq
+from collections import Counter
+from collections.abc import Mapping
+from operator import itemgetter
+
+
+class ExactCounter(Counter):
+    '''
+    Exact counts, as a Counter with the interface of SpaceSaving.
+    '''
+
+    capacity = None
+
+    def add(self, item, count=1):
+        '''
+        Count an item `count` more times.
+        '''
+        self[item] += count
+
+    def merge(self, other):
+        '''
+        Add the counts of another ExactCounter (or any Counter).
+
+        :return: ExactCounter: self
+        '''
+        if isinstance(other, SpaceSaving):
+            raise TypeError("cannot merge approximate counts into an ExactCounter")
+        Counter.update(self, other)
+        return self
+
+    def error(self, item):
+        '''
+        Maximum overestimate of the count of an item: always 0.
+        '''
+        return 0
+
+    def error_bound(self):
+        '''
+        Maximum overestimate of any count: always 0.
+        '''
+        return 0
+
+
+class SpaceSaving:
+    '''
+    Approximate counts of the most frequent items in bounded memory.
+
+    :param capacity: int: Maximum number of items tracked
+    :param items: iterable or mapping of items to count first
+    '''
+
+    def __init__(self, capacity, items=None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self._total = 0
+        # (count, item) entries, some of them stale; see _pop_min()
+        self._heap = []
+        if items is not None:
+            self.update(items)
+
+    def add(self, item, count=1):
+        '''
+        Count an item `count` more times, evicting the smallest item if needed.
+        '''
+        self._total += count
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+        else:
+            smallest, minimum = self._pop_min()
+            del counts[smallest], self.errors[smallest]
+            counts[item] = minimum + count
+            self.errors[item] = minimum
+        self._push(item)
+
+    def update(self, items):
+        '''
+        Count every item of an iterable, or the counts of a mapping.
+        '''
+        if isinstance(items, Mapping):
+            for item, count in items.items():
+                self.add(item, count)
+        else:
+            for item in items:
+                self.add(item)
+
+    def merge(self, other):
+        '''
+        Merge the summary of another stream, e.g. one counted by another worker.
+
+        An item missing from one summary may still have been seen up to that
+        summary's smallest count, so it is counted with that as its error; the
+        `capacity` largest estimates are kept. The merged error stays within
+        total() / capacity.
+
+        :param other: SpaceSaving or Counter (exact counts)
+
+        :return: SpaceSaving: self
+        '''
+        if isinstance(other, SpaceSaving):
+            other_counts, other_errors = other.counts, other.errors
+            other_floor = other._floor()
+            other_total = other._total
+        else:
+            other_counts, other_errors, other_floor = other, {}, 0
+            other_total = sum(other.values())
+        floor = self._floor()
+        counts, errors = {}, {}
+        for item in self.counts.keys() | other_counts.keys():
+            counts[item] = self.counts.get(item, floor) + other_counts.get(item, other_floor)
+            errors[item] = self.errors.get(item, floor) + other_errors.get(item, other_floor)
+        if len(counts) > self.capacity:
+            kept = heapq.nlargest(self.capacity, counts.items(), key=itemgetter(1))
+            counts = dict(kept)
+            errors = {item: errors[item] for item in counts}
+        self.counts, self.errors = counts, errors
+        self._total += other_total
+        self._heap = [(count, item) for item, count in counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def most_common(self, n=None):
+        '''
+        Items with the largest estimated counts, largest first.
+
+        :param n: int: Number of items (default: all tracked items)
+
+        :return: list: (item, estimated count) tuples
+        '''
+        if n is None:
+            return sorted(self.counts.items(), key=itemgetter(1), reverse=True)
+        return heapq.nlargest(n, self.counts.items(), key=itemgetter(1))
+
+    def error(self, item):
+        '''
+        Maximum overestimate of the count of an item; its true count lies
+        between self[item] - self.error(item) and self[item].
+        '''
+        return self.errors.get(item, self._floor())
+
+    def error_bound(self):
+        '''
+        Maximum overestimate of any count, at most total() / capacity.
+        '''
+        return self._floor()
+
+    def total(self):
+        '''
+        Number of items counted, tracked or not.
+        '''
+        return self._total
+
+    def items(self):
+        return self.counts.items()
+
+    def values(self):
+        return self.counts.values()
+
+    def __getitem__(self, item):
+        # Items that are not tracked were seen at most error_bound() times
+        return self.counts.get(item, 0)
+
+    def __contains__(self, item):
+        return item in self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __bool__(self):
+        return bool(self.counts)
+
+    def __repr__(self):
+        return f'{type(self).__name__}(capacity={self.capacity}, total={self._total}, top={self.most_common(3)})'
+
+    def _floor(self):
+        # Smallest tracked count once full: the most an untracked item can have been seen
+        if len(self.counts) < self.capacity:
+            return 0
+        return self._pop_min(remove=False)[1]
+
+    def _push(self, item):
+        heap = self._heap
+        heapq.heappush(heap, (self.counts[item], item))
+        if len(heap) > 4 * self.capacity:
+            # Drop the stale entries left behind by increments
+            self._heap = [(count, item) for item, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self, remove=True):
+        # Entries are pushed on every change, so an entry is current only if it
+        # matches the item's count; stale ones are discarded on the way
+        heap, counts = self._heap, self.counts
+        while True:
+            count, item = heap[0]
+            if counts.get(item) == count:
+                if remove:
+                    heapq.heappop(heap)
+                return item, count
+            heapq.heappop(heap)
+
+
+def make_counter(capacity=None):
+    '''
+    Frequency backend: exact counts, or approximate counts of at most `capacity` items.
+
+    :param capacity: int: Maximum items tracked (default: exact counts)
+
+    :return: ExactCounter or SpaceSaving
+    '''
+    return ExactCounter() if capacity is None else SpaceSaving(capacity)
@@ -0,0 +1,352 @@
+'''
+text_filters.py
+
+Regex engine behind filter_text.py: extract or remove emails, mentions,
+hashtags, links, etc. from text.
+
+Each selected filter is compiled once and scans the text with its own
+pattern. Where matches of two filters overlap (the "@domain" of an email is
+also a mention, a date can look like a phone number), only the match of the
+filter listed first in PRIORITY is kept, so no characters are counted twice;
+the overlapping match of the later filter is dropped entirely, not shortened.
+
+For tabular data the filters run over pandas Series row by row, so every
+match keeps the row it came from and no giant string is ever built from a
+column. process_csv() streams CSV
+files of any size in chunks across a process pool, counting matches
+incrementally, exactly or in bounded memory (see frequency.py); it is also
+available from the command line:
+
+    python text_filters.py export.csv -c text -f emails hashtags --top 15
+    python text_filters.py huge.csv -c text -f hashtags --capacity 10000
+    python text_filters.py export.csv -c text -f links -m clean -o cleaned.csv
+
+Usage:
+    text_filter = compile_filters(['emails', 'hashtags'])
+    text_filter.extract('Mail bob@example.com #python')
+    # {'emails': ['bob@example.com'], 'hashtags': ['#python']}
+    matches = text_filter.extract_series(df['text'])  # one row per match
+'''
+
+import argparse
+import json
+import os
+import re
+import sys
+from bisect import bisect_right
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from frequency import make_counter
+
+# Define regex patterns for various filters
+PATTERNS = {
+    'emails': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    'mentions': r'@\w+',
+    'hashtags': r'#\w+',
+    'links': r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+',
+    'html_tags': r'<[^>]+>',
+    'phone_numbers': r'\+?\d{1,3}[-.\s]?\(?\d{1,4}?\)?[-.\s]?\d{1,4}[-.\s]?\d{1,9}',
+    'dates': r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b|\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b',
+    'currency': r'\$\d+(?:\.\d{2})?|€\d+(?:\.\d{2})?|£\d+(?:\.\d{2})?|USD\s\d+(?:\.\d+)?',
+    'emojis': r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F700-\U0001F77F\U0001F900-\U0001F9FF]+',
+}
+
+# Filter kept when matches overlap, first wins: longer, more specific tokens first
+PRIORITY = ('html_tags', 'links', 'emails', 'dates', 'currency', 'phone_numbers',
+            'mentions', 'hashtags', 'emojis')
+
+MODES = ('extract', 'clean')
+DEFAULT_CHUNKSIZE = 100_000
+
+
+class TextFilter:
+    '''
+    A set of compiled filters whose overlapping matches are resolved by PRIORITY.
+
+    :param filters: iterable of filter names (keys of PATTERNS)
+    '''
+
+    def __init__(self, filters):
+        unknown = set(filters) - set(PATTERNS)
+        if unknown:
+            raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+        self.filters = tuple(name for name in PRIORITY if name in set(filters))
+        self.patterns = tuple((name, re.compile(PATTERNS[name])) for name in self.filters)
+
+    def matches(self, text):
+        '''
+        Find the matches of every filter, without overlaps.
+
+        Filters scan the text in PRIORITY order; a match overlapping one
+        already kept is dropped.
+
+        :param text: str: Text data to process
+
+        :return: list: (start, end, filter name) of each match, in text order
+        '''
+        if len(self.patterns) == 1:
+            name, pattern = self.patterns[0]
+            return [(*match.span(), name) for match in pattern.finditer(text)]
+        starts, ends, names = [], [], []
+        for name, pattern in self.patterns:
+            for match in pattern.finditer(text):
+                start, end = match.span()
+                i = bisect_right(starts, start)
+                if (i and ends[i - 1] > start) or (i < len(starts) and starts[i] < end):
+                    continue
+                starts.insert(i, start)
+                ends.insert(i, end)
+                names.insert(i, name)
+        return list(zip(starts, ends, names))
+
+    def extract(self, text):
+        '''
+        Extract the matches of every filter.
+
+        :param text: str: Text data to process
+
+        :return: dict: Filter name -> list of matches, in text order
+        '''
+        found = {name: [] for name in self.filters}
+        for start, end, name in self.matches(text):
+            found[name].append(text[start:end])
+        return found
+
+    def clean(self, text):
+        '''
+        Remove the matches of every filter.
+
+        :param text: str: Text data to process
+
+        :return: str: Cleaned text
+        '''
+        pieces, position = [], 0
+        for start, end, _ in self.matches(text):
+            pieces.append(text[position:start])
+            position = end
+        pieces.append(text[position:])
+        return ''.join(pieces)
+
+    def process(self, text, mode):
+        '''
+        Extract or clean text, see process_text().
+        '''
+        if mode == 'extract':
+            return self.extract(text)
+        if mode == 'clean':
+            return {'cleaned_text': self.clean(text)}
+        raise ValueError(f"mode must be one of {MODES}, not {mode!r}")
+
+    def extract_series(self, series):
+        '''
+        Extract the matches of every row of a pandas Series.
+
+        :param series: pandas.Series: Text column (missing values are skipped)
+
+        :return: pandas.DataFrame: One row per match, indexed by the source row,
+            with 'filter' and 'match' columns
+        '''
+        import pandas as pd
+
+        series = series.dropna().astype(str)
+        rows, names, values = [], [], []
+        matches = self.matches
+        for row, text in zip(series.index, series.to_numpy()):
+            for start, end, name in matches(text):
+                rows.append(row)
+                names.append(name)
+                values.append(text[start:end])
+        index = pd.Index(rows, dtype=series.index.dtype, name=series.index.name)
+        return pd.DataFrame({'filter': names, 'match': values}, index=index, dtype=object)
+
+    def clean_series(self, series):
+        '''
+        Remove the matches of every filter from each row of a pandas Series.
+
+        :param series: pandas.Series: Text column
+
+        :return: pandas.Series: Cleaned rows, missing values left as they are
+        '''
+        return series.map(self.clean, na_action='ignore')
+
+
+@lru_cache(maxsize=64)
+def _compile(filters):
+    return TextFilter(filters)
+
+
+def compile_filters(filters):
+    '''
+    Compiled TextFilter for a selection of filters, cached by selection.
+
+    :param filters: iterable of filter names
+
+    :return: TextFilter
+    '''
+    return _compile(tuple(sorted(set(filters))))
+
+
+def process_text(text, filters, mode):
+    '''
+    Process text data by extracting or cleaning based on selected filters and mode.
+
+    :param text: str: Text data to process
+    :param filters: list: List of filters to apply
+    :param mode: str: Mode of operation ('extract' or 'clean')
+
+    :return: dict: Processed information
+    '''
+    return compile_filters(filters).process(text, mode)
+
+
+def matches_by_filter(matches):
+    '''
+    Group the output of TextFilter.extract_series() into lists per filter.
+
+    :param matches: pandas.DataFrame: Matches with 'filter' and 'match' columns
+
+    :return: dict: Filter name -> list of matches
+    '''
+    return {name: group.tolist() for name, group in matches.groupby('filter', sort=False)['match']}
+
+
+def _extract_chunk(texts, filters, rows, capacity):
+    # Runs in a worker process: count the matches of one chunk of rows
+    matches = compile_filters(filters).matches
+    found = {name: Counter() for name in filters}
+    for text in texts:
+        for start, end, name in matches(text):
+            found[name][text[start:end]] += 1
+    if capacity is None:
+        return rows, found
+    # Only the summary of the chunk goes back to the parent process
+    counts = {name: make_counter(capacity) for name in filters}
+    for name, counter in found.items():
+        counts[name].update(counter)
+    return rows, counts
+
+
+def _clean_chunk(frame, column, filters):
+    # Runs in a worker process: clean one chunk of rows
+    text_filter = compile_filters(filters)
+    frame[column] = text_filter.clean_series(frame[column])
+    return len(frame), frame
+
+
+def process_csv(source, column, filters, mode='extract', chunksize=DEFAULT_CHUNKSIZE, workers=None,
+                output=None, progress=None, capacity=None):
+    '''
+    Extract or clean a CSV column in chunks, without loading the whole file.
+
+    Chunks are read in order and processed across a process pool, with at
+    most a few chunks in flight, so memory stays bounded by the chunk size.
+
+    :param source: str or file object: CSV file to read
+    :param column: str: Column to process
+    :param filters: list: Filters to apply
+    :param mode: str: 'extract' counts the matches, 'clean' writes the cleaned CSV to output
+    :param chunksize: int: Rows per chunk
+    :param workers: int: Worker processes (default: CPU count; 1 processes chunks inline)
+    :param output: str or file object: Cleaned CSV, required in 'clean' mode
+    :param progress: callable: Called with the number of rows processed so far
+    :param capacity: int: Distinct matches tracked per filter in 'extract' mode, in
+        bounded memory with approximate counts (default: exact counts)
+
+    :return: dict: 'rows' and 'chunks' processed, and in 'extract' mode 'counts'
+        (filter name -> ExactCounter or SpaceSaving of matches, see frequency.py)
+    '''
+    import pandas as pd
+
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, not {mode!r}")
+    if mode == 'clean' and output is None:
+        raise ValueError("clean mode needs an output file")
+    filters = compile_filters(filters).filters
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    reader = pd.read_csv(source, chunksize=chunksize, dtype={column: object},
+                         usecols=[column] if mode == 'extract' else None)
+    if mode == 'extract':
+        tasks = ((_extract_chunk, chunk[column].dropna().astype(str).tolist(), filters, len(chunk), capacity)
+                 for chunk in reader)
+    else:
+        tasks = ((_clean_chunk, chunk, column, filters) for chunk in reader)
+
+    summary = {'rows': 0, 'chunks': 0}
+    counts = {name: make_counter(capacity) for name in filters}
+    first = True
+
+    def collect(result):
+        nonlocal first
+        rows, value = result
+        if mode == 'extract':
+            for name, counter in value.items():
+                counts[name].merge(counter)
+        else:
+            value.to_csv(output, header=first, index=False, mode='w' if first else 'a')
+            first = False
+        summary['rows'] += rows
+        summary['chunks'] += 1
+        if progress is not None:
+            progress(summary['rows'])
+
+    if workers == 1:
+        for func, *args in tasks:
+            collect(func(*args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Keep results in file order while bounding the chunks held in memory
+            pending = deque()
+            for func, *args in tasks:
+                pending.append(pool.submit(func, *args))
+                if len(pending) >= workers * 2:
+                    collect(pending.popleft().result())
+            while pending:
+                collect(pending.popleft().result())
+
+    if mode == 'extract':
+        summary['counts'] = counts
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extract or clean emails, hashtags, links, ... in a CSV column.')
+    parser.add_argument('csv', help='CSV file to process')
+    parser.add_argument('-c', '--column', required=True, help='Column to process')
+    parser.add_argument('-f', '--filters', nargs='+', choices=list(PATTERNS), required=True,
+                        help='Filters to apply')
+    parser.add_argument('-m', '--mode', choices=MODES, default='extract', help='Mode of operation (default: extract)')
+    parser.add_argument('-o', '--output', help='Cleaned CSV (clean mode)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f'Rows per chunk (default: {DEFAULT_CHUNKSIZE})')
+    parser.add_argument('-j', '--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--top', type=int, default=15, help='Most common matches shown per filter (default: 15)')
+    parser.add_argument('--capacity', type=int,
+                        help='Track at most this many distinct matches per filter, with approximate counts '
+                             '(default: exact counts)')
+    parser.add_argument('--json', action='store_true', help='Print the extract summary as JSON')
+    args = parser.parse_args()
+
+    if args.mode == 'clean' and not args.output:
+        parser.error('clean mode needs --output')
+    result = process_csv(args.csv, args.column, args.filters, args.mode, args.chunksize, args.workers,
+                         args.output, progress=lambda rows: print(f'{rows} rows', file=sys.stderr),
+                         capacity=args.capacity)
+    if args.mode == 'clean':
+        print(f"Cleaned {result['rows']} rows into {args.output}")
+    elif args.json:
+        print(json.dumps({'rows': result['rows'],
+                          'top': {name: [(item, count, counter.error(item)) for item, count in counter.most_common(args.top)]
+                                  for name, counter in result['counts'].items()}}))
+    else:
+        for name, counter in result['counts'].items():
+            if counter.capacity is None:
+                print(f"{name}: {counter.total()} matches, {len(counter)} distinct")
+            else:
+                print(f"{name}: {counter.total()} matches, counts overestimated by at most {counter.error_bound()}")
+            for item, count in counter.most_common(args.top):
+                error = counter.error(item)
+                print(f"  {count:>10}  {item}" + (f"  (at least {count - error})" if error else ''))
@@ -5,14 +5,22 @@ clean_text_urls.py
 This script cleans URLs in text files, HTML files, and Markdown files by removing tracking
 parameters (e.g., UTM parameters) and following redirects to get the final URL.
 
-The script processes all files in a specified input directory (e.g., "input_files") and
-saves the cleaned files in an output directory (e.g., "output_files").
+The script processes all files under a specified input directory (e.g., "input_files"),
+recursively, and saves the cleaned files in an output directory (e.g., "output_files")
+mirroring the input tree. Files that did not change since the previous run are skipped.
 
 The script performs the following steps:
 1. Read the content of a text file, HTML file, or Markdown file.
-2. Extract hyperlinks from the content with BeautifulSoup (for HTML files) or regex (for .md files).
-3. Follow the redirect for each link and clean the tracking parameters (e.g., UTM parameters).
-4. Replace the original links with the cleaned URLs in the content.
+2. Find the link spans in the content in one pass: <a href> values for HTML files (validated
+   with lxml), and Markdown links, autolinks and bare URLs for .md and .txt files.
+3. Follow the redirect for each link and clean the tracking parameters (UTM parameters, fbclid,
+   gclid, ... and per-site rules, see url_rules.py). With --offline no request is made at all
+   and links are only stripped of their tracking parameters.
+   Links are resolved concurrently over pooled keep-alive connections, with a
+   HEAD request first (falling back to a streamed GET), a per-host limit on
+   concurrent requests and a global deadline for the whole file. Resolutions
+   can be kept in a persistent UrlCache shared by every file and every run.
+4. Rewrite the link spans with the cleaned URLs, building the new content in one join.
 5. Save the updated content to a new file in the output directory.
 
 The script supports the following file formats:
@@ -24,121 +32,594 @@ Usage:
 - Place all input files in the "input_files" directory.
 - Run the script to process all files in the input directory.
 - The cleaned files will be saved in the "output_files" directory.
+- Or pass the directories: python -m py_tools.work_tools.clean_text_urls docs/ docs_clean/ [-j 8]
 
-This script requires the `requests` and `beautifulsoup4` libraries, which can be installed via pip:
+This script requires the `requests` and `lxml` libraries, which can be installed via pip:
 
-    pip install requests beautifulsoup4
+    pip install requests lxml
 
 Author: Massamba Sow
 Date: 2024-09-01
 License: MIT
 '''
 
+import argparse
+import hashlib
+import html
+import json
 import os
-from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from itertools import zip_longest
+from urllib.parse import urlparse
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+import lxml.html
+if __package__:
+    from .url_cache import UrlCache
+    from .url_rules import strip_tracking
+else:  # run as a script: python py_tools/work_tools/clean_text_urls.py
+    from url_cache import UrlCache
+    from url_rules import strip_tracking
+
+REQUEST_TIMEOUT = 5
+DEFAULT_WORKERS = 32
+PER_HOST_LIMIT = 4
+# Some servers reject HEAD or answer it differently from GET
+HEAD_FALLBACK_STATUS = {403, 404, 405, 501}
+EXTENSIONS = ('.txt', '.html', '.htm', '.md')
+MANIFEST_NAME = '.clean_text_urls.manifest.json'
+
+
+def make_session(pool_size=DEFAULT_WORKERS):
+    """
+    Create a requests session reusing keep-alive connections across links.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = 'Mozilla/5.0 (compatible; clean_text_urls)'
+    return session
 
 
-def clean_url(url):
+def _resolve(url, session, timeout):
     """
-    Follow the redirect and clean the tracking parameters.
+    Follow the redirects of a URL, return (final URL, True) or (url, False) on failure.
     """
     try:
-        # Resolve the final URL by following redirects
-        response = requests.get(url, allow_redirects=True, timeout=5)
-        final_url = response.url
+        with session.head(url, allow_redirects=True, timeout=timeout) as response:
+            if response.status_code not in HEAD_FALLBACK_STATUS:
+                return response.url, True
+        with session.get(url, allow_redirects=True, timeout=timeout, stream=True) as response:
+            return response.url, True
+    except requests.exceptions.RequestException:
+        return url, False
 
-        # Parse the URL and remove tracking parameters (e.g., UTM params)
-        parsed = urlparse(final_url)
-        query_params = parse_qs(parsed.query)
-        cleaned_query = {k: v for k, v in query_params.items() if not k.startswith('utm')}
-        parsed = parsed._replace(query=urlencode(cleaned_query, doseq=True))
 
-        return urlunparse(parsed)
-    except requests.exceptions.RequestException:
-        # If any error occurs, return the original URL
-        return url
-    finally:
-        if response:
-            response.close()
+def resolve_url(url, session=None, timeout=REQUEST_TIMEOUT):
+    """
+    Follow the redirects of a URL and return the final URL, or the URL itself on failure.
+
+    A HEAD request is tried first; if the server rejects it, a streamed GET
+    follows the redirects without downloading the response body.
+    """
+    return _resolve(url, session or requests, timeout)[0]
+
+
+def clean_url(url, session=None, timeout=REQUEST_TIMEOUT):
+    """
+    Follow the redirect and clean the tracking parameters.
+    """
+    return strip_tracking(resolve_url(url, session, timeout))
+
+
+class UrlResolver:
+    """
+    Clean many URLs concurrently over one pooled session.
+
+    :param workers: int number of requests in flight
+    :param per_host: int maximum concurrent requests to the same host
+    :param timeout: float timeout of each request in seconds
+    :param deadline: float seconds allowed for a whole clean_all() call; URLs not
+        resolved by then are only stripped of their tracking parameters
+    :param session: requests.Session to use (default: make_session(workers))
+    :param cache: UrlCache of previous resolutions, consulted before any request
+    :param offline: bool never follow redirects, only strip tracking parameters
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, per_host=PER_HOST_LIMIT, timeout=REQUEST_TIMEOUT,
+                 deadline=None, session=None, cache=None, offline=False):
+        self.workers = workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.deadline = deadline
+        self.offline = offline
+        self.session = None if offline else session or make_session(workers)
+        self.cache = cache
+        self.requested = 0
+        self.failed = 0
+        self.timed_out = 0
+        self._host_limits = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+        self._lock = threading.Lock()
+
+    def _host_limit(self, url):
+        with self._lock:
+            return self._host_limits[urlparse(url).netloc.lower()]
+
+    def resolve(self, url, expires=None):
+        """
+        Final URL of a link and whether it was resolved, or None past the deadline.
+        """
+        with self._host_limit(url):
+            timeout = self.timeout
+            if expires is not None:
+                timeout = min(timeout, expires - time.monotonic())
+                if timeout <= 0:
+                    return None
+            return _resolve(url, self.session, timeout)
+
+    def clean_all(self, urls, unresolved=None):
+        """
+        Resolve and clean each distinct URL once.
+
+        :param urls: iterable of URLs
+        :param unresolved: set to which the URLs that failed or missed the deadline are
+            added; they are only stripped of their tracking parameters
+        :return: dict mapping each URL to its cleaned URL
+        """
+        unique = list(dict.fromkeys(urls))
+        cleaned = {url: strip_tracking(url) for url in unique}
+        if self.offline:
+            return cleaned
+        if unresolved is None:
+            unresolved = set()
+        if self.cache is not None and unique:
+            cached = self.cache.get_many(unique)
+            for url, (resolved, ok) in cached.items():
+                cleaned[url] = strip_tracking(resolved)
+                if not ok:
+                    unresolved.add(url)
+            unique = [url for url in unique if url not in cached]
+        if not unique:
+            return cleaned
+        expires = time.monotonic() + self.deadline if self.deadline is not None else None
+
+        # Interleave hosts so that workers do not all queue behind one host's limit
+        by_host = defaultdict(list)
+        for url in unique:
+            by_host[urlparse(url).netloc.lower()].append(url)
+        ordered = [url for batch in zip_longest(*by_host.values()) for url in batch if url is not None]
+
+        pool = ThreadPoolExecutor(max_workers=min(self.workers, len(ordered)))
+        try:
+            futures = {pool.submit(self.resolve, url, expires): url for url in ordered}
+            timeout = expires - time.monotonic() if expires is not None else None
+            done, _ = wait(futures, timeout=max(timeout, 0) if timeout is not None else None)
+            results = []
+            for future in done:
+                result = future.result()
+                if result is None:
+                    continue
+                url = futures[future]
+                results.append((url, *result))
+                cleaned[url] = strip_tracking(result[0])
+        finally:
+            # Requests still running finish within their own timeout
+            pool.shutdown(wait=False, cancel_futures=True)
+        self.requested += len(results)
+        self.failed += sum(1 for _, _, ok in results if not ok)
+        self.timed_out += len(unique) - len(results)
+        answered = {url for url, _, ok in results if ok}
+        unresolved.update(url for url in unique if url not in answered)
+        if self.cache is not None:
+            self.cache.put_many(results)
+        return cleaned
+
+    def stats(self):
+        """
+        Counters of the links resolved so far, including the cache's.
+
+        :return: dict with 'requested', 'failed', 'timed_out' and the cache hits/misses
+        """
+        stats = {'requested': self.requested, 'failed': self.failed, 'timed_out': self.timed_out}
+        if self.cache is not None:
+            stats.update(self.cache.stats())
+        return stats
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Link spans, found in one pass over the text: the URL is the only captured group
+_TEXT_LINK_PATTERN = re.compile(r"""
+      \]\(\s*<?(?P<markdown>https?://(?:[^\s()<>]|\([^\s()<>]*\))+)      # [text](url)
+    | \bhref\s*=\s*(?P<quote>["'])(?P<href>https?://[^"'\s]+)(?P=quote)  # inline HTML in Markdown
+    | <(?P<angle>https?://[^\s<>]+)>                                      # <url> autolink
+    | (?P<bare>https?://[^\s<>"'\[\]{}|\\^`]+)                            # bare URL in text
+""", re.VERBOSE | re.IGNORECASE)
+_HREF_PATTERN = re.compile(r"""\bhref\s*=\s*(?:"(?P<double>[^"]*)"|'(?P<single>[^']*)'|(?P<unquoted>[^\s"'>]+))""",
+                           re.IGNORECASE)
+_TRAILING_PUNCTUATION = '.,;:!?*_~\'"'
+
+
+def _trim_bare_url(url):
+    """
+    Drop the sentence punctuation that ends a bare URL, and a closing parenthesis it does not open.
+    """
+    while True:
+        stripped = url.rstrip(_TRAILING_PUNCTUATION)
+        if stripped.endswith(')') and stripped.count('(') < stripped.count(')'):
+            stripped = stripped[:-1]
+        if stripped == url:
+            return url
+        url = stripped
+
+
+def find_text_link_spans(text):
+    """
+    Find the URLs of Markdown links, autolinks, inline hrefs and bare URLs in one pass.
+
+    Returns a list of (start, end, url) in text order.
+    """
+    spans = []
+    for match in _TEXT_LINK_PATTERN.finditer(text):
+        group = match.lastgroup
+        if group == 'quote':
+            group = 'href'
+        url = match.group(group)
+        if group == 'bare':
+            url = _trim_bare_url(url)
+        start = match.start(group)
+        spans.append((start, start + len(url), url))
+    return spans
 
 
 def extract_links(html_text):
     """
-    Extract all hyperlinks from the text using BeautifulSoup.
+    Extract all hyperlinks from the text using lxml.
     """
-    soup = BeautifulSoup(html_text, 'html.parser')
-    links = [a['href'] for a in soup.find_all('a', href=True)]
-    return links
+    if not html_text.strip():
+        return []
+    try:
+        document = lxml.html.fromstring(html_text)
+    except ValueError:
+        # lxml refuses str input carrying an XML encoding declaration
+        document = lxml.html.fromstring(html_text.encode('utf-8'))
+    return [href.strip() for href in document.xpath('//a/@href')]
 
 
-import re
+def find_html_link_spans(html_text):
+    """
+    Find the href values of the <a> elements of an HTML document.
 
-def extract_links_markdown(md_text):
+    lxml decides which hrefs are real links (not in comments or scripts); the
+    spans themselves come from one regex pass, since lxml keeps no offsets.
+    Returns a list of (start, end, url) in text order, url being entity-decoded.
     """
-    Extract all links from Markdown text using regex.
+    links = {link for link in extract_links(html_text) if link.lower().startswith(('http://', 'https://'))}
+    spans = []
+    for match in _HREF_PATTERN.finditer(html_text):
+        group = match.lastgroup
+        url = html.unescape(match.group(group)).strip()
+        if url in links:
+            spans.append((match.start(group), match.end(group), url))
+    return spans
+
+
+def rewrite_spans(text, spans, replacements, escape=None):
+    """
+    Replace the text of each span whose URL has a different replacement, in a single join.
     """
-    # Pattern for Markdown links: [text](url)
-    link_pattern = re.compile(r'\[.*?\]\((https?://.*?)\)')
-    links = link_pattern.findall(md_text)
-    return links
+    parts = []
+    position = 0
+    for start, end, url in spans:
+        new_url = replacements.get(url, url)
+        if new_url == url:
+            continue
+        parts.append(text[position:start])
+        parts.append(escape(new_url) if escape else new_url)
+        position = end
+    if not parts:
+        return text
+    parts.append(text[position:])
+    return ''.join(parts)
 
 
-def clean_links_in_text(text):
+def extract_links_markdown(md_text):
     """
-    Clean tracking links in the original HTML/Markdown text.
+    Extract all links from Markdown or plain text: [text](url) links, <url> autolinks and bare URLs.
     """
-    if "<html>" in text or "<body>" in text:  # HTML content
-        links = extract_links(text)
-    else:  # Markdown content
-        links = extract_links_markdown(text)
+    return [url for _, _, url in find_text_link_spans(md_text)]
 
-    cleaned_links = {link: clean_url(link) for link in links}
 
-    # Replace each link in the original text
-    for original_link, cleaned_link in cleaned_links.items():
-        text = text.replace(original_link, cleaned_link)
+def is_html(text):
+    """
+    Whether a text looks like an HTML document.
+    """
+    head = text[:4096].lower()
+    return '<html' in head or '<body' in head or '<!doctype html' in head
 
-    return text
 
+def clean_links_in_text(text, resolver=None, kind=None):
+    """
+    Clean tracking links in the original HTML/Markdown/plain text.
 
-def process_file(input_file, output_file):
+    kind is 'html' or 'text' (Markdown is text); by default it is guessed from the content.
+    """
+    if kind is None:
+        kind = 'html' if is_html(text) else 'text'
+    if kind == 'html':
+        spans = find_html_link_spans(text)
+        escape = lambda url: html.escape(url, quote=True)
+    else:
+        spans = find_text_link_spans(text)
+        escape = None
+
+    links = [url for _, _, url in spans]
+    if resolver is None:
+        with UrlResolver() as resolver:
+            cleaned_links = resolver.clean_all(links)
+    else:
+        cleaned_links = resolver.clean_all(links)
+
+    return rewrite_spans(text, spans, cleaned_links, escape)
+
+
+def process_file(input_file, output_file, resolver=None):
     """
     Process a single file: read content, clean links, and save updated content.
     """
     with open(input_file, 'r', encoding='utf-8') as f:
         content = f.read()
 
-    cleaned_content = clean_links_in_text(content)
+    kind = 'html' if input_file.lower().endswith(('.html', '.htm')) else None
+    cleaned_content = clean_links_in_text(content, resolver, kind)
 
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(cleaned_content)
 
 
-def batch_process(directory, output_directory):
+def find_files(directory, extensions=EXTENSIONS):
     """
-    Batch process all .txt, .html, or .md files in a directory.
+    Relative paths of the files to clean under a directory, searched recursively.
     """
-    if not os.path.exists(output_directory):
-        os.makedirs(output_directory)
+    found = []
+    for folder, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(extensions) and name != MANIFEST_NAME:
+                found.append(os.path.relpath(os.path.join(folder, name), directory))
+    return found
+
 
-    files = [f for f in os.listdir(directory) if f.endswith(('.txt', '.html', '.md'))]
+def _is_html_file(path):
+    return path.lower().endswith(('.html', '.htm'))
 
-    for filename in files:
-        input_path = os.path.join(directory, filename)
-        output_path = os.path.join(output_directory, filename)
 
-        print(f"Processing file: {input_path}")
-        process_file(input_path, output_path)
+def scan_file(path):
+    """
+    Hash a file and collect its links, reading text files line by line.
+
+    Returns (SHA-256 hex digest, list of links).
+    """
+    digest = hashlib.sha256()
+    links = []
+    with open(path, 'rb') as f:
+        if _is_html_file(path):
+            data = f.read()
+            digest.update(data)
+            links = [url for _, _, url in find_html_link_spans(data.decode('utf-8'))]
+        else:
+            # Markdown links and bare URLs never span lines
+            for line in f:
+                digest.update(line)
+                links.extend(url for _, _, url in find_text_link_spans(line.decode('utf-8')))
+    return digest.hexdigest(), links
+
+
+def write_cleaned(input_path, output_path, cleaned_links):
+    """
+    Write a cleaned copy of a file atomically, streaming text files line by line.
+
+    Returns the SHA-256 hex digest of the written content.
+    """
+    digest = hashlib.sha256()
+    folder = os.path.dirname(output_path) or '.'
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.', suffix='.tmp')
+    try:
+        with open(input_path, 'rb') as source, os.fdopen(fd, 'wb') as target:
+            if _is_html_file(input_path):
+                text = source.read().decode('utf-8')
+                chunks = [rewrite_spans(text, find_html_link_spans(text), cleaned_links,
+                                        lambda url: html.escape(url, quote=True))]
+            else:
+                chunks = (rewrite_spans(line, find_text_link_spans(line), cleaned_links)
+                          for line in (raw.decode('utf-8') for raw in source))
+            for chunk in chunks:
+                data = chunk.encode('utf-8')
+                digest.update(data)
+                target.write(data)
+        shutil.copymode(input_path, tmp_path)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    """
+    Load the manifest of a previous run: relative path -> [mtime_ns, size, digest, mode].
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    """
+    Save a manifest atomically.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.', suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def batch_process(directory, output_directory, cache=None, workers=8, resolver=None, force=False):
+    """
+    Batch process all .txt, .html, or .md files under a directory, recursively.
+
+    The pipeline runs in three stages: files are hashed and their links
+    collected on a thread pool, every distinct link of the corpus is then
+    resolved once, and the cleaned files are written back atomically on the
+    pool. A manifest in the output directory records the mtime, size and
+    hash of each input and whether its links were resolved online or only
+    cleaned offline, so unchanged files are skipped on the next run in the
+    same mode without being read (or only hashed, when just their mtime
+    changed).
+    Files with links that failed or missed the deadline are written but
+    left out of the manifest, so the next run tries their links again.
+
+    Returns a summary dict with file counts, errors and the resolver and cache counters.
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    manifest_path = os.path.join(output_directory, MANIFEST_NAME)
+    manifest = {} if force else load_manifest(manifest_path)
+    in_place = os.path.samefile(directory, output_directory)
+    files = find_files(directory)
+    errors = {}
+    own_resolver = resolver is None
+    if own_resolver:
+        resolver = UrlResolver(cache=cache)
+    # An offline run leaves redirects unresolved, so an online run redoes its files
+    mode = 'offline' if resolver.offline else 'online'
+
+    def check(relpath):
+        # Returns (relpath, stat, digest, links), links being None for an unchanged file
+        input_path = os.path.join(directory, relpath)
+        st = os.stat(input_path)
+        entry = manifest.get(relpath)
+        up_to_date = (entry is not None and entry[3:] == [mode]
+                      and os.path.exists(os.path.join(output_directory, relpath)))
+        if up_to_date and entry[:2] == [st.st_mtime_ns, st.st_size]:
+            return relpath, st, entry[2], None
+        digest, links = scan_file(input_path)
+        if up_to_date and entry[2] == digest:
+            return relpath, st, digest, None
+        return relpath, st, digest, links
+
+    def write(relpath, cleaned_links):
+        input_path = os.path.join(directory, relpath)
+        output_path = os.path.join(output_directory, relpath)
+        digest = write_cleaned(input_path, output_path, cleaned_links)
         print(f"Saved cleaned file: {output_path}")
+        if in_place:
+            # The output replaced the input: remember what was written
+            st = os.stat(output_path)
+            return relpath, [st.st_mtime_ns, st.st_size, digest, mode]
+        return relpath, None
+
+    pending = {}
+    unresolved = set()
+    skipped = written = retry = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(check, relpath): relpath for relpath in files}
+            for future in as_completed(futures):
+                try:
+                    relpath, st, digest, links = future.result()
+                except (OSError, UnicodeDecodeError) as e:
+                    errors[futures[future]] = f"{type(e).__name__}: {e}"
+                    continue
+                manifest_entry = [st.st_mtime_ns, st.st_size, digest, mode]
+                if links is None:
+                    manifest[relpath] = manifest_entry
+                    skipped += 1
+                else:
+                    pending[relpath] = (manifest_entry, links)
+
+            unique_links = list(dict.fromkeys(link for _, links in pending.values() for link in links))
+            print(f"Resolving {len(unique_links)} distinct links from {len(pending)} files")
+            cleaned_links = resolver.clean_all(unique_links, unresolved)
+
+            futures = {pool.submit(write, relpath, cleaned_links): relpath for relpath in pending}
+            for future in as_completed(futures):
+                relpath = futures[future]
+                try:
+                    _, written_entry = future.result()
+                except (OSError, UnicodeDecodeError) as e:
+                    errors[relpath] = f"{type(e).__name__}: {e}"
+                    manifest.pop(relpath, None)
+                    continue
+                written += 1
+                if unresolved.intersection(pending[relpath][1]):
+                    # Not recorded, so the next run processes the file again
+                    manifest.pop(relpath, None)
+                    retry += 1
+                    continue
+                manifest[relpath] = written_entry or pending[relpath][0]
+        stats = resolver.stats()
+    finally:
+        if own_resolver:
+            resolver.close()
+
+    # Forget files that no longer exist
+    existing = set(files)
+    manifest = {relpath: entry for relpath, entry in manifest.items() if relpath in existing}
+    save_manifest(manifest_path, manifest)
+    summary = {'files': len(files), 'written': written, 'skipped': skipped, 'retry': retry,
+               'links': len(unique_links), 'unresolved': len(unresolved), 'errors': len(errors), **stats}
+    print("Summary: " + ", ".join(f"{key}={value}" for key, value in summary.items()))
+    for relpath, error in sorted(errors.items()):
+        print(f"Error: {relpath}: {error}")
+    summary['error_files'] = errors
+    return summary
 
 
 if __name__ == "__main__":
-    # Specify the input directory and output directory
-    INPUT_DIRECTORY = os.path.join(os.getcwd(), "input_files")  # Directory containing input .txt, .html, or .md files
-    OUTPUT_DIRECTORY = os.path.join(os.getcwd(), "output_files")  # Directory to save processed files
-
-    # Batch process all files in the input directory
-    batch_process(INPUT_DIRECTORY, OUTPUT_DIRECTORY)
+    parser = argparse.ArgumentParser(description="Clean tracking links in text, HTML and Markdown files.")
+    parser.add_argument("input_directory", nargs="?", default=os.path.join(os.getcwd(), "input_files"),
+                        help="Directory searched recursively for .txt, .html and .md files (default: ./input_files)")
+    parser.add_argument("output_directory", nargs="?", default=os.path.join(os.getcwd(), "output_files"),
+                        help="Directory mirroring the input tree; may be the input directory (default: ./output_files)")
+    parser.add_argument("-j", "--workers", type=int, default=8, help="Files read and written concurrently (default: 8)")
+    parser.add_argument("--connections", type=int, default=DEFAULT_WORKERS,
+                        help=f"Links resolved concurrently (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--per-host", type=int, default=PER_HOST_LIMIT,
+                        help=f"Concurrent requests to one host (default: {PER_HOST_LIMIT})")
+    parser.add_argument("--deadline", type=float, help="Seconds allowed for resolving all links")
+    parser.add_argument("--force", action="store_true", help="Process files even if they did not change")
+    parser.add_argument("--cache-path", help="URL cache database (default: ~/.cache/py_tools/urls.db)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the URL cache")
+    parser.add_argument("--offline", action="store_true",
+                        help="Do not follow redirects, only strip tracking parameters")
+    args = parser.parse_args()
+
+    # Reuse resolutions of previous runs unless told otherwise
+    cache = None if args.no_cache or args.offline else UrlCache(args.cache_path)
+    try:
+        with UrlResolver(workers=args.connections, per_host=args.per_host, deadline=args.deadline,
+                         cache=cache, offline=args.offline) as url_resolver:
+            batch_process(args.input_directory, args.output_directory, workers=args.workers,
+                          resolver=url_resolver, force=args.force)
+    finally:
+        if cache is not None:
+            cache.close()
     print("Batch processing complete.")
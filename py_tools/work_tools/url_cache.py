@@ -0,0 +1,164 @@
+'''
+url_cache.py
+------------
+
+Persistent cache of URL resolutions (short link -> final URL) backed by SQLite,
+shared by every file of a batch and across runs.
+
+Successful resolutions are kept for `ttl` seconds; failures (timeouts,
+connection errors) are cached separately for the shorter `negative_ttl`, so
+a dead link is not retried on every file but is retried eventually. Once
+the cache holds more than `max_entries` URLs, expired entries and then the
+least recently used ones are evicted.
+
+Usage:
+    with UrlCache() as cache, UrlResolver(cache=cache) as resolver:
+        cleaned = resolver.clean_all(links)
+    print(cache.hits, cache.misses)
+'''
+
+import os
+import sqlite3
+import time
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_NEGATIVE_TTL = 3600
+DEFAULT_MAX_ENTRIES = 200_000
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    resolved TEXT NOT NULL,
+    ok INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_used ON urls (used);
+'''
+
+# SQLite limits the number of parameters of a statement
+_BATCH = 500
+
+
+def default_cache_path():
+    """
+    Database used when none is given: $PY_TOOLS_CACHE_DIR/urls.db or ~/.cache/py_tools/urls.db.
+    """
+    base = os.environ.get('PY_TOOLS_CACHE_DIR')
+    if not base:
+        cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        base = os.path.join(cache_home, 'py_tools')
+    return os.path.join(base, 'urls.db')
+
+
+class UrlCache:
+    """
+    SQLite cache of URL resolutions with TTLs, negative caching and LRU eviction.
+
+    :param db_path: str path of the database (default: default_cache_path())
+    :param ttl: float seconds a successful resolution stays valid
+    :param negative_ttl: float seconds a failed resolution stays valid
+    :param max_entries: int number of URLs above which entries are evicted
+    """
+
+    def __init__(self, db_path=None, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.db_path = os.fspath(db_path or default_cache_path())
+        if self.db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM urls').fetchone()[0]
+
+    def get_many(self, urls):
+        """
+        Look up fresh resolutions.
+
+        :param urls: list of URLs
+        :return: dict mapping cached URLs to (resolved URL, ok); failures map to (url, False)
+        """
+        now = time.time()
+        found = {}
+        for start in range(0, len(urls), _BATCH):
+            batch = urls[start:start + _BATCH]
+            rows = self._conn.execute(
+                f'SELECT url, resolved, ok FROM urls WHERE expires > ? '
+                f'AND url IN ({",".join("?" * len(batch))})',
+                [now, *batch],
+            )
+            for url, resolved, ok in rows:
+                found[url] = (resolved, bool(ok))
+        with self._conn:
+            self._conn.executemany('UPDATE urls SET used = ? WHERE url = ?',
+                                   ((now, url) for url in found))
+        negative = sum(1 for _, ok in found.values() if not ok)
+        self.hits += len(found) - negative
+        self.negative_hits += negative
+        self.misses += len(urls) - len(found)
+        return found
+
+    def get(self, url):
+        """
+        Cached (resolved URL, ok) of a URL, or None.
+        """
+        return self.get_many([url]).get(url)
+
+    def put_many(self, results):
+        """
+        Store resolutions, evicting old entries if the cache grows too large.
+
+        :param results: iterable of (url, resolved URL, ok)
+        """
+        now = time.time()
+        rows = [(url, resolved, int(ok), now + (self.ttl if ok else self.negative_ttl), now)
+                for url, resolved, ok in results]
+        with self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?, ?)', rows)
+        self._evict(now)
+
+    def put(self, url, resolved, ok=True):
+        self.put_many([(url, resolved, ok)])
+
+    def _evict(self, now):
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return
+        with self._conn:
+            excess -= self._conn.execute('DELETE FROM urls WHERE expires <= ?', (now,)).rowcount
+            if excess > 0:
+                self._conn.execute(
+                    'DELETE FROM urls WHERE url IN (SELECT url FROM urls ORDER BY used LIMIT ?)',
+                    (excess,),
+                )
+
+    def clear(self):
+        """Remove every cached entry."""
+        with self._conn:
+            self._conn.execute('DELETE FROM urls')
+
+    def stats(self):
+        """
+        Counters of this session.
+
+        :return: dict with 'hits', 'negative_hits' and 'misses'
+        """
+        return {'hits': self.hits, 'negative_hits': self.negative_hits, 'misses': self.misses}
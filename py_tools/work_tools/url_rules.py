@@ -0,0 +1,196 @@
+'''
+url_rules.py
+------------
+
+Offline removal of tracking parameters from URLs.
+
+Parameters are removed when their key is in a built-in table of tracking
+keys (fbclid, gclid, mc_eid, ...), starts with a tracking prefix (utm_,
+pk_, ...), or is listed in a rule for the URL's domain (e.g. `si` on
+youtube.com). Domain rules are looked up by host and then by each parent
+domain, so a rule for amazon.com also covers www.amazon.com.
+
+Only the removed `key=value` segments are cut out of the query; the other
+parameters keep their order and their exact encoding, and a URL without
+tracking parameters is returned unchanged. No network access is needed,
+so millions of URLs can be cleaned per minute.
+
+Usage:
+    strip_tracking('https://example.com/?id=7&utm_source=news&fbclid=abc')
+    # 'https://example.com/?id=7'
+'''
+
+from urllib.parse import unquote
+
+# Keys used for click, campaign and e-mail tracking by ad networks, analytics and mailers
+TRACKING_KEYS = frozenset(key.lower() for key in (
+    # Google Ads, Analytics, DoubleClick, Search Ads 360
+    'gclid', 'gclsrc', 'dclid', 'gbraid', 'wbraid', 'gad_source', '_ga', '_gl', 'srsltid',
+    # Meta, Instagram
+    'fbclid', 'igshid', 'igsh', 'mibextid',
+    # Microsoft Advertising, Yandex, Twitter/X, TikTok, LinkedIn, Snapchat, Pinterest, Reddit
+    'msclkid', 'yclid', 'ysclid', 'twclid', 'ttclid', 'li_fat_id', 'sccid', 'epik', 'rdt_cid',
+    # Mailchimp, Marketo, HubSpot, Vero, Omeda, Klaviyo, Braze, Sendgrid
+    'mc_cid', 'mc_eid', 'mkt_tok', '_hsenc', '_hsmi', '__hssc', '__hstc', '__hsfp',
+    'hsctatracking', 'vero_id', 'vero_conv', 'oly_anon_id', 'oly_enc_id', '_kx', 'ab_channel',
+    # Adobe, Openstat, Wicked Reports, Rakuten, Impact, Awin, CJ, ShareASale
+    's_cid', 'ef_id', '_openstat', 'wickedid', 'rb_clickid', 'ranmid', 'ransiteid', 'raneaid',
+    'irclickid', 'irgwc', 'awc', 'cjevent', 'cjdata', 'sscid',
+    # Generic campaign and referral tags (not campaign_id, which ad and analytics
+    # applications take as a functional parameter)
+    'trk', 'trkcampaign', 'trk_contact', 'trk_msg', 'trk_module', 'trk_sid', 'sc_campaign',
+    'sc_channel', 'sc_content', 'sc_medium', 'sc_outcome', 'sc_geo', 'sc_country', 'cmpid',
+    'ncid', 'icid', 'ref_src', 'ref_url', 'spm', 'scm', 'wt_mc', 'wt.mc_id',
+))
+
+# Key prefixes of tracking parameter families (UTM, Matomo/Piwik, HubSpot ads, ...)
+TRACKING_PREFIXES = ('utm_', 'pk_', 'mtm_', 'hsa_', 'piwik_', 'matomo_', 'stm_', 'itm_', 'vgo_ee')
+
+# Keys that only track on some sites; elsewhere they may be meaningful. Keys that
+# change what the page shows (Amazon th/psc pick the product variant, Reddit context
+# sets how much of a thread is shown) or that carry an affiliate id (Amazon tag) are
+# deliberately left alone
+DOMAIN_RULES = {
+    'youtube.com': ('si', 'feature', 'pp', 'ab_channel'),
+    'youtu.be': ('si', 'feature'),
+    'music.youtube.com': ('si', 'feature'),
+    'twitter.com': ('s', 't', 'ref_src', 'ref_url'),
+    'x.com': ('s', 't', 'ref_src', 'ref_url'),
+    'instagram.com': ('igshid', 'igsh', 'img_index'),
+    'facebook.com': ('__tn__', '__cft__', '__xts__', 'mibextid', 'ref', 'fref', 'hc_ref'),
+    'linkedin.com': ('trackingid', 'refid', 'lipi', 'licu', 'midtoken', 'midsig', 'trk', 'trkemail'),
+    'reddit.com': ('share_id', 'ref', 'ref_source'),
+    'tiktok.com': ('_r', '_t', 'is_from_webapp', 'sender_device', 'is_copy_url', 'share_app_id'),
+    'spotify.com': ('si', 'nd'),
+    'google.com': ('ved', 'ei', 'sa', 'usg', 'gs_lcp', 'gs_lp', 'sclient', 'oq', 'uact', 'sxsrf',
+                   'aqs', 'sourceid', 'ie', 'bih', 'biw', 'dpr', 'rlz'),
+    'bing.com': ('form', 'cvid', 'qs', 'sp', 'sk', 'pq', 'sc', 'ghsh', 'ghacc', 'ghpl'),
+    'medium.com': ('source',),
+    'nytimes.com': ('smid', 'smtyp', 'referringsource'),
+    'washingtonpost.com': ('itid', 'wpisrc', 'wpmk'),
+    'aliexpress.com': ('spm', 'scm', 'pvid', 'algo_pvid', 'algo_exp_id', 'aff_fcid', 'aff_fsk',
+                       'aff_platform', 'aff_trace_key', 'sk', 'terminal_id', 'gatewayadapt'),
+    'ebay.com': ('_trkparms', '_trksid', 'amdata', 'mkcid', 'mkrid', 'campid', 'toolid',
+                 'customid', 'mkevt', 'hash'),
+    'etsy.com': ('click_key', 'click_sum', 'ref', 'pro', 'sts', 'organic_search_click', 'frs'),
+    'booking.com': ('aid', 'label', 'sid', 'srpvid', 'srepoch', 'ucfs', 'all_sr_blocks'),
+    **{host: ('pd_rd_r', 'pd_rd_w', 'pd_rd_wg', 'pd_rd_i', 'pf_rd_p', 'pf_rd_r', 'pf_rd_s',
+              'pf_rd_t', 'pf_rd_i', 'pf_rd_m', 'qid', 'sr', 'crid', 'sprefix', 'dchild',
+              'content-id', '_encoding', 'ref_', 'linkcode', 'linkid', 'smid', 'spia')
+       for host in ('amazon.com', 'amazon.co.uk', 'amazon.de', 'amazon.fr', 'amazon.it', 'amazon.es',
+                    'amazon.ca', 'amazon.com.au', 'amazon.co.jp', 'amazon.in', 'amazon.nl',
+                    'amazon.com.br', 'amazon.com.mx', 'amazon.se', 'amazon.pl', 'amazon.com.be')},
+}
+
+_MAX_HOSTS = 65536
+
+
+class TrackingRules:
+    """
+    Tables of tracking keys, with per-domain rules indexed by host.
+
+    :param keys: iterable of keys removed on every site
+    :param prefixes: tuple of key prefixes removed on every site
+    :param domain_rules: dict mapping a domain to the keys removed on it and its subdomains
+    """
+
+    def __init__(self, keys=TRACKING_KEYS, prefixes=TRACKING_PREFIXES, domain_rules=None):
+        self.keys = frozenset(key.lower() for key in keys)
+        self.prefixes = tuple(prefix.lower() for prefix in prefixes)
+        self.domain_rules = {}
+        self._host_keys = {}
+        for domain, domain_keys in (DOMAIN_RULES if domain_rules is None else domain_rules).items():
+            self.add_domain_rule(domain, domain_keys)
+
+    def add_domain_rule(self, domain, keys):
+        """
+        Remove more keys on a domain and its subdomains.
+        """
+        domain = domain.lower().strip('.')
+        self.domain_rules[domain] = self.domain_rules.get(domain, frozenset()) | {k.lower() for k in keys}
+        self._host_keys = {}
+
+    def host_keys(self, host):
+        """
+        Keys removed on a host: the global keys plus the rules of the host and its parent domains.
+        """
+        keys = self._host_keys.get(host)
+        if keys is None:
+            keys = self.keys
+            domain = host
+            while domain:
+                rule = self.domain_rules.get(domain)
+                if rule:
+                    keys = keys | rule
+                domain = domain.partition('.')[2]
+            if len(self._host_keys) >= _MAX_HOSTS:
+                self._host_keys.clear()
+            self._host_keys[host] = keys
+        return keys
+
+    def is_tracking(self, key, keys):
+        """
+        Whether a raw (possibly percent-encoded) query key is a tracking key.
+        """
+        if '%' in key or '+' in key:
+            key = unquote(key.replace('+', ' '))
+        key = key.lower()
+        return key in keys or key.startswith(self.prefixes)
+
+    def strip(self, url):
+        """
+        Remove the tracking parameters of a URL, keeping everything else byte for byte.
+        """
+        query_start = url.find('?')
+        if query_start < 0 or '#' in url[:query_start]:
+            # No query, or a '?' inside the fragment
+            return url
+        fragment_start = url.find('#', query_start)
+        if fragment_start < 0:
+            fragment_start = len(url)
+        query = url[query_start + 1:fragment_start]
+        if not query:
+            return url
+
+        keys = self.host_keys(_host(url, query_start))
+        segments = query.split('&')
+        kept = [segment for segment in segments
+                if not segment or not self.is_tracking(segment.partition('=')[0], keys)]
+        if len(kept) == len(segments):
+            return url
+        kept = [segment for segment in kept if segment]
+        new_query = '?' + '&'.join(kept) if kept else ''
+        return url[:query_start] + new_query + url[fragment_start:]
+
+
+def _host(url, end):
+    """
+    Lower-case host of a URL, ignoring userinfo, port and a trailing dot.
+    """
+    start = url.find('//', 0, end)
+    if start < 0:
+        return ''
+    start += 2
+    stop = end
+    for separator in '/#':
+        position = url.find(separator, start, stop)
+        if position >= 0:
+            stop = position
+    authority = url[start:stop].rpartition('@')[2]
+    if authority.startswith('['):
+        return authority[:authority.find(']') + 1].lower()
+    return authority.partition(':')[0].rstrip('.').lower()
+
+
+DEFAULT_RULES = TrackingRules()
+
+
+def strip_tracking(url, rules=None):
+    """
+    Remove tracking parameters (e.g., UTM params, fbclid, gclid) from a URL, offline.
+
+    :param url: str URL
+    :param rules: TrackingRules to apply (default: the built-in tables)
+    :return: str URL without its tracking parameters
+    """
+    return (rules or DEFAULT_RULES).strip(url)
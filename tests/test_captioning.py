@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import types
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    from openai import AsyncOpenAI, OpenAI
+    from py_tools.sys_tools import captioning
+    from py_tools.sys_tools.captioning import async_client, caption_images, merge_caption
+    from py_tools.sys_tools.conversion_cache import ConversionCache
+except ImportError:  # openai is an optional dependency of the test run
+    AsyncOpenAI = None
+
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """OpenAI-compatible chat completions endpoint; the first request is throttled."""
+
+    requests = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.lock:
+            self.requests.append(body)
+            throttled = len(self.requests) == 1
+        if throttled:
+            self.send_json(429, {'error': {'message': 'slow down', 'type': 'rate_limit'}})
+            return
+        url = body['messages'][0]['content'][1]['image_url']['url']
+        self.send_json(200, {
+            'id': 'fake', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': f'caption of {len(url)}'}}],
+        })
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@unittest.skipIf(AsyncOpenAI is None, 'openai is not installed')
+class TestCaptioning(unittest.TestCase):
+
+    def setUp(self):
+        FakeOpenAI.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOpenAI)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._tmp.cleanup()
+
+    def image(self, name, data):
+        path = os.path.join(self._tmp.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_duplicates_are_captioned_once_and_throttling_is_retried(self):
+        paths = [self.image('a.png', b'one'), self.image('copy.png', b'one'),
+                 self.image('b.jpg', b'two!')]
+        client = AsyncOpenAI(base_url=f'http://127.0.0.1:{self.server.server_port}/v1',
+                             api_key='test', max_retries=0)
+        captions = asyncio.run(caption_images(paths, client=client, concurrency=2,
+                                              rate=100, backoff=0.01))
+        self.assertEqual(len(FakeOpenAI.requests), 3)  # two images plus one retry
+        self.assertEqual(captions[paths[0]], captions[paths[1]])
+        self.assertTrue(all(c.startswith('caption of') for c in captions.values()))
+
+    def test_cached_captions_are_not_requested_again(self):
+        paths = [self.image('a.png', b'one'), self.image('b.png', b'two')]
+        client = async_client(OpenAI(base_url=f'http://127.0.0.1:{self.server.server_port}/v1', api_key='test'))
+        self.assertEqual(client.max_retries, 0)
+        cache = ConversionCache(os.path.join(self._tmp.name, 'cache'))
+        first = asyncio.run(caption_images(paths, client=client, backoff=0.01, cache=cache))
+        self.assertEqual(len(FakeOpenAI.requests), 3)  # two images plus one retry
+        again = asyncio.run(caption_images([self.image('copy.png', b'one')] + paths, client=client, cache=cache))
+        self.assertEqual(len(FakeOpenAI.requests), 3)
+        self.assertEqual(list(again.values()), [first[paths[0]], first[paths[0]], first[paths[1]]])
+        # Another model is a different caption
+        asyncio.run(caption_images(paths[:1], client=client, model='other', cache=cache))
+        self.assertEqual(len(FakeOpenAI.requests), 4)
+
+    def test_encoded_images_are_bounded_by_concurrency(self):
+        paths = [self.image(f'{i}.png', bytes([i]) * 10) for i in range(12)]
+        held = peak = 0
+        encode = captioning._image_message
+
+        def image_message(path, prompt):
+            nonlocal held, peak
+            held += 1
+            peak = max(peak, held)
+            return encode(path, prompt)
+
+        async def create(model, messages):
+            nonlocal held
+            await asyncio.sleep(0.01)
+            held -= 1
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content='ok'))])
+
+        client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+        with mock.patch.object(captioning, '_image_message', image_message):
+            captions = asyncio.run(caption_images(paths, client=client, concurrency=3))
+        self.assertEqual(set(captions.values()), {'ok'})
+        self.assertLessEqual(peak, 3)
+
+    def test_merge_caption_matches_markitdown_layout(self):
+        self.assertEqual(merge_caption('ImageSize: 1x1\n', ' A cat. '),
+                         'ImageSize: 1x1\n\n# Description:\nA cat.\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+import itertools
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from py_tools.work_tools.clean_text_urls import (
+    UrlResolver, batch_process, clean_links_in_text, find_html_link_spans, find_text_link_spans,
+)
+from py_tools.work_tools.url_cache import UrlCache
+
+
+class Redirector(BaseHTTPRequestHandler):
+    """Short links redirecting to tracked URLs; /nohead rejects HEAD, /slow hangs."""
+
+    protocol_version = 'HTTP/1.1'
+    methods = []
+
+    def do_HEAD(self):
+        self.methods.append(('HEAD', self.path))
+        if self.path.startswith('/nohead'):
+            self.reply(405)
+        else:
+            self.route()
+
+    def do_GET(self):
+        self.methods.append(('GET', self.path))
+        self.route()
+
+    def route(self):
+        if self.path.startswith('/slow'):
+            time.sleep(1)
+        if self.path.startswith(('/short', '/nohead')):
+            self.reply(302, {'Location': '/final?id=7&utm_source=news'})
+        else:
+            self.reply(200, body=b'x' * 1000)
+
+    def reply(self, status, headers=None, body=b''):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestUrlResolver(unittest.TestCase):
+
+    def setUp(self):
+        Redirector.methods = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Redirector)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_resolves_with_head_and_falls_back_to_get(self):
+        with UrlResolver(workers=4) as resolver:
+            cleaned = resolver.clean_all([f'{self.base}/short/1', f'{self.base}/nohead/2',
+                                          f'{self.base}/short/1'])
+        self.assertEqual(set(cleaned.values()), {f'{self.base}/final?id=7'})
+        self.assertIn(('HEAD', '/short/1'), Redirector.methods)
+        self.assertIn(('GET', '/nohead/2'), Redirector.methods)
+        self.assertNotIn(('GET', '/short/1'), Redirector.methods)
+
+    def test_deadline_keeps_unresolved_links(self):
+        slow = f'{self.base}/slow?utm_medium=mail'
+        start = time.monotonic()
+        with UrlResolver(deadline=0.2) as resolver:
+            cleaned = resolver.clean_all([slow])
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual(cleaned[slow], f'{self.base}/slow')
+
+    def test_unreachable_link_is_kept(self):
+        text = '[a](http://127.0.0.1:9/x?utm_source=y)'
+        with UrlResolver(timeout=1) as resolver:
+            self.assertEqual(clean_links_in_text(text, resolver), '[a](http://127.0.0.1:9/x)')
+
+    def test_cache_is_shared_across_calls(self):
+        with UrlCache(':memory:') as cache:
+            with UrlResolver(cache=cache) as resolver:
+                resolver.clean_all([f'{self.base}/short/1', 'http://127.0.0.1:9/dead'])
+                requests_made = len(Redirector.methods)
+                cleaned = resolver.clean_all([f'{self.base}/short/1', 'http://127.0.0.1:9/dead'])
+                stats = resolver.stats()
+        self.assertEqual(len(Redirector.methods), requests_made)
+        self.assertEqual(cleaned[f'{self.base}/short/1'], f'{self.base}/final?id=7')
+        self.assertEqual((stats['requested'], stats['failed']), (2, 1))
+        self.assertEqual((stats['hits'], stats['negative_hits'], stats['misses']), (1, 1, 2))
+
+
+class FakeResolver:
+    """Resolver answering from a dict, without network."""
+
+    def __init__(self, mapping, failing=(), offline=False):
+        self.mapping = mapping
+        self.failing = set(failing)
+        self.offline = offline
+        self.calls = []
+
+    def clean_all(self, urls, unresolved=None):
+        urls = list(urls)
+        self.calls.append(urls)
+        if unresolved is not None:
+            unresolved.update(self.failing.intersection(urls))
+        if self.offline:
+            return {url: url for url in urls}
+        return {url: self.mapping.get(url, url) for url in urls}
+
+    def stats(self):
+        return {}
+
+
+class TestLinkRewriting(unittest.TestCase):
+
+    def test_prefix_urls_are_rewritten_independently(self):
+        text = 'http://t.co/a then [b](http://t.co/ab) and (http://t.co/a).'
+        resolver = FakeResolver({'http://t.co/a': 'https://one.org/', 'http://t.co/ab': 'https://two.org/'})
+        self.assertEqual(clean_links_in_text(text, resolver),
+                         'https://one.org/ then [b](https://two.org/) and (https://one.org/).')
+        self.assertEqual(resolver.calls, [['http://t.co/a', 'http://t.co/ab', 'http://t.co/a']])
+
+    def test_text_spans(self):
+        text = 'See https://en.wikipedia.org/wiki/Foo_(bar), <https://x.org/?utm_a=1> or [t](https://y.org "title")'
+        self.assertEqual([url for _, _, url in find_text_link_spans(text)],
+                         ['https://en.wikipedia.org/wiki/Foo_(bar)', 'https://x.org/?utm_a=1', 'https://y.org'])
+
+    def test_html_rewrites_anchor_hrefs_only(self):
+        text = ('<html><body><!-- <a href="https://c.com/">x</a> -->'
+                '<a href="https://h.com/?a=1&amp;utm_b=2">h</a><a href=/relative>r</a>'
+                '<p>https://h.com/?a=1&amp;utm_b=2</p></body></html>')
+        self.assertEqual([url for _, _, url in find_html_link_spans(text)], ['https://h.com/?a=1&utm_b=2'])
+        resolver = FakeResolver({'https://h.com/?a=1&utm_b=2': 'https://h.com/?a=1&c=2'})
+        self.assertIn('<a href="https://h.com/?a=1&amp;c=2">h</a>', clean_links_in_text(text, resolver))
+
+
+class TestBatchProcess(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self._tmp.name, 'src')
+        os.makedirs(os.path.join(self.src, 'nested'))
+        self.write('a.md', '[a](http://t.co/1)\nsame http://t.co/1\n')
+        self.write(os.path.join('nested', 'b.txt'), 'see http://t.co/2.\n')
+        self.write(os.path.join('nested', 'c.html'), '<html><body><a href="http://t.co/2">c</a></body></html>')
+        self.resolver = FakeResolver({'http://t.co/1': 'https://one.org/', 'http://t.co/2': 'https://two.org/'})
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, relpath, text, root=None):
+        with open(os.path.join(root or self.src, relpath), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def read(self, root, relpath):
+        with open(os.path.join(root, relpath), encoding='utf-8') as f:
+            return f.read()
+
+    def test_recursive_batch_resolves_each_link_once_and_skips_unchanged_files(self):
+        dst = os.path.join(self._tmp.name, 'dst')
+        summary = batch_process(self.src, dst, workers=2, resolver=self.resolver)
+        self.assertEqual((summary['files'], summary['written'], summary['skipped']), (3, 3, 0))
+        self.assertEqual(sorted(self.resolver.calls[0]), ['http://t.co/1', 'http://t.co/2'])
+        self.assertEqual(self.read(dst, 'a.md'), '[a](https://one.org/)\nsame https://one.org/\n')
+        self.assertEqual(self.read(dst, os.path.join('nested', 'b.txt')), 'see https://two.org/.\n')
+        self.assertIn('href="https://two.org/"', self.read(dst, os.path.join('nested', 'c.html')))
+
+        self.write('a.md', '[a](http://t.co/2)\n')
+        summary = batch_process(self.src, dst, workers=2, resolver=self.resolver)
+        self.assertEqual((summary['written'], summary['skipped']), (1, 2))
+        self.assertEqual(self.resolver.calls[-1], ['http://t.co/2'])
+        self.assertEqual(self.read(dst, 'a.md'), '[a](https://two.org/)\n')
+
+    def test_in_place_rerun_skips_written_files(self):
+        batch_process(self.src, self.src, resolver=self.resolver)
+        summary = batch_process(self.src, self.src, resolver=self.resolver)
+        self.assertEqual((summary['written'], summary['skipped']), (0, 3))
+        self.assertEqual(self.read(self.src, 'a.md'), '[a](https://one.org/)\nsame https://one.org/\n')
+
+    def test_files_with_unresolved_links_are_retried(self):
+        dst = os.path.join(self._tmp.name, 'dst')
+        self.resolver.failing = {'http://t.co/2'}
+        summary = batch_process(self.src, dst, resolver=self.resolver)
+        self.assertEqual((summary['written'], summary['retry'], summary['unresolved']), (3, 2, 1))
+        self.resolver.failing = set()
+        summary = batch_process(self.src, dst, resolver=self.resolver)
+        self.assertEqual((summary['written'], summary['skipped'], summary['retry']), (2, 1, 0))
+        self.assertEqual(self.resolver.calls[-1], ['http://t.co/2'])
+        summary = batch_process(self.src, dst, resolver=self.resolver)
+        self.assertEqual((summary['written'], summary['skipped']), (0, 3))
+
+    def test_online_run_reprocesses_files_cleaned_offline(self):
+        dst = os.path.join(self._tmp.name, 'dst')
+        offline = FakeResolver(self.resolver.mapping, offline=True)
+        self.assertEqual(batch_process(self.src, dst, resolver=offline)['written'], 3)
+        self.assertEqual(batch_process(self.src, dst, resolver=offline)['skipped'], 3)
+        summary = batch_process(self.src, dst, resolver=self.resolver)
+        self.assertEqual((summary['written'], summary['skipped']), (3, 0))
+        self.assertEqual(self.read(dst, os.path.join('nested', 'b.txt')), 'see https://two.org/.\n')
+        self.assertEqual(batch_process(self.src, dst, resolver=self.resolver)['skipped'], 3)
+
+
+class TestUrlCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'urls.db')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_persists_with_separate_negative_ttl(self):
+        with UrlCache(self.path, ttl=100, negative_ttl=10) as cache:
+            cache.put_many([('http://a', 'http://b', True), ('http://dead', 'http://dead', False)])
+        later = time.time() + 50
+        with UrlCache(self.path, ttl=100, negative_ttl=10) as cache, \
+                mock.patch('time.time', return_value=later):
+            self.assertEqual(cache.get_many(['http://a', 'http://dead']), {'http://a': ('http://b', True)})
+
+    def test_evicts_least_recently_used(self):
+        clock = itertools.count(1_000_000)
+        with UrlCache(self.path, max_entries=2) as cache, \
+                mock.patch('time.time', side_effect=lambda: next(clock)):
+            cache.put('http://1', 'x')
+            cache.put('http://2', 'x')
+            cache.get('http://1')
+            cache.put('http://3', 'x')
+            self.assertEqual(len(cache), 2)
+            self.assertIsNone(cache.get('http://2'))
+            self.assertIsNotNone(cache.get('http://1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
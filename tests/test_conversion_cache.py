@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from py_tools.sys_tools.conversion_cache import ConversionCache
+
+
+class TestConversionCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache = ConversionCache(os.path.join(self._tmp.name, 'cache'), max_bytes=250)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def make_input(self, name, content):
+        path = os.path.join(self._tmp.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_identical_content_is_converted_once(self):
+        calls = []
+
+        def convert():
+            calls.append(1)
+            return 'converted'
+
+        first = self.make_input('a.txt', 'same bytes')
+        copy = self.make_input('b.txt', 'same bytes')
+        self.assertEqual(self.cache.convert(first, 'fake', convert), 'converted')
+        self.assertEqual(self.cache.convert(copy, 'fake', convert), 'converted')
+        self.assertEqual((len(calls), self.cache.hits, self.cache.misses), (1, 1, 1))
+
+    def test_options_and_version_are_part_of_the_key(self):
+        path = self.make_input('a.txt', 'x')
+        keys = {
+            self.cache.key(path, 'fake'),
+            self.cache.key(path, 'fake', options={'dpi': 72}),
+            self.cache.key(path, 'fake', version='2.0'),
+            self.cache.key(path, 'other'),
+        }
+        self.assertEqual(len(keys), 4)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        paths = [self.make_input(f'{i}.txt', str(i)) for i in range(3)]
+        keys = [self.cache.key(p, 'fake') for p in paths]
+        self.cache.put(keys[0], 'a' * 100)
+        self.cache.put(keys[1], 'b' * 100)
+        os.utime(self.cache._path(keys[1]), (1, 1))  # make entry 1 the oldest
+        self.cache.put(keys[2], 'c' * 100)
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertEqual(self.cache.get(keys[0]), 'a' * 100)
+        self.assertEqual(self.cache.get(keys[2]), 'c' * 100)
+
+    def test_overwriting_an_entry_does_not_count_it_twice(self):
+        key = self.cache.key(self.make_input('a.txt', 'a'), 'fake')
+        self.cache.put(key, 'a' * 100)
+        for _ in range(5):
+            self.cache.put(key, 'b' * 120)
+        self.assertEqual(self.cache._total_bytes, 120)
+
+    def test_entries_evicted_by_another_worker_are_ignored(self):
+        keys = [self.cache.key(self.make_input(f'{i}.txt', str(i)), 'fake') for i in range(3)]
+        self.cache.put(keys[0], 'a' * 100)
+        self.cache.put(keys[1], 'b' * 100)
+        listed = list(self.cache._entries())
+        # Another worker removes entry 0 after this one listed the directory
+        os.remove(self.cache._path(keys[0]))
+        self.cache._total_bytes = None
+        with mock.patch.object(self.cache, '_entries', side_effect=lambda: iter(listed)):
+            self.cache.put(keys[2], 'c' * 100)
+        self.assertEqual(self.cache.get(keys[2]), 'c' * 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
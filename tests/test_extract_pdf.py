@@ -0,0 +1,142 @@
+import importlib
+import io
+import json
+import os
+import pathlib
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+try:
+    import pymupdf
+    import pymupdf4llm
+    from pymupdf4llm.helpers import pymupdf_rag
+    from py_tools.sys_tools.extract_pdf import extract_all, find_pdfs, iter_markdown_chunks, main, process_pdfs
+except ImportError:  # pymupdf4llm is an optional dependency of the test run
+    pymupdf = None
+
+
+def make_pdf(path, text, image=False):
+    doc = pymupdf.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), text, fontsize=12)
+    if image:
+        pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 40, 40), False)
+        pixmap.clear_with(200)
+        page.insert_image(pymupdf.Rect(100, 100, 300, 300), pixmap=pixmap)
+    doc.save(path)
+    doc.close()
+
+
+def crash_on(name):
+    # Replaces extract_all in forked workers: kill the worker like a MuPDF segfault
+    real = extract_all
+
+    def extract(pdf_path, *args, **kwargs):
+        if os.path.basename(pdf_path) == name:
+            os._exit(1)
+        return real(pdf_path, *args, **kwargs)
+    return extract
+
+
+@unittest.skipIf(pymupdf is None, 'pymupdf4llm is not installed')
+class TestExtractPdf(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self._tmp.name, 'src')
+        self.out = os.path.join(self._tmp.name, 'out')
+        os.makedirs(os.path.join(self.src, 'nested'))
+        make_pdf(os.path.join(self.src, 'a.pdf'), 'First [bracketed] document', image=True)
+        make_pdf(os.path.join(self.src, 'nested', 'b.pdf'), 'Second document')
+        with open(os.path.join(self.src, 'notes.txt'), 'w') as f:
+            f.write('not a pdf')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def path(self, *parts):
+        return os.path.join(self.src, *parts)
+
+    def test_extract_all_writes_text_only_markdown(self):
+        make_pdf(self.path('c.pdf'), 'Text with ![an](image.png) reference', image=True)
+        with mock.patch('pymupdf4llm.to_markdown', wraps=pymupdf4llm.to_markdown) as to_markdown, \
+                redirect_stdout(io.StringIO()):
+            markdown_file, images_file = extract_all(self.path('c.pdf'), pathlib.Path(self.out))
+        self.assertEqual(to_markdown.call_count, 1)
+        markdown = markdown_file.read_text(encoding='utf-8')
+        images = images_file.read_text(encoding='utf-8')
+        self.assertEqual(markdown, pymupdf4llm.to_markdown(self.path('c.pdf')))
+        self.assertIn('![an](image.png)', markdown)
+        self.assertIn('c_images', images)
+        self.assertNotIn('c_images', markdown)
+        self.assertEqual(len(os.listdir(os.path.join(self.out, 'c_images'))), 1)
+
+    def test_chunks_share_one_header_scan(self):
+        doc = pymupdf.open()
+        for number in range(6):
+            doc.new_page().insert_text((72, 72), f'Page {number}', fontsize=12)
+        doc.save(self.path('pages.pdf'))
+        doc.close()
+        module = importlib.import_module('py_tools.sys_tools.extract_pdf')
+        scans = mock.Mock(wraps=pymupdf_rag.IdentifyHeaders)
+        # hdr_info is read by the engine used without pymupdf.layout
+        with mock.patch.object(pymupdf4llm, '_use_layout', False, create=True):
+            with mock.patch.object(pymupdf_rag, 'IdentifyHeaders', scans), \
+                    mock.patch.object(module, 'IdentifyHeaders', scans):
+                chunks = list(iter_markdown_chunks(self.path('pages.pdf'), 2))
+            self.assertEqual(scans.call_count, 1)
+            # Worker processes receive the header levels with their pages
+            self.assertEqual(list(iter_markdown_chunks(self.path('pages.pdf'), 2, workers=2)), chunks)
+        self.assertEqual(len(chunks), 3)
+        self.assertIn('Page 5', chunks[2])
+
+    def test_find_pdfs_expands_folders_and_globs(self):
+        found = find_pdfs([self.src, os.path.join(self.src, '**', 'b.pdf'), self.path('notes.txt')])
+        self.assertEqual(found, [self.path('a.pdf'), self.path('nested', 'b.pdf'), self.path('notes.txt')])
+
+    def test_process_pdfs_reports_errors_and_skips_up_to_date_files(self):
+        with open(self.path('broken.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.7 garbage')
+        paths = [self.path('a.pdf'), self.path('nested', 'b.pdf'), self.path('broken.pdf')]
+        with redirect_stdout(io.StringIO()):
+            results = process_pdfs(paths, self.out, mode='markdown', workers=2)
+            statuses = {os.path.basename(r['pdf']): r['status'] for r in results}
+            self.assertEqual(statuses, {'a.pdf': 'done', 'b.pdf': 'done', 'broken.pdf': 'error'})
+            again = process_pdfs(paths[:2], self.out, mode='markdown', workers=1)
+        self.assertEqual([r['status'] for r in again], ['skipped', 'skipped'])
+
+    def test_crashed_worker_only_fails_its_pdf(self):
+        make_pdf(self.path('crash.pdf'), 'Crashes the worker')
+        paths = [self.path('a.pdf'), self.path('crash.pdf'), self.path('nested', 'b.pdf')]
+        # The package exports a function named like the module
+        module = importlib.import_module('py_tools.sys_tools.extract_pdf')
+        with mock.patch.object(module, 'extract_all', crash_on('crash.pdf')), \
+                redirect_stdout(io.StringIO()):
+            results = process_pdfs(paths, self.out, workers=2)
+        statuses = {os.path.basename(r['pdf']): r['status'] for r in results}
+        self.assertEqual(statuses, {'a.pdf': 'done', 'b.pdf': 'done', 'crash.pdf': 'error'})
+        crashed = next(r for r in results if r['pdf'].endswith('crash.pdf'))
+        self.assertIn('BrokenProcessPool', crashed['error'])
+
+    def test_cli_json_summary(self):
+        summary_path = os.path.join(self._tmp.name, 'summary.json')
+        with redirect_stdout(io.StringIO()):
+            code = main(['batch', self.src, '-o', self.out, '-j', '1', '--json', summary_path])
+        with open(summary_path, encoding='utf-8') as f:
+            summary = json.load(f)
+        self.assertEqual(code, 0)
+        self.assertEqual((summary['mode'], summary['total'], summary['done'], summary['error']),
+                         ('batch', 2, 2, 0))
+        self.assertEqual(sorted(os.listdir(self.out)),
+                         ['a_images', 'a_images.md', 'a_output.md', 'b_images', 'b_images.md', 'b_output.md'])
+
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            main(['markdown', self.path('a.pdf'), '-o', self.out, '--json', '-'])
+        self.assertEqual(json.loads(stdout.getvalue())['skipped'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import time
+import unittest
+
+from py_tools.sys_tools.files.index import FileIndex
+
+
+def write(path, size):
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+
+
+class TestFileIndex(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self._tmp.name, 'tree')
+        os.makedirs(os.path.join(self.root, 'sub', 'deep'))
+        write(os.path.join(self.root, 'small.txt'), 10)
+        write(os.path.join(self.root, 'sub', 'big.bin'), 5000)
+        write(os.path.join(self.root, 'sub', 'deep', 'old.bin'), 2000)
+        past = time.time() - 86400 * 30
+        os.utime(os.path.join(self.root, 'sub', 'deep', 'old.bin'), (past, past))
+        self.index = FileIndex(os.path.join(self._tmp.name, 'index.db'))
+
+    def tearDown(self):
+        self.index.close()
+        self._tmp.cleanup()
+
+    def names(self, files):
+        return sorted(os.path.basename(f.path) for f in files)
+
+    def test_build_and_query(self):
+        self.assertEqual(self.index.build(self.root), 3)
+        self.assertEqual(self.names(self.index.find(min_size=1000)), ['big.bin', 'old.bin'])
+        week_ago = time.time() - 86400 * 7
+        self.assertEqual(self.names(self.index.find(min_size=1000, modified_before=week_ago)),
+                         ['old.bin'])
+        self.assertEqual(self.names(self.index.find(under=os.path.join(self.root, 'sub'))),
+                         ['big.bin', 'old.bin'])
+        self.assertEqual(self.index.total_size(), 7010)
+
+    def test_refresh_only_rescans_changed_directories(self):
+        first = self.index.refresh(self.root)
+        self.assertEqual(first.rescanned, 3)
+        self.assertEqual(self.index.refresh(self.root).rescanned, 0)
+
+        write(os.path.join(self.root, 'sub', 'new.txt'), 1)
+        os.remove(os.path.join(self.root, 'sub', 'deep', 'old.bin'))
+        os.rmdir(os.path.join(self.root, 'sub', 'deep'))
+        stats = self.index.refresh(self.root)
+        self.assertEqual((stats.rescanned, stats.removed), (1, 1))
+        self.assertEqual(self.names(self.index.find()), ['big.bin', 'new.txt', 'small.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from py_tools.sys_tools.files import filer
+from py_tools.sys_tools.files.matcher import PatternMatcher
+from py_tools.sys_tools.files.scanner import scan, walk
+from py_tools.sys_tools.files.sinks import LineSink
+
+
+class TreeFixture:
+    """Small folder tree shared by the scanner and filer tests."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        for folder in ('a', os.path.join('a', 'b'), 'c'):
+            os.makedirs(os.path.join(self.root, folder))
+        for name in ('top.txt', os.path.join('a', 'one.md'), os.path.join('a', 'b', 'two.txt')):
+            open(os.path.join(self.root, name), 'w').close()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def relpaths(self, entries):
+        return sorted(os.path.relpath(e.path, self.root) for e in entries)
+
+
+class TestScanner(TreeFixture, unittest.TestCase):
+
+    def test_scan_single_level(self):
+        self.assertEqual(self.relpaths(scan(self.root)), ['a', 'c', 'top.txt'])
+
+    def test_scan_recursive_matches_os_walk(self):
+        expected = sorted(
+            os.path.relpath(os.path.join(folder, name), self.root)
+            for folder, dirs, files in os.walk(self.root)
+            for name in dirs + files
+        )
+        self.assertEqual(self.relpaths(scan(self.root, recursive=True, workers=2)), expected)
+
+    def test_walk_groups_by_directory(self):
+        folders = {os.path.relpath(path, self.root): [e.name for e in entries]
+                   for path, entries in walk(self.root)}
+        self.assertEqual(sorted(folders), ['.', 'a', os.path.join('a', 'b'), 'c'])
+        self.assertEqual(folders[os.path.join('a', 'b')], ['two.txt'])
+
+    def test_unreadable_root_raises_and_subfolders_are_skipped(self):
+        missing = os.path.join(self.root, 'missing')
+        for recursive in (False, True):
+            with self.assertRaises(FileNotFoundError):
+                list(scan(missing, recursive=recursive))
+
+        scandir = os.scandir
+
+        def unreadable_a(path):
+            if path == os.path.join(self.root, 'a'):
+                raise PermissionError(path)
+            return scandir(path)
+        with mock.patch('os.scandir', unreadable_a):
+            self.assertEqual(self.relpaths(scan(self.root, recursive=True)), ['a', 'c', 'top.txt'])
+
+
+class TestFilerRecords(TreeFixture, unittest.TestCase):
+
+    def test_iter_variants_yield_records(self):
+        records = list(filer.iter_ends_with(self.root, '.txt', recursive=True))
+        self.assertEqual(sorted(r.name for r in records), ['top.txt', 'two.txt'])
+        self.assertTrue(all(isinstance(r, filer.FileRecord) and not r.is_dir for r in records))
+
+        attrs = list(filer.iter_file_attrs(self.root))
+        self.assertEqual([(r.name, r.size) for r in attrs], [('top.txt', 0)])
+        self.assertIsNotNone(attrs[0].mtime)
+
+    def test_traverse_groups_files_by_folder(self):
+        folders = {os.path.relpath(d.path, self.root): [f.name for f in d.files]
+                   for d in filer.iter_traverse_directory(self.root)}
+        self.assertEqual(folders['.'], ['top.txt'])
+        self.assertEqual(folders['c'], [])
+
+    def test_sinks_receive_batched_lines(self):
+        stream = io.StringIO()
+        count = filer.starts_with(self.root, ['to', 'c'], sinks=[LineSink(stream, batch_size=1)])
+        self.assertEqual(count, 2)
+        self.assertEqual(sorted(stream.getvalue().splitlines()), ['c', 'top.txt'])
+
+    def test_missing_folder_raises(self):
+        missing = os.path.join(self.root, 'missing')
+        with self.assertRaises(FileNotFoundError):
+            filer.list_dir(missing, sinks=())
+        with self.assertRaises(FileNotFoundError):
+            filer.get_file_attrs_size(missing, sinks=())
+        # As with Path.glob, a missing folder matches nothing
+        self.assertEqual(filer.glob_match(missing, '*', sinks=()), 0)
+
+    def test_no_sinks_writes_nothing(self):
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            self.assertEqual(filer.list_dir(self.root, sinks=()), 3)
+            self.assertFalse(os.path.exists('list_dir.txt'))
+        finally:
+            os.chdir(cwd)
+
+
+class TestGlobMatch(unittest.TestCase):
+
+    PATTERNS = ('*.txt', 'x.txt', 'sub/*.txt', '*/x.txt', '**/x.txt', '**/*.txt', 'sub/**/*.txt',
+                '**', 'sub/**', '**/deep', '*', '.hidden', 'sub/deep/y.md', '**/*', 'missing/*')
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        for folder in ('sub', os.path.join('sub', 'deep'), 'other'):
+            os.makedirs(os.path.join(self.root, folder))
+        for name in ('x.txt', '.hidden', os.path.join('sub', 'x.txt'), os.path.join('sub', 'deep', 'x.txt'),
+                     os.path.join('sub', 'deep', 'y.md'), os.path.join('other', 'x.txt')):
+            open(os.path.join(self.root, name), 'w').close()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_same_matches_as_path_glob(self):
+        from pathlib import Path
+        for pattern in self.PATTERNS:
+            # Path.glob also yields the folder itself for a leading '**'
+            expected = sorted(str(p) for p in Path(self.root).glob(pattern) if str(p) != self.root)
+            found = sorted(r.path for r in filer.iter_glob_match(self.root, pattern))
+            self.assertEqual(found, expected, pattern)
+
+    def test_recursive_prefixes_double_star(self):
+        found = sorted(os.path.relpath(r.path, self.root)
+                       for r in filer.iter_glob_match(self.root, 'x.txt', recursive=True))
+        self.assertEqual(found, sorted([os.path.join('other', 'x.txt'), os.path.join('sub', 'deep', 'x.txt'),
+                                        os.path.join('sub', 'x.txt'), 'x.txt']))
+        with self.assertRaises(ValueError):
+            list(filer.iter_glob_match(self.root, ''))
+
+
+class TestDates(unittest.TestCase):
+
+    def test_get_date_is_utc(self):
+        self.assertEqual(filer.get_date(0), '01 Jan 1970')
+        self.assertEqual(filer.get_date(1_700_000_000.5), '14 Nov 2023')
+        self.assertEqual(filer.get_date(-1), '31 Dec 1969')
+
+    def test_format_dates(self):
+        stamps = [0, 3600, 86400 * 2 + 5]
+        self.assertEqual(filer.format_dates(stamps), ['01 Jan 1970', '01 Jan 1970', '03 Jan 1970'])
+
+    def test_format_dates_numpy_matches_scalar(self):
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            self.skipTest('numpy is not installed')
+        stamps = [-1, 0, 1_700_000_000.5, 86400 * 2 + 5, 0]
+        self.assertEqual(list(filer.format_dates_numpy(stamps)), filer.format_dates(stamps))
+
+
+class TestPatternMatcher(unittest.TestCase):
+
+    def test_reports_first_matching_rule(self):
+        matcher = PatternMatcher(['*.log', 'app*', ('suffix', '.gz'), '*.log.gz'])
+        self.assertEqual(matcher.match('app.log').pattern, '*.log')
+        self.assertEqual(matcher.match('app.txt').pattern, 'app*')
+        self.assertEqual(matcher.match('old.log.gz').pattern, '.gz')
+        self.assertIsNone(matcher.match('readme.md'))
+
+    def test_exclude_wins_over_include(self):
+        matcher = PatternMatcher(['.txt', '.md'], exclude=['.tmp.txt'], kind='suffix')
+        self.assertTrue(matcher.accepts('notes.txt'))
+        self.assertFalse(matcher.accepts('notes.tmp.txt'))
+        self.assertTrue(matcher.match('notes.tmp.txt').exclude)
+
+    def test_many_globs_agree_with_fnmatch(self):
+        import fnmatch
+        patterns = [f'*{i}?.dat' for i in range(200)] + ['[ab]*.csv']
+        matcher = PatternMatcher(patterns)
+        for name in ('x150a.dat', 'x1.dat', 'a1.csv', 'c1.csv', 'file199z.dat'):
+            expected = any(fnmatch.fnmatchcase(name, p) for p in patterns)
+            self.assertEqual(matcher.accepts(name), expected, name)
+
+    def test_prefix_and_empty_include(self):
+        self.assertEqual(PatternMatcher('tmp_', kind='prefix').match('tmp_1').pattern, 'tmp_')
+        self.assertTrue(PatternMatcher(exclude=['*.bak']).accepts('a.txt'))
+        with self.assertRaises(ValueError):
+            PatternMatcher(['x'], kind='regex')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import pickle
+import random
+import sys
+import unittest
+from collections import Counter
+
+# utils_candidates holds standalone scripts rather than a package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'py_tools', 'utils_candidates'))
+from frequency import ExactCounter, SpaceSaving, make_counter  # noqa: E402
+
+
+def zipf_stream(n, distinct, seed):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, distinct + 1)]
+    return rng.choices([f'#tag{i}' for i in range(distinct)], weights, k=n)
+
+
+class TestSpaceSaving(unittest.TestCase):
+
+    def assert_within_bounds(self, summary, exact):
+        self.assertEqual(summary.total(), sum(exact.values()))
+        self.assertLessEqual(summary.error_bound(), summary.total() / summary.capacity)
+        for item, count in summary.items():
+            self.assertLessEqual(count - summary.error(item), exact[item])
+            self.assertGreaterEqual(count, exact[item])
+        # Every item seen more than total / capacity times is tracked
+        for item, count in exact.items():
+            if count > summary.total() / summary.capacity:
+                self.assertIn(item, summary)
+
+    def test_exact_while_below_capacity(self):
+        summary = SpaceSaving(10, ['a', 'b', 'a'])
+        self.assertEqual(summary.most_common(), [('a', 2), ('b', 1)])
+        self.assertEqual((summary.error('a'), summary.error_bound(), summary['missing']), (0, 0, 0))
+
+    def test_bounded_memory_and_error_bounds(self):
+        stream = zipf_stream(20_000, 2_000, seed=1)
+        summary = SpaceSaving(50, stream)
+        exact = Counter(stream)
+        self.assertEqual(len(summary), 50)
+        self.assert_within_bounds(summary, exact)
+        self.assertEqual([item for item, _ in summary.most_common(3)],
+                         [item for item, _ in exact.most_common(3)])
+
+    def test_merge_across_workers(self):
+        parts = [zipf_stream(5_000, 1_000, seed) for seed in range(4)]
+        merged = SpaceSaving(40)
+        for part in parts:
+            # Summaries travel between processes
+            merged.merge(pickle.loads(pickle.dumps(SpaceSaving(40, part))))
+        merged.merge(Counter(parts[0][:100]))
+        exact = Counter(item for part in parts for item in part) + Counter(parts[0][:100])
+        self.assertEqual(len(merged), 40)
+        self.assert_within_bounds(merged, exact)
+
+    def test_exact_backend(self):
+        counts = make_counter()
+        self.assertIsInstance(counts, ExactCounter)
+        counts.update(['a', 'b'])
+        counts.add('a', 2)
+        counts.merge(Counter(b=1))
+        self.assertEqual(counts.most_common(), [('a', 3), ('b', 2)])
+        self.assertEqual((counts.total(), counts.error('a'), counts.error_bound()), (5, 0, 0))
+        with self.assertRaises(TypeError):
+            counts.merge(SpaceSaving(2))
+        self.assertIsInstance(make_counter(5), SpaceSaving)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(__file__), os.pardir)
+
+# Ceiling for the cumulative import time of ``import py_tools`` in microseconds
+IMPORT_CEILING_US = 50_000
+
+HEAVY_MODULES = ('pymupdf4llm', 'markitdown', 'openai', 'requests', 'bs4')
+
+
+def run_python(code, *options):
+    return subprocess.run(
+        [sys.executable, *options, '-c', code],
+        capture_output=True, text=True, check=True,
+    )
+
+
+def cumulative_import_us(stderr, module):
+    """Return the cumulative microseconds reported by -X importtime for a module."""
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        if name == module:
+            return int(cumulative)
+    raise AssertionError(f'{module} not found in -X importtime output')
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_import_py_tools_under_ceiling(self):
+        result = run_python('import py_tools', '-X', 'importtime')
+        self.assertLess(cumulative_import_us(result.stderr, 'py_tools'), IMPORT_CEILING_US)
+
+    def test_filer_does_not_load_heavy_dependencies(self):
+        code = (
+            'import sys\n'
+            'import py_tools.sys_tools.files.filer\n'
+            f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n'
+        )
+        self.assertEqual(run_python(code).stdout.strip(), '')
+
+    def test_exports_resolve_lazily(self):
+        code = (
+            'import sys, py_tools\n'
+            'assert "py_tools.sys_tools.files.filer" not in sys.modules\n'
+            'print(py_tools.list_dir.__module__)\n'
+        )
+        self.assertEqual(run_python(code).stdout.strip(), 'py_tools.sys_tools.files.filer')
+
+    def test_export_named_like_its_submodule(self):
+        code = (
+            'import py_tools, py_tools.sys_tools as sys_tools\n'
+            'sys_tools.extract_markdown\n'
+            'print(type(sys_tools.extract_pdf).__name__, type(py_tools.extract_pdf).__name__)\n'
+        )
+        self.assertEqual(run_python(code).stdout.strip(), 'function function')
+
+    def test_export_wins_over_submodule_imported_first(self):
+        code = (
+            'import sys\n'
+            'import py_tools.sys_tools.extract_pdf\n'
+            'import py_tools.sys_tools as sys_tools\n'
+            'from py_tools.sys_tools import extract_pdf\n'
+            'module = sys.modules["py_tools.sys_tools.extract_pdf"]\n'
+            'print(sys_tools.extract_pdf is module.extract_pdf, extract_pdf is module.extract_pdf)\n'
+        )
+        self.assertEqual(run_python(code).stdout.strip(), 'True True')
+
+    def test_later_public_apis_are_exported(self):
+        code = (
+            'import py_tools\n'
+            'print(py_tools.process_pdfs.__module__, py_tools.batch_mkdownthis.__module__, '
+            'py_tools.copy_tree.__module__)\n'
+        )
+        self.assertEqual(run_python(code).stdout.split(), [
+            'py_tools.sys_tools.extract_pdf', 'py_tools.sys_tools.markdownthis',
+            'py_tools.sys_tools.files.transfer',
+        ])
+
+    def test_scripts_run_directly(self):
+        for script in ('py_tools/sys_tools/extract_pdf.py', 'py_tools/work_tools/clean_text_urls.py'):
+            result = subprocess.run([sys.executable, os.path.join(ROOT, script), '--help'],
+                                    capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
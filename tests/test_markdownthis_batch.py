@@ -0,0 +1,105 @@
+import importlib
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+try:
+    from openai import OpenAI
+    from py_tools.sys_tools.conversion_cache import ConversionCache
+    from py_tools.sys_tools.markdownthis import batch_mkdownthis, find_inputs, output_file_for
+except ImportError:  # markitdown and openai are optional dependencies of the test run
+    batch_mkdownthis = None
+
+
+@unittest.skipIf(batch_mkdownthis is None, 'markitdown is not installed')
+class TestBatchMarkdownThis(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self._tmp.name, 'docs')
+        os.makedirs(os.path.join(self.src, 'nested'))
+        self.write('notes.md', '# Notes\n\nSome text.\n')
+        self.write(os.path.join('nested', 'page.html'), '<html><body><h1>Title</h1><p>Body</p></body></html>')
+        self.single = os.path.join(self._tmp.name, 'single.txt')
+        with open(self.single, 'w', encoding='utf-8') as f:
+            f.write('plain text')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, relpath, text):
+        with open(os.path.join(self.src, relpath), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def test_find_inputs_searches_folders_recursively(self):
+        self.assertEqual(find_inputs([self.src, self.single]), [
+            (os.path.join(self.src, 'notes.md'), self.src),
+            (os.path.join(self.src, 'nested', 'page.html'), self.src),
+            (self.single, None),
+        ])
+
+    def test_output_file_for(self):
+        notes = os.path.join(self.src, 'nested', 'notes.md')
+        self.assertEqual(output_file_for(notes), notes + '.md')
+        self.assertEqual(output_file_for(notes, self.src, 'out'), os.path.join('out', 'nested', 'notes.md'))
+        self.assertEqual(output_file_for(notes, None, 'out'), os.path.join('out', 'notes.md'))
+
+    def test_batch_mirrors_folders_reports_errors_and_uses_the_cache(self):
+        out = os.path.join(self._tmp.name, 'out')
+        cache = ConversionCache(os.path.join(self._tmp.name, 'cache'))
+        missing = os.path.join(self._tmp.name, 'missing.docx')
+        with redirect_stdout(io.StringIO()):
+            results = batch_mkdownthis([self.src, missing], out, workers=2, cache=cache, use_llm=False)
+        statuses = {os.path.relpath(r['output'], out): r['status'] for r in results}
+        self.assertEqual(statuses, {'notes.md': 'done', os.path.join('nested', 'page.md'): 'done',
+                                    'missing.md': 'error'})
+        with open(os.path.join(out, 'nested', 'page.md'), encoding='utf-8') as f:
+            self.assertIn('Title', f.read())
+
+        with redirect_stdout(io.StringIO()):
+            batch_mkdownthis([self.src], out, cache=cache, use_llm=False)
+        self.assertEqual(cache.hits, 2)
+
+    def test_captions_use_the_given_client_and_cache(self):
+        image = os.path.join(self.src, 'photo.png')
+        with open(image, 'wb') as f:
+            f.write(b'not really a png')
+        cache = ConversionCache(os.path.join(self._tmp.name, 'cache'))
+        calls = []
+
+        async def caption_images(paths, **kwargs):
+            calls.append(kwargs)
+            return {path: 'A photo.' for path in paths}
+
+        client = OpenAI(base_url='http://127.0.0.1:9/v1', api_key='test')
+        module = importlib.import_module('py_tools.sys_tools.markdownthis')
+        with mock.patch.object(module, 'caption_images', caption_images), redirect_stdout(io.StringIO()):
+            batch_mkdownthis([image], use_llm=True, llm_client=client, cache=cache)
+        self.assertEqual(str(calls[0]['client'].base_url), str(client.base_url))
+        self.assertIs(calls[0]['cache'], cache)
+        with open(image + '.md', encoding='utf-8') as f:
+            self.assertIn('# Description:\nA photo.', f.read())
+
+    def tree(self):
+        return sorted(os.path.relpath(os.path.join(folder, name), self.src)
+                      for folder, _, files in os.walk(self.src) for name in files)
+
+    def test_reruns_do_not_convert_earlier_outputs(self):
+        for output_dir in (None, os.path.join(self.src, 'out')):
+            with self.subTest(output_dir=output_dir), redirect_stdout(io.StringIO()):
+                first = batch_mkdownthis([self.src], output_dir, workers=4, use_llm=False)
+                tree = self.tree()
+                for _ in range(2):
+                    again = batch_mkdownthis([self.src], output_dir, workers=4, use_llm=False)
+                    self.assertEqual(self.tree(), tree)
+                    self.assertEqual(sorted(r['input'] for r in again), sorted(r['input'] for r in first))
+                    self.assertEqual({r['status'] for r in again}, {'done'})
+        self.assertIn(os.path.join('nested', 'page.html.md'), tree)
+        self.assertIn(os.path.join('out', 'nested', 'page.md'), tree)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+import io
+import json
+import os
+import re
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from py_tools.sys_tools.process_tree_python3 import (
+    CLOCK_TICKS, PAGE_SIZE, ProcessIndex, Snapshot, build_tree, parse_stat,
+    print_hierarchy, print_tree, read_proc, redraw, render_tree, sample, watch,
+)
+
+STAT_TAIL = b' 0 0 0 0 -1 4194560 100 0 0 0 10 5 0 0 20 0 1 0 100 1000000 200'
+
+
+def stat(pid, ppid, ticks, rss_pages, start=100):
+    return (b'%d (p%d) S %d 0 0 0 -1 0 0 0 0 0 %d 0 0 0 20 0 1 0 %d 1000 %d'
+            % (pid, pid, ppid, ticks, start, rss_pages))
+
+
+class TestProcessTree(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.proc = self._tmp.name
+        for pid, ppid, comm in [(1, 0, b'init'), (20, 1, b'sshd'), (7, 1, b'evil) S 1 (x'),
+                                (31, 20, b'bash'), (30, 20, b'tmux: server')]:
+            os.makedirs(os.path.join(self.proc, str(pid)))
+            with open(os.path.join(self.proc, str(pid), 'stat'), 'wb') as f:
+                f.write(b'%d (%s) S %d' % (pid, comm, ppid) + STAT_TAIL)
+        os.makedirs(os.path.join(self.proc, 'self'))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_parse_stat_handles_parentheses_in_name(self):
+        self.assertEqual(parse_stat(b'7 (evil) S 1 (x) R 42' + STAT_TAIL), (42, 7, 'evil) S 1 (x'))
+
+    def test_read_proc_and_render(self):
+        index = ProcessIndex(read_proc(self.proc))
+        self.assertEqual(len(index), 5)
+        out = io.StringIO()
+        print_tree(index, 1, out)
+        self.assertEqual(out.getvalue().splitlines(), [
+            'init(1)',
+            ' |- evil) S 1 (x(7)',
+            ' `- sshd(20)',
+            '     |- tmux: server(30)',
+            '     `- bash(31)',
+        ])
+
+    def test_deep_tree_does_not_recurse(self):
+        depth = 5000
+        index = ProcessIndex([(pid - 1, pid, 'sh') for pid in range(1, depth + 1)])
+        out = io.StringIO()
+        print_tree(index, 1, out)
+        self.assertEqual(len(out.getvalue().splitlines()), depth)
+
+    def test_print_hierarchy_accepts_dict(self):
+        processes = {1: {'command': '/sbin/init', 'children': [2]},
+                     2: {'command': 'sh', 'children': []}}
+        out = io.StringIO()
+        with redirect_stdout(out):
+            print_hierarchy(processes, 1)
+        self.assertEqual(out.getvalue().splitlines(), ['init(1)', ' `- sh(2)'])
+
+
+    def test_parse_stat_counters(self):
+        self.assertEqual(parse_stat(b'7 (a b) S 1 7 7 0 -1 4194560 100 0 0 0 10 5 0 0 20 0 1 0 300 1000 42',
+                                    counters=True),
+                         (1, 7, 'a b', 15, 42, 300))
+
+
+class TestWatch(unittest.TestCase):
+
+    def snapshot(self, stats, previous=None, timestamp=0.0):
+        records = [parse_stat(data, counters=True) for data in stats]
+        return Snapshot(ProcessIndex(records), previous, timestamp)
+
+    def test_cpu_and_rss_from_deltas_with_subtree_totals(self):
+        first = self.snapshot([stat(1, 0, 0, 10), stat(2, 1, 0, 20), stat(3, 2, 0, 30)])
+        second = self.snapshot([stat(1, 0, CLOCK_TICKS, 10), stat(2, 1, CLOCK_TICKS // 2, 20),
+                                stat(3, 2, CLOCK_TICKS // 4, 30, start=999)], first, 2.0)
+        # PID 3 was reused by a new process, so its ticks are not a delta
+        self.assertEqual(list(second.cpu), [50.0, 25.0, 0.0])
+        self.assertEqual(list(second.tree_cpu), [75.0, 25.0, 0.0])
+        self.assertEqual(list(second.tree_rss), [60 * PAGE_SIZE, 50 * PAGE_SIZE, 30 * PAGE_SIZE])
+        self.assertTrue(second.lines(1)[0].startswith('p1(1) 50.0% '))
+
+    def test_threads_are_not_counted_twice(self):
+        with tempfile.TemporaryDirectory() as proc:
+            def write(path, data):
+                os.makedirs(os.path.join(proc, os.path.dirname(path)), exist_ok=True)
+                with open(os.path.join(proc, path), 'wb') as f:
+                    f.write(data)
+
+            def fake_proc(ticks):
+                # PID 2 runs two threads; its own stat sums the ticks of both
+                write('1/stat', stat(1, 0, 0, 10))
+                write('2/stat', stat(2, 1, 2 * ticks, 20))
+                write('2/task/2/stat', stat(2, 1, ticks, 20))
+                write('2/task/3/stat', stat(3, 1, ticks, 20))
+
+            fake_proc(0)
+            first = sample(proc_root=proc, threads=True)
+            fake_proc(CLOCK_TICKS // 2)
+            records = read_proc(proc, threads=True, counters=True)
+            second = Snapshot(ProcessIndex(records), first, first.timestamp + 1.0)
+        self.assertEqual(list(second.index.pids), [1, 2, 3])
+        self.assertEqual(list(second.tree_cpu), [100.0, 100.0, 0.0])
+        self.assertEqual(list(second.tree_rss), [30 * PAGE_SIZE, 20 * PAGE_SIZE, 0])
+
+    def tree_stats(self, busy=0):
+        # init with three shells of three children each; busy gets CPU time
+        stats = [stat(1, 0, 0, 10)]
+        for shell in (10, 20, 30):
+            stats.append(stat(shell, 1, 0, 10))
+            stats.extend(stat(pid, shell, CLOCK_TICKS if pid == busy else 0, 10)
+                         for pid in range(shell + 1, shell + 4))
+        return stats
+
+    def test_lines_are_clipped_to_the_limit(self):
+        snapshot = self.snapshot(self.tree_stats())
+        full = snapshot.lines(1)
+        self.assertEqual(full, list(render_tree(0, snapshot.index.children, snapshot.label)))
+        self.assertEqual(snapshot.lines(1, limit=4), full[:3] + ['... 10 more processes'])
+        self.assertEqual(snapshot.lines(1, limit=13), full)
+
+    def test_unchanged_subtrees_are_not_rendered_again(self):
+        first = self.snapshot(self.tree_stats())
+        second = self.snapshot(self.tree_stats(), first, 1.0)
+        third = self.snapshot(self.tree_stats(busy=22), second, 2.0)
+        first.lines(1)
+        second.lines(1, previous=first)
+        with mock.patch.object(Snapshot, 'label', autospec=True, side_effect=Snapshot.label) as label:
+            lines = third.lines(1, previous=second)
+        # Only the busy process and its ancestors are rendered again
+        self.assertEqual(sorted(third.index.pids[call.args[1]] for call in label.call_args_list), [1, 20, 22])
+        self.assertEqual(lines, self.snapshot(self.tree_stats(busy=22), second, 2.0).lines(1))
+
+    def test_watch_stays_within_the_terminal(self):
+        with tempfile.TemporaryDirectory() as proc:
+            for data in self.tree_stats():
+                pid = data.split(b' ', 1)[0].decode()
+                os.makedirs(os.path.join(proc, pid))
+                with open(os.path.join(proc, pid, 'stat'), 'wb') as f:
+                    f.write(data)
+            out = io.StringIO()
+            with mock.patch('shutil.get_terminal_size', return_value=os.terminal_size((12, 5))):
+                watch(interval=0, iterations=2, proc_root=proc, out=out)
+        rows = [int(row) for row in re.findall(r'\x1b\[(\d+);1H', out.getvalue())]
+        self.assertEqual(max(rows), 5)
+        self.assertIn('... 10 more', out.getvalue())
+        self.assertTrue(all(len(line) <= 12 for line in re.findall(r'1H([^\x1b]*)\x1b\[K', out.getvalue())))
+
+    def test_redraw_rewrites_changed_rows_only(self):
+        out = io.StringIO()
+        self.assertEqual(redraw(out, ['a', 'b', 'c'], ['a', 'B']), 2)
+        self.assertEqual(out.getvalue(), '\x1b[2;1HB\x1b[K\x1b[3;1H\x1b[J')
+        self.assertEqual(redraw(io.StringIO(), ['a'], ['a']), 0)
+
+
+class TestProcessTreeLibrary(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ProcessIndex([
+            (0, 1, 'init'), (1, 10, 'nginx: master'), (10, 11, 'nginx: worker'),
+            (10, 12, 'nginx: worker'), (1, 20, 'sshd'), (20, 21, 'bash'), (21, 22, 'vim'),
+            (20, 23, 'bash'),
+        ])
+
+    def test_root_by_name_skips_nested_matches(self):
+        tree = build_tree(self.index, name='nginx*')
+        self.assertEqual([p.pid for p in tree], [10, 11, 12])
+        self.assertEqual([p.pid for p in build_tree(self.index, name='bash')], [21, 22, 23])
+        self.assertEqual([p.pid for p in build_tree(self.index, pid=20, name='vim')], [22])
+        self.assertEqual(len(build_tree(self.index, pid=999)), 0)
+        self.assertEqual(len(build_tree(self.index, pid=999, name='bash')), 0)
+
+    def test_prune_keeps_matching_branches(self):
+        tree = build_tree(self.index, predicate=lambda p: p.name == 'vim')
+        self.assertEqual(list(tree.lines()), ['init(1)', ' `- sshd(20)', '     `- bash(21)',
+                                              '         `- vim(22)'])
+
+    def test_json_streams_nested_tree(self):
+        tree = build_tree(self.index, pid=20)
+        out = io.StringIO()
+        tree.write_json(out)
+        self.assertEqual(json.loads(out.getvalue()), tree.to_dict())
+        self.assertEqual([c['pid'] for c in tree.to_dict()[0]['children']], [21, 23])
+
+    def test_ndjson_with_snapshot(self):
+        records = [parse_stat(stat(1, 0, 0, 1), counters=True),
+                   parse_stat(stat(2, 1, 0, 2), counters=True)]
+        tree = build_tree(Snapshot(ProcessIndex(records)))
+        out = io.StringIO()
+        tree.write_ndjson(out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(r['pid'], r['depth'], r['tree_rss']) for r in rows],
+                         [(1, 0, 3 * PAGE_SIZE), (2, 1, 2 * PAGE_SIZE)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+# utils_candidates holds standalone scripts rather than a package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'py_tools', 'utils_candidates'))
+from text_filters import compile_filters, matches_by_filter, process_csv, process_text  # noqa: E402
+
+
+class TestTextFilters(unittest.TestCase):
+
+    def test_extract_without_double_counting(self):
+        text = 'Ping bob@example.com or @alice about #python, see https://x.io/a on 12/05/2024'
+        self.assertEqual(process_text(text, ['emails', 'mentions', 'hashtags', 'links', 'dates'], 'extract'), {
+            'links': ['https://x.io/a'], 'emails': ['bob@example.com'], 'dates': ['12/05/2024'],
+            'mentions': ['@alice'], 'hashtags': ['#python'],
+        })
+
+    def test_overlaps_go_to_the_earlier_filter_in_priority(self):
+        # The phone number "12 2024-01" starts first but overlaps a date
+        text = 'Order 12 2024-01-15 and room 7 on 05/06/2023'
+        found = process_text(text, ['dates', 'phone_numbers'], 'extract')
+        self.assertEqual(found, {'dates': ['2024-01-15', '05/06/2023'], 'phone_numbers': []})
+        self.assertEqual(process_text(text, ['phone_numbers'], 'extract')['phone_numbers'][0], '12 2024-01')
+        self.assertEqual(process_text(text, ['dates', 'phone_numbers'], 'clean'),
+                         {'cleaned_text': 'Order 12  and room 7 on '})
+
+    def test_clean(self):
+        self.assertEqual(process_text('a <b>bold</b> #tag text', ['html_tags', 'hashtags'], 'clean'),
+                         {'cleaned_text': 'a bold  text'})
+        self.assertEqual(process_text('keep me', [], 'clean'), {'cleaned_text': 'keep me'})
+
+    def test_series_keeps_row_attribution(self):
+        series = pd.Series(['#a @b', None, 'nothing', '#c'], index=[10, 11, 12, 13])
+        text_filter = compile_filters(['hashtags', 'mentions'])
+        matches = text_filter.extract_series(series)
+        self.assertEqual(list(matches.index), [10, 10, 13])
+        self.assertEqual(matches_by_filter(matches), {'mentions': ['@b'], 'hashtags': ['#a', '#c']})
+        self.assertEqual(text_filter.clean_series(series).tolist()[2:], ['nothing', ''])
+
+    def test_filters_are_validated_and_cached(self):
+        self.assertIs(compile_filters(['links', 'emails']), compile_filters(['emails', 'links']))
+        with self.assertRaises(ValueError):
+            compile_filters(['nope'])
+
+
+class TestProcessCsv(unittest.TestCase):
+
+    CSV = 'id,text\n' + ''.join(f'{i},"post {i} #tag{i % 3} @user{i % 2}"\n' for i in range(10)) + '10,\n'
+
+    def test_extract_counts_across_chunks_and_workers(self):
+        for workers in (1, 2):
+            summary = process_csv(io.StringIO(self.CSV), 'text', ['hashtags', 'mentions'],
+                                  chunksize=3, workers=workers)
+            self.assertEqual((summary['rows'], summary['chunks']), (11, 4))
+            self.assertEqual(summary['counts']['hashtags'], {'#tag0': 4, '#tag1': 3, '#tag2': 3})
+            self.assertEqual(summary['counts']['mentions'], {'@user0': 5, '@user1': 5})
+
+    def test_extract_with_bounded_counts(self):
+        summary = process_csv(io.StringIO(self.CSV), 'text', ['hashtags'], chunksize=3, workers=2, capacity=2)
+        counts = summary['counts']['hashtags']
+        self.assertEqual((len(counts), counts.total()), (2, 10))
+        self.assertLessEqual(counts.error_bound(), 10 / 2)
+        for item, count in counts.most_common():
+            self.assertLessEqual(count - counts.error(item), {'#tag0': 4, '#tag1': 3, '#tag2': 3}[item])
+
+    def test_clean_writes_every_chunk_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'clean.csv')
+            seen = []
+            summary = process_csv(io.StringIO(self.CSV), 'text', ['hashtags'], 'clean', chunksize=4,
+                                  workers=1, output=output, progress=seen.append)
+            cleaned = pd.read_csv(output)
+        self.assertEqual(seen, [4, 8, 11])
+        self.assertEqual(summary['rows'], 11)
+        self.assertEqual(list(cleaned['id']), list(range(11)))
+        self.assertEqual(cleaned['text'][1], 'post 1  @user1')
+
+
+if __name__ == '__main__':
+    unittest.main()
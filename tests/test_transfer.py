@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+from py_tools.sys_tools.files.transfer import bulk_move, copy_tree
+
+
+class TestTransfer(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self._tmp.name, 'src')
+        self.dst = os.path.join(self._tmp.name, 'dst')
+        os.makedirs(os.path.join(self.src, 'nested'))
+        self.files = {'a.bin': b'a' * 100_000, os.path.join('nested', 'b.txt'): b'hello'}
+        for name, data in self.files.items():
+            with open(os.path.join(self.src, name), 'wb') as f:
+                f.write(data)
+        os.utime(os.path.join(self.src, 'a.bin'), (1_000_000, 1_000_000))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def read(self, root, name):
+        with open(os.path.join(root, name), 'rb') as f:
+            return f.read()
+
+    def test_copy_tree_copies_data_and_metadata(self):
+        stats = copy_tree(self.src, self.dst, workers=2)
+        self.assertEqual((stats.files, stats.bytes, stats.errors), (2, 100_005, []))
+        for name, data in self.files.items():
+            self.assertEqual(self.read(self.dst, name), data)
+        self.assertEqual(os.stat(os.path.join(self.dst, 'a.bin')).st_mtime, 1_000_000)
+        self.assertGreater(stats.files_per_s, 0)
+
+    def test_copy_tree_keeps_folders_and_their_metadata(self):
+        os.makedirs(os.path.join(self.src, 'nested', 'empty'))
+        os.chmod(os.path.join(self.src, 'nested'), 0o750)
+        for folder in (os.path.join('nested', 'empty'), 'nested', ''):
+            os.utime(os.path.join(self.src, folder), (2_000_000, 2_000_000))
+        stats = copy_tree(self.src, self.dst)
+        self.assertEqual(stats.errors, [])
+        self.assertTrue(os.path.isdir(os.path.join(self.dst, 'nested', 'empty')))
+        self.assertEqual(os.stat(os.path.join(self.dst, 'nested')).st_mode & 0o777, 0o750)
+        for folder in (os.path.join('nested', 'empty'), 'nested', ''):
+            self.assertEqual(os.stat(os.path.join(self.dst, folder)).st_mtime, 2_000_000, folder)
+
+    def test_journal_resumes_interrupted_copy(self):
+        journal = os.path.join(self._tmp.name, 'copy.journal')
+        first = copy_tree(self.src, self.dst, journal=journal)
+        second = copy_tree(self.src, self.dst, journal=journal)
+        self.assertEqual((first.files, second.files, second.skipped), (2, 0, 2))
+
+    def test_bulk_move_and_errors(self):
+        pairs = [(os.path.join(self.src, 'a.bin'), os.path.join(self.dst, 'a.bin')),
+                 (os.path.join(self.src, 'missing'), os.path.join(self.dst, 'missing'))]
+        stats = bulk_move(pairs)
+        self.assertEqual(stats.files, 1)
+        self.assertEqual(len(stats.errors), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.src, 'a.bin')))
+        self.assertEqual(self.read(self.dst, 'a.bin'), self.files['a.bin'])
+
+
+if __name__ == '__main__':
+    unittest.main()
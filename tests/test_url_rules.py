@@ -0,0 +1,48 @@
+import unittest
+
+from py_tools.work_tools.url_rules import TrackingRules, strip_tracking
+
+
+class TestUrlRules(unittest.TestCase):
+
+    def test_removes_only_tracking_segments(self):
+        self.assertEqual(strip_tracking('https://ex.com/p?b=2&utm_source=x&a=%2F+1&fbclid=Z#top'),
+                         'https://ex.com/p?b=2&a=%2F+1#top')
+        self.assertEqual(strip_tracking('https://ex.com/?UTM_Medium=mail&gclid=1'), 'https://ex.com/')
+        self.assertEqual(strip_tracking('https://ex.com/?utm%5Fsource=x&q=1'), 'https://ex.com/?q=1')
+
+    def test_unchanged_urls_are_returned_as_is(self):
+        for url in ('https://ex.com/', 'https://ex.com/?b=2&a=1&a=3', 'https://ex.com/#/r?utm_source=x',
+                    'https://ex.com/?q=a%20b&&x'):
+            self.assertIs(strip_tracking(url), url)
+
+    def test_domain_rules_apply_to_subdomains_only(self):
+        self.assertEqual(strip_tracking('https://www.youtube.com/watch?v=abc&si=xyz'),
+                         'https://www.youtube.com/watch?v=abc')
+        self.assertEqual(strip_tracking('https://user@m.youtube.com:443/watch?si=xyz&v=abc'),
+                         'https://user@m.youtube.com:443/watch?v=abc')
+        self.assertEqual(strip_tracking('https://example.org/?si=xyz'), 'https://example.org/?si=xyz')
+
+    def test_custom_rules(self):
+        rules = TrackingRules(keys=(), prefixes=(), domain_rules={})
+        rules.add_domain_rule('Shop.Example', ['ref'])
+        self.assertEqual(strip_tracking('http://a.shop.example/?ref=1&id=2&utm_x=1', rules),
+                         'http://a.shop.example/?id=2&utm_x=1')
+
+    def test_empty_rules(self):
+        rules = TrackingRules(keys=(), prefixes=(), domain_rules={})
+        url = 'https://ex.com/?utm_source=x&id=2'
+        self.assertIs(rules.strip(url), url)
+
+    def test_functional_keys_are_kept(self):
+        for url in ('https://www.amazon.com/dp/B000000000?th=1&psc=1',
+                    'https://www.amazon.de/dp/B000000000?tag=shop-21',
+                    'https://www.reddit.com/r/python/comments/abc/comment/def/?context=3',
+                    'https://ads.example.com/reports?campaign_id=42&from=2024-01-01'):
+            self.assertIs(strip_tracking(url), url)
+        self.assertEqual(strip_tracking('https://www.amazon.com/dp/B000000000?th=1&pd_rd_w=x&psc=1'),
+                         'https://www.amazon.com/dp/B000000000?th=1&psc=1')
+
+
+if __name__ == '__main__':
+    unittest.main()